@@ -18,6 +18,8 @@ NC='\033[0m' # No Color
 APP_DIR="/var/www/zewedjobs"
 DB_NAME="zewedjobs_admin"
 LOG_FILE="/var/log/zewedjobs_health.log"
+DASHBOARD_URL="${DASHBOARD_URL:-http://localhost:5000}"
+BOT_HEALTH_URL="${BOT_HEALTH_URL:-http://localhost:8081}"
 ERRORS=0
 
 # Log function
@@ -103,34 +105,36 @@ else
 fi
 
 echo ""
-echo "6. 🗄️ Database Connectivity"
-echo "--------------------------"
-
-# Check MySQL connection
-if mysql -u root -e "USE $DB_NAME; SELECT 1;" > /dev/null 2>&1; then
-    echo -e "${GREEN}✓ Database connection OK${NC}"
-    
-    # Check database size
-    DB_SIZE=$(mysql -u root -N -e "SELECT ROUND(SUM(data_length + index_length) / 1024 / 1024, 2) FROM information_schema.TABLES WHERE table_schema = '$DB_NAME'")
-    log "Database size: ${DB_SIZE}MB"
-    
-    # Check table counts
-    echo "Table Statistics:"
-    mysql -u root $DB_NAME -e "
-        SELECT 
-            table_name AS 'Table',
-            table_rows AS 'Rows',
-            ROUND((data_length + index_length) / 1024 / 1024, 2) AS 'Size (MB)'
-        FROM information_schema.TABLES 
-        WHERE table_schema = '$DB_NAME'
-        ORDER BY (data_length + index_length) DESC
-        LIMIT 5;
-    " 2>/dev/null || echo "Could not retrieve table stats"
-    
-else
-    echo -e "${RED}✗ Database connection FAILED${NC}"
-    ERRORS=$((ERRORS + 1))
-fi
+echo "6. 🗄️ Readiness (cached background probes)"
+echo "---------------------------------------------"
+
+# The services probe the database, caches and Bot API themselves every few
+# seconds; these requests only read the cached results
+check_ready() {
+    name="$1"
+    url="$2"
+    body=$(curl -s --max-time 5 "$url/ready")
+    status=$?
+    if [ $status -ne 0 ] || [ -z "$body" ]; then
+        echo -e "${RED}✗${NC} $name readiness endpoint unreachable ($url/ready)"
+        ERRORS=$((ERRORS + 1))
+        return
+    fi
+    echo "$body" | python3 -c '
+import json, sys
+report = json.load(sys.stdin)
+for name, check in sorted(report["checks"].items()):
+    mark = "✓" if check["ok"] else ("✗" if check["critical"] else "⚠")
+    detail = check.get("error") or ", ".join(
+        f"{k}={v}" for k, v in check.items() if k not in ("ok", "critical", "age_seconds", "duration_ms"))
+    print(f"  {mark} {name}: {detail}")
+sys.exit(0 if report["status"] == "ready" else 1)
+'
+    check "$name is ready"
+}
+
+check_ready "Web Dashboard" "$DASHBOARD_URL"
+check_ready "Telegram Bot" "$BOT_HEALTH_URL"
 
 echo ""
 echo "7. 🌐 Web Server Status"
@@ -222,21 +226,22 @@ echo ""
 echo "📈 System Statistics"
 echo "-------------------"
 
-# Get user count
-USER_COUNT=$(mysql -u root -N -e "SELECT COUNT(*) FROM users" $DB_NAME 2>/dev/null || echo "0")
-echo "• Total Users: $USER_COUNT"
-
-# Get job count
-JOB_COUNT=$(mysql -u root -N -e "SELECT COUNT(*) FROM jobs WHERE status = 'active'" $DB_NAME 2>/dev/null || echo "0")
-echo "• Active Jobs: $JOB_COUNT"
-
-# Get application count
-APP_COUNT=$(mysql -u root -N -e "SELECT COUNT(*) FROM applications WHERE DATE(applied_at) = CURDATE()" $DB_NAME 2>/dev/null || echo "0")
-echo "• Today's Applications: $APP_COUNT"
-
-# Get bot messages today
-MSG_COUNT=$(mysql -u root -N -e "SELECT COUNT(*) FROM messages WHERE DATE(timestamp) = CURDATE()" $DB_NAME 2>/dev/null || echo "0")
-echo "• Bot Messages Today: $MSG_COUNT"
+# Counts come from the dashboard's cached 'totals' probe, not from new queries
+curl -s --max-time 5 "$DASHBOARD_URL/ready" | python3 -c '
+import json, sys
+try:
+    totals = json.load(sys.stdin)["checks"]["totals"]
+except (ValueError, KeyError):
+    totals = {}
+labels = (
+    ("Total Users", "total_users"),
+    ("Active Jobs", "active_jobs"),
+    ("Applications Today", "applications_today"),
+    ("Bot Messages Today", "messages_today"),
+)
+for label, key in labels:
+    print(f"• {label}: {totals.get(key, 0)}")
+'
 
 echo ""
 echo "📋 Summary"
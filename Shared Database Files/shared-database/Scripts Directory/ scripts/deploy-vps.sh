@@ -56,7 +56,7 @@ apt install -y \
     php php-fpm php-mysql php-curl php-gd php-mbstring php-xml php-zip \
     mysql-server mysql-client \
     nginx \
-    git curl wget unzip \
+    git curl wget unzip zstd pigz \
     supervisor \
     certbot python3-certbot-nginx \
     redis-server \
@@ -350,12 +350,13 @@ cat > $APP_DIR/scripts/backup.sh <<BACKUP_SCRIPT
 
 BACKUP_DIR="$APP_DIR/shared-database/backups"
 DATE=\$(date +%Y%m%d_%H%M%S)
-BACKUP_FILE="\${BACKUP_DIR}/backup_\${DATE}.sql.gz"
 
 mkdir -p \$BACKUP_DIR
 
-# Backup database
-mysqldump -u zewedjobs_user -p"$DB_PASSWORD" zewedjobs_admin | gzip > \$BACKUP_FILE
+# Backup database: full on Sundays, incremental on other days (see telegram-bot/backup.py)
+if [ "\$(date +%u)" = "7" ]; then BACKUP_TYPE=full; else BACKUP_TYPE=incremental; fi
+cd $APP_DIR/telegram-bot && BACKUP_DIR="\$BACKUP_DIR/database" venv/bin/python backup.py \$BACKUP_TYPE
+BACKUP_FILE="\$BACKUP_DIR/database (\$BACKUP_TYPE)"
 
 # Backup application files
 tar -czf \${BACKUP_DIR}/app_backup_\${DATE}.tar.gz \
@@ -364,8 +365,8 @@ tar -czf \${BACKUP_DIR}/app_backup_\${DATE}.tar.gz \
     --exclude="*.log" \
     $APP_DIR
 
-# Keep only last 30 days of backups
-find \$BACKUP_DIR -name "*.gz" -mtime +30 -delete
+# Keep only last 30 days of application backups (backup.py prunes database chains)
+find \$BACKUP_DIR -maxdepth 1 -name "*.gz" -mtime +30 -delete
 
 # Log backup
 echo "\$(date): Backup completed - \${BACKUP_FILE}" >> $APP_DIR/backup.log
@@ -0,0 +1,18 @@
+-- Migration 001: retention checkpoints
+-- Needed by telegram-bot/retention.py on databases created before this table
+-- was added to schema.sql. Archive tables (<table>_archive) are created by
+-- the retention engine itself on first use.
+
+USE zewedjobs_admin;
+
+CREATE TABLE IF NOT EXISTS retention_checkpoints (
+    table_name VARCHAR(64) PRIMARY KEY,
+    last_id BIGINT DEFAULT 0,
+    cutoff DATETIME NOT NULL,
+    rows_archived BIGINT DEFAULT 0,
+    rows_deleted BIGINT DEFAULT 0,
+    status ENUM('running', 'completed') DEFAULT 'running',
+    started_at DATETIME,
+    completed_at DATETIME,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
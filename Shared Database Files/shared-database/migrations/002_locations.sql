@@ -0,0 +1,218 @@
+-- Migration 002: canonical locations
+-- Adds the locations/location_aliases tables, a location_id column on jobs,
+-- users and job_alerts, the triggers that fill it from exact aliases, and
+-- switches GetActiveJobs from LIKE '%...%' to the indexed id. Afterwards run
+-- `python locations.py backfill` from telegram-bot/ to resolve the remaining
+-- spellings with the fuzzy matcher.
+
+USE zewedjobs_admin;
+
+-- Locations Table (canonical cities; see telegram-bot/locations.py)
+CREATE TABLE IF NOT EXISTS locations (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    name_am VARCHAR(100),
+    region VARCHAR(100),
+    is_remote BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Location Aliases Table (English and Amharic spellings, stored lowercase)
+CREATE TABLE IF NOT EXISTS location_aliases (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    location_id INT NOT NULL,
+    alias VARCHAR(100) NOT NULL,
+    language ENUM('en', 'am') DEFAULT 'en',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_location_alias (alias),
+    INDEX idx_alias_location (location_id),
+    FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Canonical locations and their common spellings
+INSERT IGNORE INTO locations (id, name, name_am, region, is_remote) VALUES
+(1, 'Addis Ababa', 'አዲስ አበባ', 'Addis Ababa', FALSE),
+(2, 'Adama', 'አዳማ', 'Oromia', FALSE),
+(3, 'Bahir Dar', 'ባሕር ዳር', 'Amhara', FALSE),
+(4, 'Hawassa', 'ሀዋሳ', 'Sidama', FALSE),
+(5, 'Mekelle', 'መቐለ', 'Tigray', FALSE),
+(6, 'Dire Dawa', 'ድሬ ዳዋ', 'Dire Dawa', FALSE),
+(7, 'Gondar', 'ጎንደር', 'Amhara', FALSE),
+(8, 'Jimma', 'ጅማ', 'Oromia', FALSE),
+(9, 'Dessie', 'ደሴ', 'Amhara', FALSE),
+(10, 'Harar', 'ሐረር', 'Harari', FALSE),
+(11, 'Jijiga', 'ጅጅጋ', 'Somali', FALSE),
+(12, 'Arba Minch', 'አርባ ምንጭ', 'South Ethiopia', FALSE),
+(13, 'Debre Birhan', 'ደብረ ብርሃን', 'Amhara', FALSE),
+(14, 'Shashamane', 'ሻሸመኔ', 'Oromia', FALSE),
+(15, 'Remote', 'ከርቀት', NULL, TRUE);
+
+INSERT IGNORE INTO location_aliases (location_id, alias, language) VALUES
+(1, 'addis ababa', 'en'), (1, 'addis abeba', 'en'), (1, 'addis', 'en'), (1, 'aa', 'en'), (1, 'a.a', 'en'),
+(1, 'a.a.', 'en'), (1, 'finfinne', 'en'), (1, 'addis ababa, ethiopia', 'en'), (1, 'bole', 'en'),
+(1, 'kirkos', 'en'), (1, 'yeka', 'en'), (1, 'arada', 'en'), (1, 'lideta', 'en'), (1, 'gulele', 'en'),
+(1, 'kolfe keranio', 'en'), (1, 'nifas silk lafto', 'en'), (1, 'akaky kaliti', 'en'), (1, 'addis ketema', 'en'),
+(1, 'አዲስ አበባ', 'am'), (1, 'አዲስ', 'am'), (1, 'አ.አ', 'am'), (1, 'ቦሌ', 'am'),
+(2, 'adama', 'en'), (2, 'nazret', 'en'), (2, 'nazreth', 'en'), (2, 'nazareth', 'en'), (2, 'አዳማ', 'am'), (2, 'ናዝሬት', 'am'),
+(3, 'bahir dar', 'en'), (3, 'bahirdar', 'en'), (3, 'bahar dar', 'en'), (3, 'ባሕር ዳር', 'am'), (3, 'ባህር ዳር', 'am'),
+(4, 'hawassa', 'en'), (4, 'awassa', 'en'), (4, 'awasa', 'en'), (4, 'ሀዋሳ', 'am'), (4, 'አዋሳ', 'am'),
+(5, 'mekelle', 'en'), (5, 'mekele', 'en'), (5, 'makelle', 'en'), (5, 'መቐለ', 'am'), (5, 'መቀሌ', 'am'),
+(6, 'dire dawa', 'en'), (6, 'diredawa', 'en'), (6, 'dire', 'en'), (6, 'ድሬ ዳዋ', 'am'), (6, 'ድሬዳዋ', 'am'),
+(7, 'gondar', 'en'), (7, 'gonder', 'en'), (7, 'ጎንደር', 'am'),
+(8, 'jimma', 'en'), (8, 'jima', 'en'), (8, 'ጅማ', 'am'),
+(9, 'dessie', 'en'), (9, 'dese', 'en'), (9, 'ደሴ', 'am'),
+(10, 'harar', 'en'), (10, 'harer', 'en'), (10, 'ሐረር', 'am'), (10, 'ሀረር', 'am'),
+(11, 'jijiga', 'en'), (11, 'ጅጅጋ', 'am'),
+(12, 'arba minch', 'en'), (12, 'arbaminch', 'en'), (12, 'አርባ ምንጭ', 'am'),
+(13, 'debre birhan', 'en'), (13, 'debre berhan', 'en'), (13, 'ደብረ ብርሃን', 'am'),
+(14, 'shashamane', 'en'), (14, 'shashemene', 'en'), (14, 'ሻሸመኔ', 'am'),
+(15, 'remote', 'en'), (15, 'work from home', 'en'), (15, 'wfh', 'en'), (15, 'online', 'en'), (15, 'anywhere', 'en'),
+(15, 'ከርቀት', 'am'), (15, 'ከቤት', 'am');
+
+ALTER TABLE jobs
+    ADD COLUMN location_id INT AFTER location,
+    ADD INDEX idx_job_location_id (location_id, status, created_at),
+    ADD FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE SET NULL;
+
+ALTER TABLE users
+    ADD COLUMN location_id INT AFTER location,
+    ADD INDEX idx_user_location_id (location_id),
+    ADD FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE SET NULL;
+
+ALTER TABLE job_alerts
+    ADD COLUMN location_id INT AFTER location,
+    ADD INDEX idx_alert_location_id (location_id),
+    ADD FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE SET NULL;
+
+DROP FUNCTION IF EXISTS ResolveLocationId;
+DROP TRIGGER IF EXISTS before_job_insert_location;
+DROP TRIGGER IF EXISTS before_job_update_location;
+DROP TRIGGER IF EXISTS before_user_insert_location;
+DROP TRIGGER IF EXISTS before_user_update_location;
+DROP TRIGGER IF EXISTS before_alert_insert_location;
+DROP TRIGGER IF EXISTS before_alert_update_location;
+
+-- Location ids are resolved from exact aliases on every write; spellings
+-- only the fuzzy matcher understands are filled in by locations.py
+DELIMITER //
+
+CREATE FUNCTION ResolveLocationId(p_location VARCHAR(100)) RETURNS INT
+READS SQL DATA
+BEGIN
+    DECLARE v_location_id INT DEFAULT NULL;
+    IF p_location IS NULL OR TRIM(p_location) = '' THEN
+        RETURN NULL;
+    END IF;
+    SELECT location_id INTO v_location_id
+    FROM location_aliases
+    WHERE alias = LOWER(TRIM(p_location))
+    LIMIT 1;
+    RETURN v_location_id;
+END //
+
+CREATE TRIGGER before_job_insert_location
+BEFORE INSERT ON jobs
+FOR EACH ROW
+BEGIN
+    IF NEW.location_id IS NULL THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_job_update_location
+BEFORE UPDATE ON jobs
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.location <=> OLD.location) AND NEW.location_id <=> OLD.location_id THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_user_insert_location
+BEFORE INSERT ON users
+FOR EACH ROW
+BEGIN
+    IF NEW.location_id IS NULL THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_user_update_location
+BEFORE UPDATE ON users
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.location <=> OLD.location) AND NEW.location_id <=> OLD.location_id THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_alert_insert_location
+BEFORE INSERT ON job_alerts
+FOR EACH ROW
+BEGIN
+    IF NEW.location_id IS NULL THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_alert_update_location
+BEFORE UPDATE ON job_alerts
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.location <=> OLD.location) AND NEW.location_id <=> OLD.location_id THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+DELIMITER ;
+
+-- Exact aliases for existing rows
+UPDATE jobs SET location_id = ResolveLocationId(location) WHERE location_id IS NULL AND location IS NOT NULL;
+UPDATE users SET location_id = ResolveLocationId(location) WHERE location_id IS NULL AND location IS NOT NULL;
+UPDATE job_alerts SET location_id = ResolveLocationId(location) WHERE location_id IS NULL AND location IS NOT NULL;
+
+DROP PROCEDURE IF EXISTS GetActiveJobs;
+
+DELIMITER //
+
+CREATE PROCEDURE GetActiveJobs(IN p_category VARCHAR(50), IN p_location VARCHAR(100))
+BEGIN
+    -- Known spellings filter on idx_job_location_id, anything else is a prefix
+    -- match idx_job_location can serve ("Adama" finds "Adama, Oromia"). Separate
+    -- statements instead of an OR chain so each branch can use its index.
+    DECLARE v_location_id INT DEFAULT NULL;
+    SET v_location_id = ResolveLocationId(p_location);
+
+    IF v_location_id IS NOT NULL THEN
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.location_id = v_location_id
+          AND j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    ELSEIF p_location IS NOT NULL AND TRIM(p_location) <> '' THEN
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.location LIKE CONCAT(REPLACE(REPLACE(REPLACE(TRIM(p_location), '\\', '\\\\'), '%', '\\%'), '_', '\\_'), '%')
+          AND j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    ELSE
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    END IF;
+END //
+
+DELIMITER ;
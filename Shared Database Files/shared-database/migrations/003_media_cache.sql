@@ -0,0 +1,34 @@
+-- Migration 003: media file_id cache
+-- Stores the Telegram file_id of every company logo the bot has uploaded, so
+-- job cards reuse it instead of uploading the image again (see
+-- telegram-bot/media_cache.py), and drops the rows when a logo changes.
+
+USE zewedjobs_admin;
+
+CREATE TABLE IF NOT EXISTS media_cache (
+    source VARCHAR(255) NOT NULL,
+    variant VARCHAR(20) NOT NULL,
+    file_id VARCHAR(255) NOT NULL,
+    file_unique_id VARCHAR(64),
+    width INT,
+    height INT,
+    file_size INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, variant)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+DROP TRIGGER IF EXISTS after_company_update;
+
+DELIMITER //
+
+CREATE TRIGGER after_company_update
+AFTER UPDATE ON companies
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.logo <=> NEW.logo) AND OLD.logo IS NOT NULL THEN
+        DELETE FROM media_cache WHERE source = OLD.logo;
+    END IF;
+END //
+
+DELIMITER ;
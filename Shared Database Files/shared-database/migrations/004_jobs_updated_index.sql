@@ -0,0 +1,8 @@
+-- Migration 004: index on jobs.updated_at
+-- The bot refreshes its inline search snapshot (telegram-bot/inline_search.py)
+-- with `WHERE updated_at >= <last seen>` every minute; without the index that
+-- is a full scan of jobs.
+
+USE zewedjobs_admin;
+
+CREATE INDEX idx_job_updated ON jobs(updated_at);
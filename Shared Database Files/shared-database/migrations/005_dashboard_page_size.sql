@@ -0,0 +1,9 @@
+-- Migration 005: dashboard page size setting
+-- The admin dashboard's job list used the bot's `jobs_per_page` as its
+-- default limit; it now has a setting of its own (see
+-- telegram-bot/web_dashboard.py).
+
+USE zewedjobs_admin;
+
+INSERT IGNORE INTO settings (setting_key, setting_value, setting_type, description, category, is_public) VALUES
+('dashboard_page_size', '100', 'integer', 'Rows per page in the admin dashboard job list', 'display', FALSE);
@@ -0,0 +1,54 @@
+-- Migration 006: GetActiveJobs location fallback
+-- Unresolved locations matched only the exact text, and the
+-- `location_id = ... OR location = ...` chain kept MySQL from using
+-- idx_job_location_id. The procedure now runs one statement per case:
+-- the indexed id for known spellings, otherwise a prefix LIKE (the same
+-- fallback as get_jobs in telegram-bot/bot.py).
+
+USE zewedjobs_admin;
+
+DROP PROCEDURE IF EXISTS GetActiveJobs;
+
+DELIMITER //
+
+CREATE PROCEDURE GetActiveJobs(IN p_category VARCHAR(50), IN p_location VARCHAR(100))
+BEGIN
+    -- Known spellings filter on idx_job_location_id, anything else is a prefix
+    -- match idx_job_location can serve ("Adama" finds "Adama, Oromia"). Separate
+    -- statements instead of an OR chain so each branch can use its index.
+    DECLARE v_location_id INT DEFAULT NULL;
+    SET v_location_id = ResolveLocationId(p_location);
+
+    IF v_location_id IS NOT NULL THEN
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.location_id = v_location_id
+          AND j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    ELSEIF p_location IS NOT NULL AND TRIM(p_location) <> '' THEN
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.location LIKE CONCAT(REPLACE(REPLACE(REPLACE(TRIM(p_location), '\\', '\\\\'), '%', '\\%'), '_', '\\_'), '%')
+          AND j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    ELSE
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    END IF;
+END //
+
+DELIMITER ;
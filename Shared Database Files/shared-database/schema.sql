@@ -49,6 +49,28 @@ CREATE TABLE companies (
     FOREIGN KEY (created_by) REFERENCES admin_users(id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Locations Table (canonical cities; see telegram-bot/locations.py)
+CREATE TABLE locations (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    name_am VARCHAR(100),
+    region VARCHAR(100),
+    is_remote BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Location Aliases Table (English and Amharic spellings, stored lowercase)
+CREATE TABLE location_aliases (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    location_id INT NOT NULL,
+    alias VARCHAR(100) NOT NULL,
+    language ENUM('en', 'am') DEFAULT 'en',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_location_alias (alias),
+    INDEX idx_alias_location (location_id),
+    FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- Jobs Table
 CREATE TABLE jobs (
     id INT PRIMARY KEY AUTO_INCREMENT,
@@ -56,6 +78,7 @@ CREATE TABLE jobs (
     description TEXT NOT NULL,
     requirements TEXT,
     location VARCHAR(100),
+    location_id INT,
     salary_min DECIMAL(12,2),
     salary_max DECIMAL(12,2),
     salary_currency VARCHAR(3) DEFAULT 'ETB',
@@ -76,11 +99,14 @@ CREATE TABLE jobs (
     INDEX idx_job_company (company_id),
     INDEX idx_job_category (category),
     INDEX idx_job_location (location),
+    INDEX idx_job_location_id (location_id, status, created_at),
     INDEX idx_job_type (job_type),
     INDEX idx_job_deadline (deadline),
+    INDEX idx_job_updated (updated_at),
     FULLTEXT idx_job_search (title, description, requirements, location),
     FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE,
-    FOREIGN KEY (created_by) REFERENCES admin_users(id) ON DELETE SET NULL
+    FOREIGN KEY (created_by) REFERENCES admin_users(id) ON DELETE SET NULL,
+    FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Users Table (Telegram users)
@@ -98,6 +124,7 @@ CREATE TABLE users (
     skills TEXT,
     resume_file VARCHAR(255),
     location VARCHAR(100),
+    location_id INT,
     expected_salary_min DECIMAL(12,2),
     expected_salary_max DECIMAL(12,2),
     user_type ENUM('job_seeker', 'employer', 'admin') DEFAULT 'job_seeker',
@@ -110,7 +137,9 @@ CREATE TABLE users (
     INDEX idx_user_telegram_id (telegram_id),
     INDEX idx_user_type (user_type),
     INDEX idx_user_status (status),
-    INDEX idx_user_location (location)
+    INDEX idx_user_location (location),
+    INDEX idx_user_location_id (location_id),
+    FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Applications Table
@@ -137,6 +166,7 @@ CREATE TABLE applications (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Messages Table (Bot conversations)
+-- Converted to monthly partitions by telegram-bot/partitioning.py migrate
 CREATE TABLE messages (
     id INT PRIMARY KEY AUTO_INCREMENT,
     user_id INT NOT NULL,
@@ -157,6 +187,7 @@ CREATE TABLE job_alerts (
     user_id INT NOT NULL,
     keywords TEXT,
     location VARCHAR(100),
+    location_id INT,
     category VARCHAR(50),
     job_type VARCHAR(50),
     min_salary DECIMAL(12,2),
@@ -167,7 +198,9 @@ CREATE TABLE job_alerts (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_alert_user (user_id),
     INDEX idx_alert_active (is_active),
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    INDEX idx_alert_location_id (location_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (location_id) REFERENCES locations(id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Saved Jobs Table
@@ -200,6 +233,7 @@ CREATE TABLE admin_logs (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- System Logs Table
+-- Converted to monthly partitions by telegram-bot/partitioning.py migrate
 CREATE TABLE system_logs (
     id INT PRIMARY KEY AUTO_INCREMENT,
     level ENUM('info', 'warning', 'error', 'critical') DEFAULT 'info',
@@ -242,6 +276,33 @@ CREATE TABLE backup_logs (
     INDEX idx_backup_date (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Retention Checkpoints Table (progress of chunked archive-and-delete runs)
+CREATE TABLE retention_checkpoints (
+    table_name VARCHAR(64) PRIMARY KEY,
+    last_id BIGINT DEFAULT 0,
+    cutoff DATETIME NOT NULL,
+    rows_archived BIGINT DEFAULT 0,
+    rows_deleted BIGINT DEFAULT 0,
+    status ENUM('running', 'completed') DEFAULT 'running',
+    started_at DATETIME,
+    completed_at DATETIME,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Media Cache Table (Telegram file_ids of uploaded logos; see telegram-bot/media_cache.py)
+CREATE TABLE media_cache (
+    source VARCHAR(255) NOT NULL,
+    variant VARCHAR(20) NOT NULL,
+    file_id VARCHAR(255) NOT NULL,
+    file_unique_id VARCHAR(64),
+    width INT,
+    height INT,
+    file_size INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, variant)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- Create default admin user (password: admin123)
 INSERT INTO admin_users (username, password_hash, email, full_name, role, status) 
 VALUES (
@@ -262,6 +323,7 @@ INSERT INTO settings (setting_key, setting_value, setting_type, description, cat
 ('support_email', 'support@zewedjobs.com', 'string', 'Support email', 'general', TRUE),
 ('default_currency', 'ETB', 'string', 'Default currency', 'finance', TRUE),
 ('jobs_per_page', '20', 'integer', 'Number of jobs per page', 'display', TRUE),
+('dashboard_page_size', '100', 'integer', 'Rows per page in the admin dashboard job list', 'display', FALSE),
 ('max_job_duration', '90', 'integer', 'Maximum job duration in days', 'jobs', FALSE),
 ('application_cooldown', '24', 'integer', 'Hours between applications from same user', 'applications', FALSE),
 ('notification_enabled', 'true', 'boolean', 'Enable notifications', 'notifications', TRUE),
@@ -271,6 +333,120 @@ INSERT INTO settings (setting_key, setting_value, setting_type, description, cat
 ('registration_enabled', 'true', 'boolean', 'Enable user registration', 'users', TRUE),
 ('job_post_enabled', 'true', 'boolean', 'Enable job posting', 'jobs', TRUE);
 
+-- Canonical locations and their common spellings
+INSERT INTO locations (id, name, name_am, region, is_remote) VALUES
+(1, 'Addis Ababa', 'አዲስ አበባ', 'Addis Ababa', FALSE),
+(2, 'Adama', 'አዳማ', 'Oromia', FALSE),
+(3, 'Bahir Dar', 'ባሕር ዳር', 'Amhara', FALSE),
+(4, 'Hawassa', 'ሀዋሳ', 'Sidama', FALSE),
+(5, 'Mekelle', 'መቐለ', 'Tigray', FALSE),
+(6, 'Dire Dawa', 'ድሬ ዳዋ', 'Dire Dawa', FALSE),
+(7, 'Gondar', 'ጎንደር', 'Amhara', FALSE),
+(8, 'Jimma', 'ጅማ', 'Oromia', FALSE),
+(9, 'Dessie', 'ደሴ', 'Amhara', FALSE),
+(10, 'Harar', 'ሐረር', 'Harari', FALSE),
+(11, 'Jijiga', 'ጅጅጋ', 'Somali', FALSE),
+(12, 'Arba Minch', 'አርባ ምንጭ', 'South Ethiopia', FALSE),
+(13, 'Debre Birhan', 'ደብረ ብርሃን', 'Amhara', FALSE),
+(14, 'Shashamane', 'ሻሸመኔ', 'Oromia', FALSE),
+(15, 'Remote', 'ከርቀት', NULL, TRUE);
+
+INSERT INTO location_aliases (location_id, alias, language) VALUES
+(1, 'addis ababa', 'en'), (1, 'addis abeba', 'en'), (1, 'addis', 'en'), (1, 'aa', 'en'), (1, 'a.a', 'en'),
+(1, 'a.a.', 'en'), (1, 'finfinne', 'en'), (1, 'addis ababa, ethiopia', 'en'), (1, 'bole', 'en'),
+(1, 'kirkos', 'en'), (1, 'yeka', 'en'), (1, 'arada', 'en'), (1, 'lideta', 'en'), (1, 'gulele', 'en'),
+(1, 'kolfe keranio', 'en'), (1, 'nifas silk lafto', 'en'), (1, 'akaky kaliti', 'en'), (1, 'addis ketema', 'en'),
+(1, 'አዲስ አበባ', 'am'), (1, 'አዲስ', 'am'), (1, 'አ.አ', 'am'), (1, 'ቦሌ', 'am'),
+(2, 'adama', 'en'), (2, 'nazret', 'en'), (2, 'nazreth', 'en'), (2, 'nazareth', 'en'), (2, 'አዳማ', 'am'), (2, 'ናዝሬት', 'am'),
+(3, 'bahir dar', 'en'), (3, 'bahirdar', 'en'), (3, 'bahar dar', 'en'), (3, 'ባሕር ዳር', 'am'), (3, 'ባህር ዳር', 'am'),
+(4, 'hawassa', 'en'), (4, 'awassa', 'en'), (4, 'awasa', 'en'), (4, 'ሀዋሳ', 'am'), (4, 'አዋሳ', 'am'),
+(5, 'mekelle', 'en'), (5, 'mekele', 'en'), (5, 'makelle', 'en'), (5, 'መቐለ', 'am'), (5, 'መቀሌ', 'am'),
+(6, 'dire dawa', 'en'), (6, 'diredawa', 'en'), (6, 'dire', 'en'), (6, 'ድሬ ዳዋ', 'am'), (6, 'ድሬዳዋ', 'am'),
+(7, 'gondar', 'en'), (7, 'gonder', 'en'), (7, 'ጎንደር', 'am'),
+(8, 'jimma', 'en'), (8, 'jima', 'en'), (8, 'ጅማ', 'am'),
+(9, 'dessie', 'en'), (9, 'dese', 'en'), (9, 'ደሴ', 'am'),
+(10, 'harar', 'en'), (10, 'harer', 'en'), (10, 'ሐረር', 'am'), (10, 'ሀረር', 'am'),
+(11, 'jijiga', 'en'), (11, 'ጅጅጋ', 'am'),
+(12, 'arba minch', 'en'), (12, 'arbaminch', 'en'), (12, 'አርባ ምንጭ', 'am'),
+(13, 'debre birhan', 'en'), (13, 'debre berhan', 'en'), (13, 'ደብረ ብርሃን', 'am'),
+(14, 'shashamane', 'en'), (14, 'shashemene', 'en'), (14, 'ሻሸመኔ', 'am'),
+(15, 'remote', 'en'), (15, 'work from home', 'en'), (15, 'wfh', 'en'), (15, 'online', 'en'), (15, 'anywhere', 'en'),
+(15, 'ከርቀት', 'am'), (15, 'ከቤት', 'am');
+
+-- Location ids are resolved from exact aliases on every write; spellings
+-- only the fuzzy matcher understands are filled in by locations.py
+DELIMITER //
+
+CREATE FUNCTION ResolveLocationId(p_location VARCHAR(100)) RETURNS INT
+READS SQL DATA
+BEGIN
+    DECLARE v_location_id INT DEFAULT NULL;
+    IF p_location IS NULL OR TRIM(p_location) = '' THEN
+        RETURN NULL;
+    END IF;
+    SELECT location_id INTO v_location_id
+    FROM location_aliases
+    WHERE alias = LOWER(TRIM(p_location))
+    LIMIT 1;
+    RETURN v_location_id;
+END //
+
+CREATE TRIGGER before_job_insert_location
+BEFORE INSERT ON jobs
+FOR EACH ROW
+BEGIN
+    IF NEW.location_id IS NULL THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_job_update_location
+BEFORE UPDATE ON jobs
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.location <=> OLD.location) AND NEW.location_id <=> OLD.location_id THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_user_insert_location
+BEFORE INSERT ON users
+FOR EACH ROW
+BEGIN
+    IF NEW.location_id IS NULL THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_user_update_location
+BEFORE UPDATE ON users
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.location <=> OLD.location) AND NEW.location_id <=> OLD.location_id THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_alert_insert_location
+BEFORE INSERT ON job_alerts
+FOR EACH ROW
+BEGIN
+    IF NEW.location_id IS NULL THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+CREATE TRIGGER before_alert_update_location
+BEFORE UPDATE ON job_alerts
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.location <=> OLD.location) AND NEW.location_id <=> OLD.location_id THEN
+        SET NEW.location_id = ResolveLocationId(NEW.location);
+    END IF;
+END //
+
+DELIMITER ;
+
 -- Create sample companies
 INSERT INTO companies (name, email, phone, website, industry, size, description, address, status, verified) VALUES
 ('Ethio Telecom', 'careers@ethiotelecom.et', '+251 11 123 4567', 'https://www.ethiotelecom.et', 'telecom', '1000+', 'Leading telecommunications company in Ethiopia', 'Addis Ababa, Ethiopia', 'active', TRUE),
@@ -318,15 +494,42 @@ DELIMITER //
 
 CREATE PROCEDURE GetActiveJobs(IN p_category VARCHAR(50), IN p_location VARCHAR(100))
 BEGIN
-    SELECT j.*, c.name as company_name
-    FROM jobs j
-    LEFT JOIN companies c ON j.company_id = c.id
-    WHERE j.status = 'active'
-      AND j.deadline >= CURDATE()
-      AND (p_category IS NULL OR j.category = p_category)
-      AND (p_location IS NULL OR j.location LIKE CONCAT('%', p_location, '%'))
-    ORDER BY j.created_at DESC
-    LIMIT 100;
+    -- Known spellings filter on idx_job_location_id, anything else is a prefix
+    -- match idx_job_location can serve ("Adama" finds "Adama, Oromia"). Separate
+    -- statements instead of an OR chain so each branch can use its index.
+    DECLARE v_location_id INT DEFAULT NULL;
+    SET v_location_id = ResolveLocationId(p_location);
+
+    IF v_location_id IS NOT NULL THEN
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.location_id = v_location_id
+          AND j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    ELSEIF p_location IS NOT NULL AND TRIM(p_location) <> '' THEN
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.location LIKE CONCAT(REPLACE(REPLACE(REPLACE(TRIM(p_location), '\\', '\\\\'), '%', '\\%'), '_', '\\_'), '%')
+          AND j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    ELSE
+        SELECT j.*, c.name as company_name
+        FROM jobs j
+        LEFT JOIN companies c ON j.company_id = c.id
+        WHERE j.status = 'active'
+          AND j.deadline >= CURDATE()
+          AND (p_category IS NULL OR j.category = p_category)
+        ORDER BY j.created_at DESC
+        LIMIT 100;
+    END IF;
 END //
 
 CREATE PROCEDURE GetUserApplications(IN p_user_id INT)
@@ -382,6 +585,16 @@ BEGIN
     END IF;
 END //
 
+-- A new logo gets uploaded again; the old one's file_ids are dropped
+CREATE TRIGGER after_company_update
+AFTER UPDATE ON companies
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.logo <=> NEW.logo) AND OLD.logo IS NOT NULL THEN
+        DELETE FROM media_cache WHERE source = OLD.logo;
+    END IF;
+END //
+
 DELIMITER ;
 
 -- Create events for maintenance
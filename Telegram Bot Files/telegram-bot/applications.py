@@ -0,0 +1,310 @@
+"""
+ZewedJobs application intake
+Accepts "Apply Now" taps in memory and inserts them in batches
+
+  1. the job must still be open (checked against the jobs table, briefly cached)
+  2. duplicate check against the user's applied jobs, loaded from the
+     applications table when the user is first seen and kept for a while
+  3. cooldown between applications from the same user (`application_cooldown`)
+  4. accepted applications go onto a bounded queue; the user is answered
+     immediately
+  5. a single writer drains the queue into multi-row INSERT statements on its
+     own connection in a worker thread, so bursts never hold up the bot's
+     shared connection or the event loop
+
+A batch that fails is retried with backoff. If it keeps failing, its rows
+are retried one by one, and the ones that still fail are rolled back (the
+user may apply again, the cooldown is restored) and reported to `on_failed`
+so the user can be told.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+COOLDOWN = 'cooldown'
+CLOSED = 'closed'
+BUSY = 'busy'
+
+USER_APPLICATIONS_QUERY = """
+SELECT job_id, UNIX_TIMESTAMP(applied_at) AS applied_at
+FROM applications
+WHERE user_id = %s
+"""
+
+JOB_OPEN_QUERY = """
+SELECT id FROM jobs
+WHERE id = %s AND status = 'active' AND (deadline IS NULL OR deadline >= CURDATE())
+"""
+
+# Duplicates are no-ops; unlike INSERT IGNORE this still fails on a missing job or user
+INSERT_QUERY = """
+INSERT INTO applications (job_id, user_id, status, applied_at) VALUES {values}
+ON DUPLICATE KEY UPDATE job_id = job_id
+"""
+
+
+class UserApplications:
+    """Jobs a user has applied for and when they last applied"""
+
+    __slots__ = ('jobs', 'last_applied')
+
+    def __init__(self):
+        self.jobs: Set[int] = set()
+        self.last_applied = 0.0
+
+
+class Submission:
+    """One accepted application waiting for the writer"""
+
+    __slots__ = ('job_id', 'user_id', 'chat_id', 'accepted_at', 'previous_applied')
+
+    def __init__(self, job_id: int, user_id: int, chat_id: Optional[int], accepted_at: float, previous_applied: float):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.accepted_at = accepted_at
+        self.previous_applied = previous_applied
+
+
+class ApplicationPipeline:
+    """Duplicate/cooldown checks in memory, batched inserts in the background"""
+
+    def __init__(self, db_config: dict, fetch: Callable, cooldown_hours: Callable[[], float],
+                 batch_size: int = 100, batch_wait: float = 0.5, queue_size: int = 10000,
+                 max_attempts: int = 3, retry_delay: float = 1.0,
+                 max_users: int = 50000, user_ttl: float = 3600.0, job_ttl: float = 60.0):
+        self.db_config = db_config
+        self.fetch = fetch
+        self.cooldown_hours = cooldown_hours
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        # on_failed(submission) is awaited for applications that could not be saved
+        self.on_failed: Optional[Callable[[Submission], Awaitable]] = None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Expired users are reloaded from the table; queued rows are kept in _pending
+        self._users = TTLCache(max_size=max_users, ttl=user_ttl)
+        self._open_jobs = TTLCache(max_size=10000, ttl=job_ttl)
+        self._pending: Dict[Tuple[int, int], Submission] = {}
+        self._connection = None
+        self._connection_lock = threading.Lock()
+        self._worker: Optional[asyncio.Task] = None
+        self.inserted = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    # Intake
+    def _load_user(self, user_id: int) -> Optional[UserApplications]:
+        """A user's applied jobs and cooldown clock; None when the database is unavailable"""
+        state = self._users.get(user_id)
+        if state is not None:
+            return state
+        rows = self.fetch(USER_APPLICATIONS_QUERY, (user_id,))
+        if rows is None:
+            return None
+        state = UserApplications()
+        for row in rows:
+            state.jobs.add(row['job_id'])
+            state.last_applied = max(state.last_applied, float(row['applied_at'] or 0))
+        # Accepted but not yet inserted (copied: this runs on a worker thread)
+        for submission in list(self._pending.values()):
+            if submission.user_id == user_id:
+                state.jobs.add(submission.job_id)
+                state.last_applied = max(state.last_applied, submission.accepted_at)
+        self._users.set(user_id, state)
+        return state
+
+    def _job_open(self, job_id: int) -> Optional[bool]:
+        """Whether the job still takes applications; None when the database is unavailable"""
+        is_open = self._open_jobs.get(job_id)
+        if is_open is None:
+            rows = self.fetch(JOB_OPEN_QUERY, (job_id,))
+            if rows is None:
+                return None
+            is_open = bool(rows)
+            self._open_jobs.set(job_id, is_open)
+        return is_open
+
+    def _lookup(self, job_id: int, user_id: int) -> Tuple[Optional[bool], Optional[UserApplications]]:
+        is_open = self._job_open(job_id)
+        return is_open, self._load_user(user_id) if is_open else None
+
+    async def submit(self, job_id: int, user_id: int, chat_id: Optional[int] = None) -> str:
+        """Check and enqueue one application; returns ACCEPTED, DUPLICATE, COOLDOWN, CLOSED or BUSY"""
+        # Cache misses query the database, so the lookups run on a worker thread
+        is_open, state = await asyncio.to_thread(self._lookup, job_id, user_id)
+        if is_open is None:
+            return BUSY
+        if not is_open:
+            return CLOSED
+        if state is None:
+            return BUSY
+        # Nothing below awaits, so the checks and the enqueue happen together
+        if job_id in state.jobs:
+            return DUPLICATE
+
+        now = time.time()
+        cooldown = self.cooldown_hours() * 3600
+        if cooldown > 0 and now - state.last_applied < cooldown:
+            return COOLDOWN
+
+        submission = Submission(job_id, user_id, chat_id, now, state.last_applied)
+        try:
+            self._queue.put_nowait(submission)
+        except asyncio.QueueFull:
+            return BUSY
+        self._pending[(job_id, user_id)] = submission
+        state.jobs.add(job_id)
+        state.last_applied = now
+        return ACCEPTED
+
+    def retry_after(self, user_id: int) -> float:
+        """Seconds until the user's cooldown ends"""
+        state = self._users.get(user_id)
+        last_applied = state.last_applied if state else 0.0
+        return max(0.0, last_applied + self.cooldown_hours() * 3600 - time.time())
+
+    def _roll_back(self, submission: Submission):
+        """Let the user apply again and give back the cooldown the application used"""
+        state = self._users.get(submission.user_id)
+        if state is None:
+            return
+        state.jobs.discard(submission.job_id)
+        if state.last_applied == submission.accepted_at:
+            state.last_applied = submission.previous_applied
+
+    # Writer
+    def _insert(self, batch: List[Submission]) -> int:
+        """Insert one batch; the unique key turns races with other writers into no-ops"""
+        import mysql.connector
+        from mysql.connector import Error
+
+        with self._connection_lock:
+            if not self._connection or not self._connection.is_connected():
+                self._connection = mysql.connector.connect(**self.db_config)
+            cursor = self._connection.cursor()
+            try:
+                values = ', '.join(["(%s, %s, 'pending', NOW())"] * len(batch))
+                cursor.execute(
+                    INSERT_QUERY.format(values=values),
+                    tuple(value for item in batch for value in (item.job_id, item.user_id))
+                )
+                self._connection.commit()
+                # Rows that already existed count as 0
+                return cursor.rowcount
+            except Error:
+                self._connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    async def _next_batch(self) -> List[Submission]:
+        """Wait for one application, then collect more for up to `batch_wait` seconds"""
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _insert_with_retry(self, batch: List[Submission]) -> Optional[Exception]:
+        """Insert a batch, retrying with exponential backoff; the last error if every attempt failed"""
+        for attempt in range(self.max_attempts):
+            try:
+                self.inserted += await asyncio.to_thread(self._insert, batch)
+                return None
+            except Exception as e:
+                error = e
+                if attempt + 1 < self.max_attempts:
+                    delay = self.retry_delay * 2 ** attempt
+                    logger.warning(f"Inserting {len(batch)} applications failed ({e}), retrying in {delay:g}s")
+                    await asyncio.sleep(delay)
+        return error
+
+    async def _write(self, batch: List[Submission]):
+        try:
+            error = await self._insert_with_retry(batch)
+            if error is None:
+                return
+            failed = batch
+            if len(batch) > 1:
+                # One bad row (a job deleted since it was checked) fails the whole statement
+                failed = []
+                for submission in batch:
+                    try:
+                        self.inserted += await asyncio.to_thread(self._insert, [submission])
+                    except Exception as e:
+                        error = e
+                        failed.append(submission)
+            if failed:
+                logger.error(f"Failed to insert {len(failed)} applications: {error}")
+                await self._reject(failed)
+        finally:
+            for submission in batch:
+                self._pending.pop((submission.job_id, submission.user_id), None)
+                self._queue.task_done()
+
+    async def _reject(self, failed: List[Submission]):
+        self.failed += len(failed)
+        for submission in failed:
+            self._roll_back(submission)
+            if self.on_failed is None:
+                continue
+            try:
+                await self.on_failed(submission)
+            except Exception as e:
+                logger.warning(f"Could not report failed application {submission.job_id}/{submission.user_id}: {e}")
+
+    async def _run(self):
+        while True:
+            await self._write(await self._next_batch())
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0):
+        """Stop the writer and insert whatever is still queued"""
+        if self._worker is not None:
+            # Let the writer finish (and retry) what it holds rather than cancel it mid-batch
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Application writer still busy after {timeout:g}s, stopping it")
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+            if len(batch) >= self.batch_size:
+                await self._write(batch)
+                batch = []
+        if batch:
+            await self._write(batch)
+
+        with self._connection_lock:
+            if self._connection and self._connection.is_connected():
+                self._connection.close()
+            self._connection = None
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+ZewedJobs database backups
+Parallel per-table dumps, incremental backups and chain restores
+
+Every backup is a directory <BACKUP_DIR>/<YYYYmmdd_HHMMSS>-<full|incremental>
+with one compressed dump per table and a manifest.json written last, so a
+directory without a manifest is an interrupted run and is ignored.
+
+  full         every table dumped by its own mysqldump, largest first, across
+               a pool of processes, each piped through zstd/pigz (gzip when
+               neither is installed)
+  incremental  the large append-mostly tables only dump rows past the
+               watermark (id or updated_at) recorded by the previous backup of
+               the chain; the remaining small tables are dumped in full
+
+Each dump is checksummed while it is written and verified after it is closed.
+Runs are recorded in `backup_logs`. A restore replays the chain's full backup
+and then each incremental in order, verifying checksums first.
+
+Tables are dumped in separate transactions, so a backup is consistent per
+table rather than across tables. Incrementals do not carry deletes; rows
+removed by retention after the full backup come back on restore until the
+next full backup. They also miss `jobs.views`: the view counter flush keeps
+`updated_at` unchanged, so a restore has the view counts of the last full
+backup (or of the last real edit of each job) until the next full backup.
+
+Usage: python backup.py full [--jobs 4]
+       python backup.py incremental
+       python backup.py verify [BACKUP_ID]
+       python backup.py restore [BACKUP_ID] [--dry-run]
+       python backup.py list
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import mysql.connector
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+BACKUP_JOBS = int(os.getenv('BACKUP_JOBS', str(min(4, os.cpu_count() or 1))))
+BACKUP_KEEP_FULL = int(os.getenv('BACKUP_KEEP_FULL', '4'))
+
+# Large append-mostly tables -> watermark column for incremental dumps.
+# `id` tables only gain rows; `updated_at` tables are re-dumped as REPLACEs
+# of the rows changed since the last backup (view count flushes do not
+# touch jobs.updated_at, see the module docstring).
+INCREMENTAL_TABLES = {
+    'messages': 'id',
+    'system_logs': 'id',
+    'admin_logs': 'id',
+    'jobs': 'updated_at',
+    'users': 'updated_at',
+}
+
+# Tried in this order; zstd and pigz use every core
+COMPRESSORS = {
+    'zstd': {
+        'ext': '.zst',
+        'compress': ['zstd', '-q', '-T0', '-3', '-c'],
+        'decompress': ['zstd', '-q', '-d', '-c'],
+        'test': ['zstd', '-q', '-t'],
+    },
+    'pigz': {
+        'ext': '.gz',
+        'compress': ['pigz', '-c'],
+        'decompress': ['pigz', '-d', '-c'],
+        'test': ['pigz', '-t'],
+    },
+    'gzip': {
+        'ext': '.gz',
+        'compress': ['gzip', '-c'],
+        'decompress': ['gzip', '-d', '-c'],
+        'test': ['gzip', '-t'],
+    },
+}
+
+ROUTINES = '_routines'
+CHUNK_SIZE = 1024 * 1024
+
+
+def pick_compressor(preferred: Optional[str] = None) -> str:
+    """First installed compressor, honouring BACKUP_COMPRESSOR when set"""
+    preferred = preferred or os.getenv('BACKUP_COMPRESSOR')
+    for name in ([preferred] if preferred else []) + list(COMPRESSORS):
+        if name in COMPRESSORS and shutil.which(COMPRESSORS[name]['compress'][0]):
+            return name
+    raise RuntimeError("No compressor found (install zstd, pigz or gzip)")
+
+
+def decompressor_for(path: str) -> List[str]:
+    """Command that decompresses a dump file to stdout"""
+    if path.endswith('.zst'):
+        return COMPRESSORS['zstd']['decompress']
+    return COMPRESSORS['pigz' if shutil.which('pigz') else 'gzip']['decompress']
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def client_args(db_config: dict) -> List[str]:
+    """Connection options for mysqldump/mysql; the password goes in MYSQL_PWD"""
+    return ['-h', str(db_config['host']), '-P', str(db_config['port']), '-u', str(db_config['user'])]
+
+
+def client_env(db_config: dict) -> Dict[str, str]:
+    return dict(os.environ, MYSQL_PWD=str(db_config.get('password') or ''))
+
+
+# Worker processes
+def dump_table(task: Dict) -> Dict:
+    """mysqldump one table through the compressor into a file, hashing as it writes"""
+    started = time.monotonic()
+    compressor = COMPRESSORS[task['compressor']]
+    with tempfile.TemporaryFile() as dump_errors, tempfile.TemporaryFile() as compress_errors:
+        dump = subprocess.Popen(task['command'], stdout=subprocess.PIPE, stderr=dump_errors, env=task['env'])
+        compress = subprocess.Popen(compressor['compress'], stdin=dump.stdout,
+                                    stdout=subprocess.PIPE, stderr=compress_errors)
+        dump.stdout.close()
+
+        digest = hashlib.sha256()
+        size = 0
+        with open(task['path'], 'wb') as out:
+            for chunk in iter(lambda: compress.stdout.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        for process, errors in ((compress, compress_errors), (dump, dump_errors)):
+            if process.wait() != 0:
+                errors.seek(0)
+                message = errors.read().decode(errors='replace').strip()
+                raise RuntimeError(f"{task['table']}: {process.args[0]} failed: {message}")
+
+    # The checksum covers what reached the disk; the test covers the stream itself
+    sha256 = digest.hexdigest()
+    if file_sha256(task['path']) != sha256:
+        raise RuntimeError(f"{task['table']}: checksum mismatch after writing {task['path']}")
+    subprocess.run(compressor['test'] + [task['path']], check=True, capture_output=True)
+
+    return {
+        'table': task['table'],
+        'file': os.path.basename(task['path']),
+        'sha256': sha256,
+        'bytes': size,
+        'mode': task['mode'],
+        'seconds': round(time.monotonic() - started, 1),
+    }
+
+
+def restore_file(task: Dict) -> Dict:
+    """Pipe one decompressed dump into the mysql client"""
+    started = time.monotonic()
+    with tempfile.TemporaryFile() as errors:
+        decompress = subprocess.Popen(decompressor_for(task['path']) + [task['path']], stdout=subprocess.PIPE)
+        load = subprocess.Popen(task['command'], stdin=decompress.stdout, stderr=errors, env=task['env'])
+        decompress.stdout.close()
+        load.wait()
+        decompress.wait()
+        if decompress.returncode != 0 or load.returncode != 0:
+            errors.seek(0)
+            raise RuntimeError(f"{task['table']}: restore failed: {errors.read().decode(errors='replace').strip()}")
+    return {'table': task['table'], 'seconds': round(time.monotonic() - started, 1)}
+
+
+class BackupManager:
+    """Takes, verifies and restores backups of one database"""
+
+    def __init__(self, db_config: dict, backup_dir: str = BACKUP_DIR, jobs: int = BACKUP_JOBS,
+                 compressor: Optional[str] = None):
+        self.db_config = db_config
+        self.backup_dir = backup_dir
+        self.jobs = max(1, jobs)
+        self.compressor = compressor
+        self.connection = None
+
+    def connect(self):
+        self.connection = mysql.connector.connect(**self.db_config)
+        self.connection.autocommit = True
+
+    def close(self):
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+        self.connection = None
+
+    def _fetch(self, query: str, params: tuple = ()) -> List[Dict]:
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _execute(self, query: str, params: tuple = ()) -> int:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.lastrowid
+        finally:
+            cursor.close()
+
+    # backup_logs
+    def _log_start(self, backup_type: str, name: str) -> Optional[int]:
+        try:
+            return self._execute(
+                "INSERT INTO backup_logs (backup_type, filename, status) VALUES (%s, %s, 'in_progress')",
+                (backup_type, name)
+            )
+        except Error as e:
+            logger.warning(f"Could not record backup start: {e}")
+            return None
+
+    def _log_finish(self, log_id: Optional[int], status: str, file_size: int, message: str):
+        if log_id is None:
+            return
+        try:
+            self._execute(
+                "UPDATE backup_logs SET status = %s, file_size = %s, message = %s, completed_at = NOW() "
+                "WHERE id = %s",
+                (status, file_size, message, log_id)
+            )
+        except Error as e:
+            logger.warning(f"Could not record backup result: {e}")
+
+    # Manifests
+    def backups(self) -> List[Dict]:
+        """Manifests of every completed backup, oldest first"""
+        manifests = []
+        if not os.path.isdir(self.backup_dir):
+            return manifests
+        for name in sorted(os.listdir(self.backup_dir)):
+            try:
+                with open(os.path.join(self.backup_dir, name, 'manifest.json')) as f:
+                    manifests.append(json.load(f))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        return manifests
+
+    def chain(self, backup_id: Optional[str] = None) -> List[Dict]:
+        """Full backup plus its incrementals up to `backup_id` (default: the latest backup)"""
+        manifests = self.backups()
+        if backup_id:
+            ids = [manifest['id'] for manifest in manifests]
+            if backup_id not in ids:
+                raise ValueError(f"Unknown backup: {backup_id}")
+            manifests = manifests[:ids.index(backup_id) + 1]
+        if not manifests:
+            return []
+        base = manifests[-1]['base']
+        return [manifest for manifest in manifests if manifest['base'] == base]
+
+    def _save_manifest(self, directory: str, manifest: Dict):
+        path = os.path.join(directory, 'manifest.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True, default=str)
+        os.replace(path + '.tmp', path)
+
+    # Planning
+    def _tables(self) -> List[Dict]:
+        """Base tables, largest first so the long dumps start early"""
+        return self._fetch(
+            """
+            SELECT TABLE_NAME AS name, COALESCE(DATA_LENGTH + INDEX_LENGTH, 0) AS size
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'
+            ORDER BY size DESC
+            """,
+            (self.db_config['database'],)
+        )
+
+    def _watermark_column(self, table: str) -> Optional[str]:
+        if table in INCREMENTAL_TABLES:
+            return INCREMENTAL_TABLES[table]
+        # Rows moved by the retention engine are never updated again
+        if table.endswith('_archive'):
+            return 'id'
+        return None
+
+    def _high_watermark(self, table: str, column: str):
+        if column == 'id':
+            row = self._fetch(f"SELECT COALESCE(MAX(id), 0) AS high FROM `{table}`")[0]
+            return int(row['high'])
+        # mysqldump runs with --tz-utc, so compare TIMESTAMP columns in UTC
+        row = self._fetch("SELECT UTC_TIMESTAMP() AS high")[0]
+        return row['high'].strftime('%Y-%m-%d %H:%M:%S')
+
+    def _dump_command(self, table: str, where: Optional[str] = None, column: Optional[str] = None) -> List[str]:
+        command = ['mysqldump'] + client_args(self.db_config) + [
+            '--single-transaction', '--quick', '--skip-lock-tables', '--hex-blob',
+        ]
+        if where:
+            # Rows only: append new ids, replace rows changed since the last backup
+            command += ['--no-create-info', '--skip-triggers', f'--where={where}']
+            command.append('--insert-ignore' if column == 'id' else '--replace')
+        else:
+            command.append('--triggers')
+        return command + [self.db_config['database'], table]
+
+    def _plan(self, previous: Optional[Dict], directory: str, compressor: str) -> List[Dict]:
+        env = client_env(self.db_config)
+        ext = COMPRESSORS[compressor]['ext']
+        tasks = []
+        for table in self._tables():
+            name = table['name']
+            column = self._watermark_column(name)
+            high = self._high_watermark(name, column) if column else None
+            low = (previous or {}).get('tables', {}).get(name, {}).get('watermark')
+
+            where = None
+            if column and low is not None:
+                if column == 'id':
+                    where = f"id > {int(low)} AND id <= {int(high)}"
+                else:
+                    # >= low: rows written in the same second as the last backup are dumped again
+                    where = f"updated_at >= '{low}' AND updated_at < '{high}'"
+
+            tasks.append({
+                'table': name,
+                'mode': 'incremental' if where else 'full',
+                'column': column,
+                'watermark': high,
+                'command': self._dump_command(name, where, column),
+                'path': os.path.join(directory, f"{name}.sql{ext}"),
+                'compressor': compressor,
+                'env': env,
+            })
+
+        # Stored procedures and events, once per backup
+        tasks.append({
+            'table': ROUTINES,
+            'mode': 'full',
+            'column': None,
+            'watermark': None,
+            'command': ['mysqldump'] + client_args(self.db_config) + [
+                '--no-create-info', '--no-data', '--skip-triggers', '--routines', '--events',
+                self.db_config['database'],
+            ],
+            'path': os.path.join(directory, f"{ROUTINES}.sql{ext}"),
+            'compressor': compressor,
+            'env': env,
+        })
+        return tasks
+
+    # Backup
+    def backup(self, backup_type: str = 'full') -> Dict:
+        """Take a full or incremental backup; incremental falls back to full without a base"""
+        previous = None
+        if backup_type == 'incremental':
+            chain = self.chain()
+            if chain:
+                previous = chain[-1]
+            else:
+                logger.info("No full backup to build on, taking a full backup instead")
+                backup_type = 'full'
+
+        started = datetime.now()
+        backup_id = f"{started.strftime('%Y%m%d_%H%M%S')}-{backup_type}"
+        directory = os.path.join(self.backup_dir, backup_id)
+        compressor = pick_compressor(self.compressor)
+
+        self.connect()
+        os.makedirs(directory)
+        log_id = self._log_start(backup_type, backup_id)
+        try:
+            tasks = self._plan(previous, directory, compressor)
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                results = list(executor.map(dump_table, tasks))
+        except Exception as e:
+            self._log_finish(log_id, 'failed', 0, str(e)[:1000])
+            self.close()
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+
+        watermarks = {task['table']: (task['column'], task['watermark']) for task in tasks}
+        manifest = {
+            'id': backup_id,
+            'type': backup_type,
+            'base': previous['base'] if previous else backup_id,
+            'parent': previous['id'] if previous else None,
+            'database': self.db_config['database'],
+            'compressor': compressor,
+            'started_at': started.isoformat(timespec='seconds'),
+            'completed_at': datetime.now().isoformat(timespec='seconds'),
+            'tables': {
+                result['table']: {
+                    **result,
+                    'column': watermarks[result['table']][0],
+                    'watermark': watermarks[result['table']][1],
+                }
+                for result in results
+            },
+        }
+        self._save_manifest(directory, manifest)
+
+        total = sum(result['bytes'] for result in results)
+        incremental = sum(1 for result in results if result['mode'] == 'incremental')
+        summary = (f"{len(results)} files ({incremental} incremental), {total:,} bytes, "
+                   f"{(datetime.now() - started).total_seconds():.0f}s, {compressor}")
+        self._log_finish(log_id, 'success', total, summary)
+        self.close()
+        logger.info(f"Backup {backup_id}: {summary}")
+        return manifest
+
+    def prune(self, keep_full: int = BACKUP_KEEP_FULL) -> List[str]:
+        """Delete whole chains older than the newest `keep_full` full backups"""
+        bases = [manifest['id'] for manifest in self.backups() if manifest['type'] == 'full']
+        expired = set(bases[:-keep_full]) if keep_full > 0 else set()
+        removed = []
+        for manifest in self.backups():
+            if manifest['base'] in expired:
+                shutil.rmtree(os.path.join(self.backup_dir, manifest['id']), ignore_errors=True)
+                removed.append(manifest['id'])
+        if removed:
+            logger.info(f"Pruned {len(removed)} backups")
+        return removed
+
+    # Verify and restore
+    def verify(self, backup_id: Optional[str] = None) -> List[str]:
+        """Checksum every file of a backup chain; returns the problems found"""
+        problems = []
+        for manifest in self.chain(backup_id):
+            directory = os.path.join(self.backup_dir, manifest['id'])
+            for table, entry in manifest['tables'].items():
+                path = os.path.join(directory, entry['file'])
+                if not os.path.exists(path):
+                    problems.append(f"{manifest['id']}/{entry['file']}: missing")
+                elif file_sha256(path) != entry['sha256']:
+                    problems.append(f"{manifest['id']}/{entry['file']}: checksum mismatch")
+        return problems
+
+    def restore(self, backup_id: Optional[str] = None, dry_run: bool = False) -> List[Dict]:
+        """Replay the full backup of a chain, then each incremental in order"""
+        chain = self.chain(backup_id)
+        if not chain:
+            raise ValueError("No backup to restore")
+        problems = self.verify(chain[-1]['id'])
+        if problems:
+            raise RuntimeError(f"Refusing to restore, backup is damaged: {'; '.join(problems)}")
+
+        command = ['mysql'] + client_args(self.db_config) + [self.db_config['database']]
+        env = client_env(self.db_config)
+        results = []
+        for manifest in chain:
+            directory = os.path.join(self.backup_dir, manifest['id'])
+            tasks = [
+                {'table': table, 'path': os.path.join(directory, entry['file']), 'command': command, 'env': env}
+                for table, entry in manifest['tables'].items() if table != ROUTINES
+            ]
+            logger.info(f"Restoring {manifest['id']} ({len(tasks)} tables)")
+            if dry_run:
+                results.append({'backup': manifest['id'], 'tables': len(tasks)})
+                continue
+
+            # Dumps disable foreign key checks, so tables load independently
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                loaded = list(executor.map(restore_file, tasks))
+            if manifest is chain[-1] and ROUTINES in manifest['tables']:
+                restore_file({'table': ROUTINES, 'path': os.path.join(directory, manifest['tables'][ROUTINES]['file']),
+                              'command': command, 'env': env})
+            results.append({
+                'backup': manifest['id'],
+                'tables': len(loaded),
+                'seconds': round(sum(result['seconds'] for result in loaded), 1),
+            })
+        return results
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="ZewedJobs database backups")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for backup_type in ('full', 'incremental'):
+        backup_parser = subparsers.add_parser(backup_type, help=f"Take a {backup_type} backup")
+        backup_parser.add_argument('--no-prune', action='store_true', help="Keep old backup chains")
+        backup_parser.add_argument('--compressor', choices=sorted(COMPRESSORS))
+
+    verify_parser = subparsers.add_parser('verify', help="Check the checksums of a backup chain")
+    verify_parser.add_argument('backup_id', nargs='?')
+
+    restore_parser = subparsers.add_parser('restore', help="Restore a full backup and its incrementals")
+    restore_parser.add_argument('backup_id', nargs='?', help="Restore up to this backup (default: latest)")
+    restore_parser.add_argument('--dry-run', action='store_true', help="Only show what would be restored")
+
+    subparsers.add_parser('list', help="List completed backups")
+
+    parser.add_argument('--backup-dir', default=BACKUP_DIR)
+    parser.add_argument('--jobs', type=int, default=BACKUP_JOBS, help="Tables dumped or restored in parallel")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'zewedjobs_admin'),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASS', ''),
+        'port': os.getenv('DB_PORT', '3306')
+    }
+    manager = BackupManager(db_config, backup_dir=args.backup_dir, jobs=args.jobs,
+                            compressor=getattr(args, 'compressor', None))
+
+    if args.command == 'list':
+        for manifest in manager.backups():
+            size = sum(entry['bytes'] for entry in manifest['tables'].values())
+            print(f"{manifest['id']}  base={manifest['base']}  {len(manifest['tables'])} files  {size:,} bytes")
+    elif args.command == 'verify':
+        problems = manager.verify(args.backup_id)
+        print('\n'.join(problems) or "OK")
+        raise SystemExit(1 if problems else 0)
+    elif args.command == 'restore':
+        print(json.dumps(manager.restore(args.backup_id, dry_run=args.dry_run), indent=2))
+    else:
+        manifest = manager.backup(args.command)
+        if not args.no_prune:
+            manager.prune()
+        print(json.dumps({name: entry['bytes'] for name, entry in manifest['tables'].items()}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
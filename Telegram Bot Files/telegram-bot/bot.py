@@ -5,7 +5,12 @@ A complete job portal bot for the Ethiopian job market
 """
 
 import os
+import json
+import time
+import asyncio
 import logging
+import threading
+from functools import partial
 from typing import Optional, Dict, List
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
@@ -13,16 +18,33 @@ from dotenv import load_dotenv
 # Telegram Bot API
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup,
-    ReplyKeyboardMarkup, KeyboardButton, WebAppInfo
+    ReplyKeyboardMarkup, KeyboardButton, WebAppInfo,
+    InlineQueryResultArticle, InputTextMessageContent
 )
+from telegram.request import HTTPXRequest
 from telegram.ext import (
-    Application, CommandHandler, MessageHandler, 
-    CallbackQueryHandler, ContextTypes, filters
+    Application, ApplicationHandlerStop, CommandHandler, MessageHandler, 
+    CallbackQueryHandler, InlineQueryHandler, ContextTypes, TypeHandler, filters
 )
 
-# Database
-import mysql.connector
-from mysql.connector import Error
+from applications import ApplicationPipeline, ACCEPTED, BUSY, CLOSED, COOLDOWN, DUPLICATE
+from cache import TTLCache
+from callback_router import CallbackRouter
+from db_router import DatabaseRouter
+from error_digest import ErrorAggregator, format_digest
+from health import HealthMonitor, serve_health
+from inline_search import InlineJobIndex
+from locations import LocationIndex, like_prefix
+from log_pipeline import setup_logging, bind_context
+from media_cache import MediaCache
+from profile_cache import ProfileCache, PROFILE_LINE, parse_profile_reply
+from ranking import JobRanker
+from search_query import parse_query, compile_query
+from settings_service import SettingsService
+from similar_jobs import SimilarJobsIndex
+from throttling import FloodControl
+from update_processor import ChatOrderedUpdateProcessor
+from view_counter import ViewCounter
 
 # Load environment variables
 load_dotenv()
@@ -38,39 +60,90 @@ DB_CONFIG = {
     'port': os.getenv('DB_PORT', '3306')
 }
 
-# Setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
+# Flood control: (burst capacity, tokens refilled per second) per command
+THROTTLE_RULES = {
+    'search': (3, 1 / 5),
+    'jobs': (5, 1 / 3),
+    'statistics': (2, 1 / 10),
+}
+THROTTLE_MAX_USERS = int(os.getenv('THROTTLE_MAX_USERS', '10000'))
+THROTTLE_IDLE_SECONDS = float(os.getenv('THROTTLE_IDLE_SECONDS', '600'))
+RESULT_CACHE_SECONDS = float(os.getenv('RESULT_CACHE_SECONDS', '30'))
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', '5000'))
+PROFILE_CACHE_SECONDS = float(os.getenv('PROFILE_CACHE_SECONDS', '300'))
+ERROR_DIGEST_SECONDS = float(os.getenv('ERROR_DIGEST_SECONDS', '300'))
+SIMILAR_JOBS_REFRESH_SECONDS = float(os.getenv('SIMILAR_JOBS_REFRESH_SECONDS', '600'))
+RANKING_TOP_N = int(os.getenv('RANKING_TOP_N', '20'))
+RANKING_REFRESH_SECONDS = float(os.getenv('RANKING_REFRESH_SECONDS', '900'))
+VIEW_FLUSH_SECONDS = float(os.getenv('VIEW_FLUSH_SECONDS', '60'))
+VIEW_DEDUP_SECONDS = float(os.getenv('VIEW_DEDUP_SECONDS', '1800'))
+APPLICATION_BATCH_SIZE = int(os.getenv('APPLICATION_BATCH_SIZE', '100'))
+APPLICATION_QUEUE_SIZE = int(os.getenv('APPLICATION_QUEUE_SIZE', '10000'))
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_REPLICA_HOSTS = os.getenv('DB_REPLICA_HOSTS', '')
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))
+DB_STICKY_SECONDS = float(os.getenv('DB_STICKY_SECONDS', '10'))
+HEALTH_PORT = int(os.getenv('HEALTH_PORT', '0'))
+UPDATE_BACKLOG_LIMIT = int(os.getenv('UPDATE_BACKLOG_LIMIT', '1000'))
+SETTINGS_POLL_SECONDS = float(os.getenv('SETTINGS_POLL_SECONDS', '30'))
+LOCATIONS_REFRESH_SECONDS = float(os.getenv('LOCATIONS_REFRESH_SECONDS', '3600'))
+# Updates handled at once (ordered within each chat); 1 keeps python-telegram-bot's sequential mode
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '32'))
+TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', '64'))
+TELEGRAM_POOL_TIMEOUT = float(os.getenv('TELEGRAM_POOL_TIMEOUT', '10'))
+# Job cards carry the company logo, uploaded once and then sent by file_id
+MEDIA_CARDS = os.getenv('MEDIA_CARDS', 'true').lower() == 'true'
+# Separate card messages per /jobs reply; the rest of the page goes into one list message
+JOB_CARDS_PER_REPLY = int(os.getenv('JOB_CARDS_PER_REPLY', '5'))
+LOGO_MAX_SIZE = int(os.getenv('LOGO_MAX_SIZE', '320'))
+MEDIA_ROOT = os.getenv('MEDIA_ROOT') or None
+INLINE_CACHE_SECONDS = int(os.getenv('INLINE_CACHE_SECONDS', '60'))
+INLINE_REFRESH_SECONDS = float(os.getenv('INLINE_REFRESH_SECONDS', '60'))
+
+# Setup logging (queue-based; file I/O happens on a listener thread)
+log_listener = setup_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    log_file=os.getenv('LOG_FILE', 'bot.log'),
+    max_bytes=int(os.getenv('LOG_MAX_SIZE', str(10 * 1024 * 1024))),
+    backup_count=int(os.getenv('LOG_BACKUP_COUNT', '5')),
+    rotate_when=os.getenv('LOG_ROTATE_WHEN') or None,
+    json_lines=os.getenv('LOG_FORMAT', 'text').lower() == 'json'
 )
 logger = logging.getLogger(__name__)
 
 # Database connection
 class Database:
-    def __init__(self):
-        self.connection = None
-        self.connect()
+    """Pooled connections opened on first use or during warm-up, never at import.
+
+    Reads go to a replica when one is configured and caught up, writes and
+    reads following the user's own writes go to the primary (see db_router.py).
+    """
+    
+    def __init__(self, config: dict, pool_size: int = 5, replica_hosts: str = ''):
+        self.config = config
+        self.pool_size = pool_size
+        self.router = DatabaseRouter(
+            config, replica_hosts, pool_size=pool_size, pool_name='zewedjobs_bot',
+            max_lag=DB_REPLICA_MAX_LAG, sticky_seconds=DB_STICKY_SECONDS,
+            # Concurrent updates can briefly need more connections than the pool holds
+            overflow=UPDATE_CONCURRENCY > 1, pool_options={'pool_reset_session': False}
+        )
+    
+    @property
+    def pool(self):
+        return self.router.primary_pool
     
     def connect(self):
-        try:
-            self.connection = mysql.connector.connect(**DB_CONFIG)
-            logger.info("Database connection established")
-        except Error as e:
-            logger.error(f"Database connection failed: {e}")
-            self.connection = None
+        return self.router.connect()
     
-    def get_connection(self):
-        if self.connection and self.connection.is_connected():
-            return self.connection
-        self.connect()
-        return self.connection
+    def get_connection(self, read: bool = False):
+        """A pooled connection; closing it returns it to the pool"""
+        return self.router.connection(read)
     
     def execute_query(self, query: str, params: tuple = None, fetch_one: bool = False):
-        connection = self.get_connection()
+        from mysql.connector import Error
+        
+        connection = self.get_connection(read=True)
         if not connection:
             return None
         
@@ -89,8 +162,11 @@ class Database:
             return None
         finally:
             cursor.close()
+            connection.close()
     
     def execute_update(self, query: str, params: tuple = None):
+        from mysql.connector import Error
+        
         connection = self.get_connection()
         if not connection:
             return False
@@ -99,6 +175,7 @@ class Database:
         try:
             cursor.execute(query, params or ())
             connection.commit()
+            self.router.mark_write()
             return True
         except Error as e:
             logger.error(f"Update failed: {e}")
@@ -106,14 +183,61 @@ class Database:
             return False
         finally:
             cursor.close()
+            connection.close()
+
+db = Database(DB_CONFIG, pool_size=DB_POOL_SIZE, replica_hosts=DB_REPLICA_HOSTS)
 
-db = Database()
+# Set once the pool is open and caches and indexes are warm
+ready = threading.Event()
+
+flood_control = FloodControl(
+    THROTTLE_RULES,
+    max_users=THROTTLE_MAX_USERS,
+    idle_ttl=THROTTLE_IDLE_SECONDS,
+)
+# Short-lived cache so identical listing/search/stats requests share one query
+result_cache = TTLCache(max_size=512, ttl=RESULT_CACHE_SECONDS)
+profile_cache = ProfileCache(db, max_size=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_SECONDS)
+error_aggregator = ErrorAggregator()
+similar_jobs_index = SimilarJobsIndex(top_k=5)
+job_ranker = JobRanker(top_n=RANKING_TOP_N)
+view_counter = ViewCounter(dedup_seconds=VIEW_DEDUP_SECONDS)
+callback_router = CallbackRouter()
+health_monitor = HealthMonitor()
+# Loaded during warm-up, re-read only when the settings table changes
+settings = SettingsService(db.execute_query, poll_interval=SETTINGS_POLL_SECONDS)
+# Canonical cities and aliases, loaded during warm-up
+location_index = LocationIndex(db.execute_query)
+# file_ids of uploaded company logos, loaded during warm-up
+media_cache = MediaCache(db.execute_query, db.execute_update, max_size=LOGO_MAX_SIZE, media_root=MEDIA_ROOT)
+# Active jobs for inline queries, loaded during warm-up and refreshed from updated_at
+inline_index = InlineJobIndex()
+
+def application_cooldown_hours() -> float:
+    return float(max(0, settings.get_int('application_cooldown', 0)))
+
+def jobs_per_page() -> int:
+    """Page size for job listings and alerts (`jobs_per_page` setting)"""
+    return max(1, settings.get_int('jobs_per_page', 5))
+
+application_pipeline = ApplicationPipeline(
+    DB_CONFIG,
+    fetch=db.execute_query,
+    cooldown_hours=application_cooldown_hours,
+    batch_size=APPLICATION_BATCH_SIZE,
+    queue_size=APPLICATION_QUEUE_SIZE,
+)
 
 # Helper functions
 def get_user(telegram_id: int):
-    """Get user from database by Telegram ID"""
-    query = "SELECT * FROM users WHERE telegram_id = %s"
-    return db.execute_query(query, (telegram_id,), fetch_one=True)
+    """Get user profile by Telegram ID (served from the profile cache)"""
+    return profile_cache.get(telegram_id)
+
+def update_user_profile(telegram_id: int, **fields) -> bool:
+    """Update user profile fields in the database and the profile cache"""
+    if 'location' in fields and 'location_id' not in fields:
+        fields['location_id'] = location_index.resolve(fields['location'])
+    return profile_cache.update(telegram_id, **fields)
 
 def create_user(telegram_id: int, username: str = None, full_name: str = None):
     """Create new user in database"""
@@ -122,7 +246,10 @@ def create_user(telegram_id: int, username: str = None, full_name: str = None):
     VALUES (%s, %s, %s, 'job_seeker', 'active', NOW())
     ON DUPLICATE KEY UPDATE last_seen = NOW()
     """
-    return db.execute_update(query, (telegram_id, username, full_name))
+    created = db.execute_update(query, (telegram_id, username, full_name))
+    # Forget a cached "not registered"
+    profile_cache.invalidate(telegram_id)
+    return created
 
 def get_jobs(limit: int = 10, category: str = None, location: str = None):
     """Get jobs from database with optional filters"""
@@ -138,14 +265,21 @@ def get_jobs(limit: int = 10, category: str = None, location: str = None):
         query += " AND j.category = %s"
         params.append(category)
     
-    if location:
+    # Known spellings become an indexed id lookup; anything else a prefix
+    # match that idx_job_location can still serve ("Adama" finds "Adama, Oromia")
+    location_id = location_index.resolve(location) if location else None
+    if location_id is not None:
+        query += " AND j.location_id = %s"
+        params.append(location_id)
+    elif location:
         query += " AND j.location LIKE %s"
-        params.append(f"%{location}%")
+        params.append(like_prefix(location))
     
     query += " ORDER BY j.created_at DESC LIMIT %s"
     params.append(limit)
     
-    return db.execute_query(query, tuple(params))
+    cache_key = ('jobs', limit, category, location_id or location)
+    return result_cache.get_or_set(cache_key, lambda: db.execute_query(query, tuple(params)))
 
 def get_job_details(job_id: int):
     """Get detailed job information"""
@@ -158,11 +292,157 @@ def get_job_details(job_id: int):
     """
     return db.execute_query(query, (job_id,), fetch_one=True)
 
+def throttle_key(update: Update) -> Optional[str]:
+    """Map an update to the command bucket it is charged against"""
+    if update.callback_query and update.callback_query.data:
+        return callback_router.bucket(update.callback_query.data)
+    
+    message = update.effective_message
+    if message and message.text and message.text.startswith('/'):
+        return message.text.split()[0][1:].split('@')[0].lower()
+    
+    return None
+
+def get_active_job_versions() -> Optional[Dict[int, object]]:
+    """id -> updated_at of every active job, used to detect index changes"""
+    query = """
+    SELECT id, updated_at FROM jobs
+    WHERE status = 'active' AND deadline >= CURDATE()
+    """
+    rows = db.execute_query(query)
+    if rows is None:
+        return None
+    return {row['id']: row['updated_at'] for row in rows}
+
+def get_jobs_for_index(job_ids: Optional[List[int]] = None):
+    """Fields the similar jobs index is built from, for all or some active jobs"""
+    query = """
+    SELECT j.id, j.title, j.requirements, j.category, j.location, j.updated_at,
+           c.name as company_name
+    FROM jobs j
+    LEFT JOIN companies c ON j.company_id = c.id
+    WHERE j.status = 'active' AND j.deadline >= CURDATE()
+    """
+    params = ()
+    if job_ids is not None:
+        if not job_ids:
+            return []
+        query += f" AND j.id IN ({', '.join(['%s'] * len(job_ids))})"
+        params = tuple(job_ids)
+    
+    return db.execute_query(query, params)
+
+def get_jobs_for_ranking(job_ids: Optional[List[int]] = None):
+    """Scoring fields plus card fields of all or some active jobs"""
+    query = """
+    SELECT j.id, j.title, j.requirements, j.category, j.location, j.location_id, j.job_type,
+           j.salary_min, j.salary_max, j.deadline, j.created_at,
+           LEFT(j.description, 150) as description, c.name as company_name, c.logo as company_logo,
+           l.is_remote as location_remote
+    FROM jobs j
+    LEFT JOIN companies c ON j.company_id = c.id
+    LEFT JOIN locations l ON j.location_id = l.id
+    WHERE j.status = 'active' AND j.deadline >= CURDATE()
+    """
+    params = ()
+    if job_ids is not None:
+        if not job_ids:
+            return []
+        query += f" AND j.id IN ({', '.join(['%s'] * len(job_ids))})"
+        params = tuple(job_ids)
+    
+    return db.execute_query(query, params)
+
+def get_jobs_for_inline(changed_since: Optional[datetime] = None):
+    """Card and search fields of active jobs, or of every job changed since a time"""
+    query = """
+    SELECT j.id, j.title, j.category, j.location, j.job_type, j.requirements,
+           j.salary_min, j.salary_max, j.deadline, j.status, j.created_at, j.updated_at,
+           LEFT(j.description, 200) as description, c.name as company_name
+    FROM jobs j
+    LEFT JOIN companies c ON j.company_id = c.id
+    """
+    if changed_since is None:
+        query += " WHERE j.status = 'active' AND j.deadline >= CURDATE()"
+        return db.execute_query(query)
+    
+    # Status changes are included so closed jobs leave the snapshot
+    query += " WHERE j.updated_at >= %s"
+    return db.execute_query(query, (changed_since,))
+
+def get_job_seekers_for_ranking(updated_since: Optional[datetime] = None):
+    """Profiles of active job seekers, optionally only those changed since a time"""
+    query = """
+    SELECT telegram_id, profession, skills, location, location_id, expected_salary_min, expected_salary_max
+    FROM users
+    WHERE user_type = 'job_seeker' AND status = 'active'
+    """
+    params = ()
+    if updated_since is not None:
+        query += " AND updated_at >= %s"
+        params = (updated_since,)
+    
+    return db.execute_query(query, params)
+
 # Bot handlers
+async def bind_log_context(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Tag every log record emitted while handling this update"""
+    user = update.effective_user
+    bind_context(update.update_id, user.id if user else None)
+    db.router.bind(user.id if user else None)
+
+async def maintenance_gate(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """While `maintenance_mode` is on, answer everyone but admins with a notice"""
+    if not settings.get_bool('maintenance_mode'):
+        return
+    user = update.effective_user
+    if user and user.id in ADMIN_IDS:
+        return
+    
+    notice = "🛠 ZewedJobs is down for maintenance. Please try again a little later."
+    if update.callback_query:
+        await update.callback_query.answer(notice, show_alert=True)
+    elif update.effective_message:
+        await update.effective_message.reply_text(notice)
+    
+    raise ApplicationHandlerStop
+
+async def throttle_updates(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Drop updates from users who exceed their rate limits"""
+    user = update.effective_user
+    if not user or user.id in ADMIN_IDS:
+        return
+    
+    # Inline queries come with every keystroke and are answered from memory
+    if update.inline_query:
+        return
+    
+    if flood_control.allow(user.id, throttle_key(update)):
+        return
+    
+    notice = "⏳ Slow down a little and try again in a few seconds."
+    warn = flood_control.should_warn(user.id)
+    if update.callback_query:
+        # Always answer so the button stops spinning; the text only when warning
+        await update.callback_query.answer(notice if warn else None)
+    elif warn and update.effective_message:
+        await update.effective_message.reply_text(notice)
+    
+    raise ApplicationHandlerStop
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send welcome message when /start is issued"""
     user = update.effective_user
-    create_user(user.id, user.username, user.full_name)
+    if settings.get_bool('registration_enabled', True):
+        await asyncio.to_thread(create_user, user.id, user.username, user.full_name)
+    elif not await asyncio.to_thread(get_user, user.id):
+        await update.message.reply_text("🚫 New registrations are closed at the moment. Please check back soon.")
+        return
+    
+    # Deep link from a job shared through inline mode: t.me/<bot>?start=job_<id>
+    if context.args and context.args[0].startswith('job_') and context.args[0][4:].isdigit():
+        await show_job_details(update, context, int(context.args[0][4:]))
+        return
     
     welcome_text = f"""
     👋 *Welcome to ZewedJobs, {user.first_name}!*
@@ -192,10 +472,10 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     
     keyboard = [
-        [InlineKeyboardButton("🔍 Browse Jobs", callback_data="browse_jobs")],
-        [InlineKeyboardButton("📝 Create Profile", callback_data="create_profile")],
+        [InlineKeyboardButton("🔍 Browse Jobs", callback_data=callback_router.encode("browse_jobs"))],
+        [InlineKeyboardButton("📝 Create Profile", callback_data=callback_router.encode("create_profile"))],
         [InlineKeyboardButton("💼 For Employers", callback_data="employer_info")],
-        [InlineKeyboardButton("📊 View Statistics", callback_data="statistics")]
+        [InlineKeyboardButton("📊 View Statistics", callback_data=callback_router.encode("statistics"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
@@ -205,15 +485,47 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
 
+async def send_job_card(message, job: Dict, text: str, reply_markup):
+    """Job card as a captioned logo when the company has one, otherwise as text"""
+    logo = job.get('company_logo')
+    # Photo captions are limited to 1024 characters
+    if MEDIA_CARDS and logo and len(text) <= 1024:
+        sent = await media_cache.reply_photo(message, logo, text, reply_markup=reply_markup, parse_mode='Markdown')
+        if sent:
+            return sent
+    return await message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+def job_list_message(jobs: List[Dict], heading: str):
+    """A page of jobs as one message with View/Apply buttons per job.
+
+    Telegram rate-limits messages per chat, so a page is never sent as
+    one message per job.
+    """
+    text = heading + "\n"
+    keyboard = []
+    for job in jobs:
+        salary = f"ETB {job['salary_min']:,}" if job.get('salary_min') is not None else "Salary not specified"
+        text += f"\n• *{job['title']}* - {job['company_name']}\n  📍 {job['location']} • 💰 {salary}\n"
+        keyboard.append([
+            InlineKeyboardButton(f"📄 #{job['id']} {job['title'][:24]}",
+                                 callback_data=callback_router.encode("view_job", job['id'])),
+            InlineKeyboardButton("📝 Apply", callback_data=callback_router.encode("apply_job", job['id']))
+        ])
+    return text, InlineKeyboardMarkup(keyboard)
+
 async def jobs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show latest job listings"""
-    jobs = get_jobs(limit=5)
+    """Show the user's best-matching jobs, or the latest ones without a ranking"""
+    limit = jobs_per_page()
+    jobs = job_ranker.top_jobs(update.effective_user.id, limit=limit)
+    if not jobs:
+        jobs = await asyncio.to_thread(get_jobs, limit=limit)
     
     if not jobs:
-        await update.message.reply_text("📭 No jobs available at the moment. Check back later!")
+        await update.effective_message.reply_text("📭 No jobs available at the moment. Check back later!")
         return
     
-    for job in jobs:
+    cards, rest = jobs[:JOB_CARDS_PER_REPLY], jobs[JOB_CARDS_PER_REPLY:]
+    for job in cards:
         job_text = f"""
         *{job['title']}*
         
@@ -229,46 +541,51 @@ async def jobs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         keyboard = [
             [
-                InlineKeyboardButton("📄 View Details", callback_data=f"view_job_{job['id']}"),
-                InlineKeyboardButton("📝 Apply Now", callback_data=f"apply_job_{job['id']}")
+                InlineKeyboardButton("📄 View Details", callback_data=callback_router.encode("view_job", job['id'])),
+                InlineKeyboardButton("📝 Apply Now", callback_data=callback_router.encode("apply_job", job['id']))
             ]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        await update.message.reply_text(
-            job_text,
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
+        await send_job_card(update.effective_message, job, job_text, reply_markup)
+    
+    if rest:
+        text, reply_markup = job_list_message(rest, "➕ *More jobs*")
+        await update.effective_message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
 async def search_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Search jobs by keyword"""
+    """Search jobs by keyword and filters"""
     if not context.args:
         await update.message.reply_text(
             "🔍 *Search Jobs*\n\n"
-            "Please specify search keywords:\n"
+            "Please specify search keywords or filters:\n"
             "Example: `/search software engineer addis ababa`\n"
-            "Example: `/search marketing remote`",
+            "Example: `/search type:remote salary:>20000 cat:IT level:entry`\n"
+            "Example: `/search accountant loc:adama`\n\n"
+            "Filters: `salary:` `type:` `cat:` `level:` `loc:`",
             parse_mode='Markdown'
         )
         return
     
     search_query = ' '.join(context.args)
+    parsed = parse_query(search_query, location_index.resolve)
+    if not parsed:
+        await update.message.reply_text(
+            f"❌ Could not understand: *{search_query}*\n\n"
+            "Use words of 3+ letters or filters like `type:remote`.",
+            parse_mode='Markdown'
+        )
+        return
     
-    # Search in database
-    query = """
-    SELECT j.*, c.name as company_name
-    FROM jobs j
-    LEFT JOIN companies c ON j.company_id = c.id
-    WHERE j.status = 'active' 
-      AND j.deadline >= CURDATE()
-      AND (j.title LIKE %s OR j.description LIKE %s OR j.location LIKE %s)
-    ORDER BY j.created_at DESC
-    LIMIT 10
-    """
-    
-    search_pattern = f"%{search_query}%"
-    jobs = db.execute_query(query, (search_pattern, search_pattern, search_pattern))
+    # Same filters and terms share one cached result however they were typed
+    query, params = compile_query(parsed, limit=jobs_per_page())
+    # The query runs on a worker thread so other chats' updates keep moving
+    jobs = await asyncio.to_thread(
+        result_cache.get_or_set,
+        ('search', parsed.shape, tuple(str(param).lower() for param in params)),
+        lambda: db.execute_query(query, params)
+    )
+    search_query = parsed.describe()
     
     if not jobs:
         await update.message.reply_text(
@@ -278,25 +595,50 @@ async def search_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    await update.message.reply_text(f"🔍 Found *{len(jobs)}* jobs for: *{search_query}*", parse_mode='Markdown')
+    text, reply_markup = job_list_message(jobs, f"🔍 Found *{len(jobs)}* jobs for: *{search_query}*")
+    await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+def inline_result(job: Dict, bot_username: str) -> InlineQueryResultArticle:
+    """Shareable card for one job, linking back to its details in the bot"""
+    salary = f"ETB {job['salary_min']:,}" if job['salary_min'] is not None else "Salary not specified"
+    deadline = job['deadline'].strftime('%b %d, %Y') if job['deadline'] else 'Open'
+    job_text = f"""
+    *{job['title']}*
     
-    for job in jobs:
-        job_text = f"""
-        *{job['title']}* - {job['company_name']}
-        📍 {job['location']} • 💰 ETB {job['salary_min']:,}
-        """
-        
-        keyboard = [[
-            InlineKeyboardButton("View Details", callback_data=f"view_job_{job['id']}"),
-            InlineKeyboardButton("Apply", callback_data=f"apply_job_{job['id']}")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(job_text, reply_markup=reply_markup, parse_mode='Markdown')
+    🏢 *Company:* {job['company_name']}
+    📍 *Location:* {job['location']}
+    💰 *Salary:* {salary}
+    📅 *Deadline:* {deadline}
+    
+    {(job['description'] or '')[:150]}...
+    """
+    
+    keyboard = [[InlineKeyboardButton("📄 View & Apply", url=f"https://t.me/{bot_username}?start=job_{job['id']}")]]
+    return InlineQueryResultArticle(
+        id=str(job['id']),
+        title=job['title'],
+        description=f"{job['company_name'] or 'N/A'} • {job['location'] or 'N/A'} • {salary}",
+        input_message_content=InputTextMessageContent(job_text, parse_mode='Markdown'),
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Answer @ZewedJobsBot queries from the in-memory job snapshot"""
+    inline_query = update.inline_query
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    jobs, next_offset = inline_index.search(inline_query.query, offset)
+    
+    await inline_query.answer(
+        [inline_result(job, context.bot.username) for job in jobs],
+        # Nothing cached on Telegram's side until the snapshot is loaded
+        cache_time=INLINE_CACHE_SECONDS if len(inline_index) else 0,
+        is_personal=False,
+        next_offset=next_offset
+    )
 
 async def view_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show user profile"""
-    user = get_user(update.effective_user.id)
+    user = await asyncio.to_thread(get_user, update.effective_user.id)
     
     if not user:
         await update.message.reply_text(
@@ -318,13 +660,13 @@ async def view_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     *Statistics:*
     • Applications: {user.get('applications_count', 0)}
-    • Profile Completion: {calculate_profile_completion(user)}%
+    • Profile Completion: {user['profile_completion']}%
     • Member Since: {user['created_at'].strftime('%b %d, %Y')}
     """
     
     keyboard = [
         [
-            InlineKeyboardButton("✏️ Edit Profile", callback_data="edit_profile"),
+            InlineKeyboardButton("✏️ Edit Profile", callback_data=callback_router.encode("edit_profile")),
             InlineKeyboardButton("📄 My Applications", callback_data="my_applications")
         ],
         [
@@ -352,7 +694,7 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         (SELECT COUNT(*) FROM companies WHERE status = 'active') as active_companies,
         (SELECT COUNT(*) FROM applications WHERE DATE(created_at) = CURDATE()) as today_applications
     """
-    stats = db.execute_query(stats_query, fetch_one=True)
+    stats = await asyncio.to_thread(db.execute_query, stats_query, fetch_one=True)
     
     admin_text = f"""
     👑 *Admin Panel*
@@ -375,50 +717,31 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     keyboard = [
         [
             InlineKeyboardButton("📊 Dashboard", web_app=WebAppInfo(url="https://your-admin-url.com")),
-            InlineKeyboardButton("👥 Users", callback_data="admin_users")
+            InlineKeyboardButton("👥 Users", callback_data=callback_router.encode("admin", "users"))
         ],
         [
-            InlineKeyboardButton("💼 Jobs", callback_data="admin_jobs"),
-            InlineKeyboardButton("🏢 Companies", callback_data="admin_companies")
+            InlineKeyboardButton("💼 Jobs", callback_data=callback_router.encode("admin", "jobs")),
+            InlineKeyboardButton("🏢 Companies", callback_data=callback_router.encode("admin", "companies"))
         ],
         [
-            InlineKeyboardButton("📢 Broadcast", callback_data="admin_broadcast"),
-            InlineKeyboardButton("💾 Backup", callback_data="admin_backup")
+            InlineKeyboardButton("📢 Broadcast", callback_data=callback_router.encode("admin", "broadcast")),
+            InlineKeyboardButton("💾 Backup", callback_data=callback_router.encode("admin", "backup"))
         ]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     await update.message.reply_text(admin_text, reply_markup=reply_markup, parse_mode='Markdown')
 
-async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle button callbacks"""
-    query = update.callback_query
-    await query.answer()
-    
-    data = query.data
-    
-    if data == "browse_jobs":
-        await jobs_command(update, context)
-    elif data.startswith("view_job_"):
-        job_id = int(data.split("_")[-1])
-        await show_job_details(update, context, job_id)
-    elif data == "create_profile":
-        await create_profile(update, context)
-    elif data == "statistics":
-        await show_statistics(update, context)
-    elif data.startswith("admin_"):
-        await handle_admin_action(update, context, data)
-    
-    await query.edit_message_reply_markup(reply_markup=None)
-
 async def show_job_details(update: Update, context: ContextTypes.DEFAULT_TYPE, job_id: int):
     """Show detailed job information"""
-    job = get_job_details(job_id)
+    job = await asyncio.to_thread(get_job_details, job_id)
     
     if not job:
-        await update.callback_query.message.reply_text("❌ Job not found.")
+        await update.effective_message.reply_text("❌ Job not found.")
         return
     
+    view_counter.record(job_id, update.effective_user.id)
+    
     job_text = f"""
     🎯 *Job Details*
     
@@ -448,18 +771,75 @@ async def show_job_details(update: Update, context: ContextTypes.DEFAULT_TYPE, j
     
     keyboard = [
         [
-            InlineKeyboardButton("📝 Apply Now", callback_data=f"apply_job_{job_id}"),
+            InlineKeyboardButton("📝 Apply Now", callback_data=callback_router.encode("apply_job", job_id)),
             InlineKeyboardButton("💾 Save Job", callback_data=f"save_job_{job_id}")
         ],
         [
             InlineKeyboardButton("🏢 View Company", callback_data=f"view_company_{job['company_id']}"),
-            InlineKeyboardButton("🔍 Similar Jobs", callback_data=f"similar_jobs_{job_id}")
+            InlineKeyboardButton("🔍 Similar Jobs", callback_data=callback_router.encode("similar_jobs", job_id))
         ],
-        [InlineKeyboardButton("⬅️ Back to Jobs", callback_data="browse_jobs")]
+        [InlineKeyboardButton("⬅️ Back to Jobs", callback_data=callback_router.encode("browse_jobs"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await update.callback_query.message.reply_text(job_text, reply_markup=reply_markup, parse_mode='Markdown')
+    await update.effective_message.reply_text(job_text, reply_markup=reply_markup, parse_mode='Markdown')
+
+async def show_similar_jobs(update: Update, context: ContextTypes.DEFAULT_TYPE, job_id: int):
+    """Show jobs similar to the given job from the precomputed index"""
+    similar = similar_jobs_index.neighbors(job_id)
+    
+    if not similar:
+        await update.callback_query.message.reply_text("🔍 No similar jobs found right now. Check back later!")
+        return
+    
+    similar_text = "🔍 *Similar Jobs*\n"
+    keyboard = []
+    for position, job in enumerate(similar, 1):
+        similar_text += f"""
+    {position}. *{job['title']}* - {job['company_name'] or 'N/A'}
+    📍 {job['location'] or 'N/A'}
+    """
+        keyboard.append([InlineKeyboardButton(f"📄 {job['title'][:40]}", callback_data=callback_router.encode("view_job", job['id']))])
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    await update.callback_query.message.reply_text(similar_text, reply_markup=reply_markup, parse_mode='Markdown')
+
+async def apply_to_job(update: Update, context: ContextTypes.DEFAULT_TYPE, job_id: int):
+    """Accept an application in memory; the pipeline inserts it in the background"""
+    message = update.callback_query.message
+    user = await asyncio.to_thread(get_user, update.effective_user.id)
+    
+    if not user:
+        await message.reply_text("📝 Please /start the bot and create your profile before applying.")
+        return
+    
+    result = await application_pipeline.submit(job_id, user['id'], chat_id=message.chat_id)
+    
+    if result == ACCEPTED:
+        await message.reply_text(
+            f"✅ *Application received!*\n\nYour application for job #{job_id} has been submitted. "
+            f"We'll notify you when the employer reviews it.",
+            parse_mode='Markdown'
+        )
+    elif result == DUPLICATE:
+        await message.reply_text(f"ℹ️ You have already applied for job #{job_id}.")
+    elif result == CLOSED:
+        await message.reply_text(f"🔒 Job #{job_id} is no longer accepting applications.")
+    elif result == COOLDOWN:
+        hours = application_pipeline.retry_after(user['id']) / 3600
+        await message.reply_text(f"⏳ You can submit your next application in about {max(1, round(hours))} hour(s).")
+    elif result == BUSY:
+        await message.reply_text("⚠️ We're receiving a lot of applications right now. Please try again in a minute.")
+
+async def report_failed_application(bot, submission):
+    """Tell the user an acknowledged application could not be saved"""
+    if submission.chat_id is None:
+        return
+    await bot.send_message(
+        submission.chat_id,
+        f"⚠️ Sorry, your application for job #{submission.job_id} could not be saved. "
+        f"Please tap Apply Now again in a few minutes."
+    )
 
 async def create_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Create or update user profile"""
@@ -497,6 +877,30 @@ async def create_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.callback_query.message.reply_text(profile_text, parse_mode='Markdown')
 
+async def save_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Apply a `Field: value` reply to the create/edit profile prompt"""
+    fields = parse_profile_reply(update.message.text)
+    if not fields:
+        return
+    
+    user = update.effective_user
+    if not await asyncio.to_thread(get_user, user.id):
+        await update.message.reply_text("📝 Please /start the bot first, then send your profile again.")
+        return
+    
+    # Written to the database and the profile cache together
+    if not await asyncio.to_thread(update_user_profile, user.id, **fields):
+        await update.message.reply_text("❌ Could not save your profile right now. Please try again later.")
+        return
+    
+    profile = await asyncio.to_thread(get_user, user.id)
+    await update.message.reply_text(
+        f"✅ *Profile updated* ({len(fields)} fields)\n\n"
+        f"Profile completion: {profile['profile_completion'] if profile else 0}%\n"
+        "Use /profile to review it.",
+        parse_mode='Markdown'
+    )
+
 async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show system statistics"""
     stats_query = """
@@ -506,9 +910,11 @@ async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
         (SELECT COUNT(*) FROM jobs WHERE status = 'active') as active_jobs,
         (SELECT COUNT(*) FROM applications WHERE status = 'pending') as pending_applications,
         (SELECT COUNT(*) FROM applications WHERE status = 'accepted') as accepted_applications,
-        (SELECT COUNT(DISTINCT location) FROM jobs WHERE status = 'active') as locations
+        (SELECT COUNT(DISTINCT COALESCE(location_id, location)) FROM jobs WHERE status = 'active') as locations
     """
-    stats = db.execute_query(stats_query, fetch_one=True)
+    stats = await asyncio.to_thread(
+        result_cache.get_or_set, ('statistics',), lambda: db.execute_query(stats_query, fetch_one=True)
+    )
     
     stats_text = f"""
     📊 *ZewedJobs Statistics*
@@ -547,11 +953,11 @@ async def handle_admin_action(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.callback_query.message.reply_text("❌ Access denied.")
         return
     
-    if action == "admin_users":
+    if action == "users":
         await admin_manage_users(update, context)
-    elif action == "admin_jobs":
+    elif action == "jobs":
         await admin_manage_jobs(update, context)
-    elif action == "admin_companies":
+    elif action == "companies":
         await admin_manage_companies(update, context)
 
 async def admin_manage_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -562,7 +968,7 @@ async def admin_manage_users(update: Update, context: ContextTypes.DEFAULT_TYPE)
     ORDER BY created_at DESC
     LIMIT 10
     """
-    users = db.execute_query(users_query)
+    users = await asyncio.to_thread(db.execute_query, users_query)
     
     if not users:
         await update.callback_query.message.reply_text("📭 No users found.")
@@ -580,10 +986,10 @@ async def admin_manage_users(update: Update, context: ContextTypes.DEFAULT_TYPE)
         """
     
     keyboard = [
-        [InlineKeyboardButton("📊 All Users", callback_data="admin_all_users")],
-        [InlineKeyboardButton("⏫ Promote to Admin", callback_data="admin_promote")],
-        [InlineKeyboardButton("⏬ Demote Admin", callback_data="admin_demote")],
-        [InlineKeyboardButton("❌ Ban User", callback_data="admin_ban")]
+        [InlineKeyboardButton("📊 All Users", callback_data=callback_router.encode("admin", "all_users"))],
+        [InlineKeyboardButton("⏫ Promote to Admin", callback_data=callback_router.encode("admin", "promote"))],
+        [InlineKeyboardButton("⏬ Demote Admin", callback_data=callback_router.encode("admin", "demote"))],
+        [InlineKeyboardButton("❌ Ban User", callback_data=callback_router.encode("admin", "ban"))]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
@@ -598,6 +1004,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     /start - Start the bot and see welcome message
     /jobs - Browse latest job openings
     /search <keywords> - Search jobs by keyword/location
+      filters: salary:>20000 type:remote cat:IT level:entry loc:adama
+    @ZewedJobsBot <keywords> - Find and share jobs in any chat
     /profile - View and update your profile
     /applications - Track your job applications
     /subscribe - Subscribe to job alerts
@@ -620,7 +1028,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     *Tips:*
     • Complete your profile for better job matches
-    • Use specific keywords when searching
+    • Use specific keywords and filters when searching
     • Apply early for better chances
     • Save jobs you're interested in
     
@@ -630,79 +1038,105 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
-async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Log errors"""
-    logger.error(f"Update {update} caused error {context.error}")
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """Log errors and queue them for the next admin digest"""
+    logger.error(f"Update {update} caused error {context.error}", exc_info=context.error)
     
-    # Notify admins about critical errors
-    error_message = f"""
-    ⚠️ *Bot Error*
+    user_id = chat_id = None
+    if isinstance(update, Update):
+        user_id = update.effective_user.id if update.effective_user else None
+        chat_id = update.effective_chat.id if update.effective_chat else None
     
-    *Error:* {context.error}
-    *User:* {update.effective_user.id if update.effective_user else 'N/A'}
-    *Chat:* {update.effective_chat.id if update.effective_chat else 'N/A'}
-    *Time:* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-    """
+    error_aggregator.record(context.error, user_id, chat_id)
+
+async def send_error_digest(context: ContextTypes.DEFAULT_TYPE):
+    """Send at most one aggregated error report per window to each admin"""
+    groups = error_aggregator.drain()
+    if not groups:
+        return
     
+    # Record in system_logs: one row per error group, not per occurrence
+    log_query = """
+    INSERT INTO system_logs (level, component, message, details)
+    VALUES """ + ", ".join(["('error', 'bot', %s, %s)"] * len(groups))
+    params = []
+    for group in groups:
+        params.append(f"{group.exc_type} x{group.count} at {group.location}")
+        params.append(json.dumps(group.to_dict()))
+    await asyncio.to_thread(db.execute_update, log_query, tuple(params))
+    
+    digest = format_digest(groups, ERROR_DIGEST_SECONDS)[:4000]
     for admin_id in ADMIN_IDS:
         try:
-            await context.bot.send_message(admin_id, error_message, parse_mode='Markdown')
-        except:
-            pass
+            await context.bot.send_message(admin_id, digest)
+        except Exception as e:
+            logger.warning(f"Failed to send error digest to {admin_id}: {e}")
 
-def calculate_profile_completion(user: dict) -> int:
-    """Calculate user profile completion percentage"""
-    fields = ['full_name', 'email', 'phone', 'profession', 'experience', 'education', 'skills']
-    completed = sum(1 for field in fields if user.get(field))
-    return int((completed / len(fields)) * 100)
+# Inline button routes; legacy prefixes keep buttons from older messages working
+callback_router.add("browse_jobs", "b", jobs_command, throttle="jobs", legacy="browse_jobs")
+callback_router.add("view_job", "v", show_job_details, args=(int,), legacy="view_job")
+callback_router.add("apply_job", "a", apply_to_job, args=(int,), legacy="apply_job")
+callback_router.add("similar_jobs", "s", show_similar_jobs, args=(int,), legacy="similar_jobs")
+callback_router.add("create_profile", "p", create_profile, legacy="create_profile")
+callback_router.add("edit_profile", "e", create_profile, legacy="edit_profile")
+callback_router.add("statistics", "t", show_statistics, legacy="statistics")
+callback_router.add("admin", "x", handle_admin_action, args=(str,), clear_markup=True, legacy="admin")
 
 # Scheduled tasks
 async def send_daily_alerts(context: ContextTypes.DEFAULT_TYPE):
     """Send daily job alerts to subscribed users"""
+    if not settings.get_bool('notification_enabled', True):
+        logger.info("Daily alerts skipped: notifications are disabled in settings")
+        return
+    
     query = """
     SELECT u.telegram_id, u.preferences
     FROM users u
     WHERE u.notifications_enabled = 1
       AND u.status = 'active'
     """
-    users = db.execute_query(query)
+    users = await asyncio.to_thread(db.execute_query, query)
     
     if not users:
         return
     
-    # Get new jobs from last 24 hours
+    # Get new jobs from last 24 hours (sent to users without a ranking)
     jobs_query = """
     SELECT j.*, c.name as company_name
     FROM jobs j
     LEFT JOIN companies c ON j.company_id = c.id
     WHERE j.status = 'active'
       AND j.created_at >= DATE_SUB(NOW(), INTERVAL 1 DAY)
-    LIMIT 5
+    LIMIT %s
     """
-    jobs = db.execute_query(jobs_query)
-    
-    if not jobs:
-        return
+    limit = jobs_per_page()
+    latest_jobs = await asyncio.to_thread(db.execute_query, jobs_query, (limit,))
+    since = datetime.now() - timedelta(days=1)
     
-    alert_text = f"""
+    for user in users:
+        # Ranked digests are dictionary reads; no scoring happens here
+        jobs = job_ranker.top_jobs(user['telegram_id'], limit=limit, since=since) or latest_jobs
+        if not jobs:
+            continue
+        
+        alert_text = f"""
     🔔 *Daily Job Alerts*
     
     Found *{len(jobs)}* new jobs matching your preferences:
     
     """
-    
-    for job in jobs:
-        alert_text += f"""
+        
+        for job in jobs:
+            alert_text += f"""
         • *{job['title']}* - {job['company_name']}
           📍 {job['location']} • 💰 ETB {job['salary_min']:,}
           Apply: /apply_{job['id']}
         
         """
-    
-    alert_text += "\n📊 View all jobs: /jobs\n"
-    alert_text += "⚙️ Update preferences: /profile"
-    
-    for user in users:
+        
+        alert_text += "\n📊 View all jobs: /jobs\n"
+        alert_text += "⚙️ Update preferences: /profile"
+        
         try:
             await context.bot.send_message(
                 user['telegram_id'],
@@ -712,27 +1146,229 @@ async def send_daily_alerts(context: ContextTypes.DEFAULT_TYPE):
         except Exception as e:
             logger.error(f"Failed to send alert to {user['telegram_id']}: {e}")
 
+async def rank_jobs(context: ContextTypes.DEFAULT_TYPE):
+    """Nightly batch: score every active job against every job seeker"""
+    started = datetime.now()
+    users = await asyncio.to_thread(get_job_seekers_for_ranking)
+    jobs = await asyncio.to_thread(get_jobs_for_ranking)
+    if users is None or jobs is None:
+        return
+    
+    await asyncio.to_thread(job_ranker.rank_all, users, jobs)
+    context.bot_data['ranked_at'] = started
+
+async def refresh_rankings(context: ContextTypes.DEFAULT_TYPE):
+    """Incremental pass: merge new jobs and new or edited profiles into the rankings"""
+    if not job_ranker.ready:
+        await rank_jobs(context)
+        return
+    
+    started = datetime.now()
+    versions = await asyncio.to_thread(get_active_job_versions)
+    users = await asyncio.to_thread(get_job_seekers_for_ranking, updated_since=context.bot_data['ranked_at'])
+    if versions is None or users is None:
+        return
+    
+    expired = await asyncio.to_thread(job_ranker.retain_jobs, versions)
+    jobs = await asyncio.to_thread(get_jobs_for_ranking, job_ranker.new_job_ids(versions))
+    if jobs is None:
+        return
+    
+    await asyncio.to_thread(job_ranker.add_jobs, jobs)
+    await asyncio.to_thread(job_ranker.add_users, users)
+    context.bot_data['ranked_at'] = started
+    if jobs or users or expired:
+        logger.info(f"Rankings: {len(jobs)} new jobs, {len(users)} profiles re-ranked, {expired} jobs expired")
+
+async def refresh_similar_jobs(context: ContextTypes.DEFAULT_TYPE):
+    """Keep the similar jobs index in step with active jobs"""
+    versions = await asyncio.to_thread(get_active_job_versions)
+    if versions is None:
+        return
+    
+    if similar_jobs_index.needs_rebuild:
+        jobs = await asyncio.to_thread(get_jobs_for_index)
+        if jobs is not None:
+            await asyncio.to_thread(similar_jobs_index.build, jobs)
+        return
+    
+    changed = similar_jobs_index.changed_ids(versions)
+    jobs = await asyncio.to_thread(get_jobs_for_index, changed)
+    if jobs is None:
+        return
+    removed, updated = await asyncio.to_thread(similar_jobs_index.sync, versions, jobs)
+    if removed or updated:
+        logger.info(f"Similar jobs index: {updated} jobs indexed, {removed} removed")
+
+async def refresh_inline_jobs(context: ContextTypes.DEFAULT_TYPE):
+    """Keep the inline search snapshot in step with the jobs table"""
+    if inline_index.needs_reload:
+        jobs = await asyncio.to_thread(get_jobs_for_inline)
+        if jobs is not None:
+            await asyncio.to_thread(inline_index.load, jobs)
+        return
+    
+    jobs = await asyncio.to_thread(get_jobs_for_inline, inline_index.watermark)
+    if jobs is None:
+        return
+    updated, removed = await asyncio.to_thread(inline_index.apply, jobs)
+    if updated or removed:
+        logger.info(f"Inline search snapshot: {updated} jobs updated, {removed} removed")
+
+async def rebuild_similar_jobs(context: ContextTypes.DEFAULT_TYPE):
+    """Nightly full rebuild with a fresh vocabulary and IDF weights"""
+    jobs = await asyncio.to_thread(get_jobs_for_index)
+    if jobs is not None:
+        await asyncio.to_thread(similar_jobs_index.build, jobs)
+
+async def flush_job_views(context: ContextTypes.DEFAULT_TYPE):
+    """Write buffered job views with one batched UPDATE"""
+    views = await asyncio.to_thread(view_counter.flush, db.execute_update)
+    if views:
+        logger.debug(f"Flushed {views} job views")
+
+async def refresh_settings(context: ContextTypes.DEFAULT_TYPE):
+    """Reload settings if the table changed since the last poll"""
+    if not settings.loaded:
+        await asyncio.to_thread(settings.load)
+    elif await asyncio.to_thread(settings.refresh):
+        logger.info("Settings changed, reloaded")
+
+async def refresh_locations(context: ContextTypes.DEFAULT_TYPE):
+    """Reload canonical locations and aliases added from the admin panel"""
+    await asyncio.to_thread(location_index.load)
+
+async def assign_locations(context: ContextTypes.DEFAULT_TYPE):
+    """Give rows whose spelling only the fuzzy matcher understands a location id"""
+    if not location_index.loaded:
+        return
+    fixed = await asyncio.to_thread(location_index.assign_missing, db.execute_update)
+    if any(fixed.values()):
+        logger.info(f"Assigned location ids: {fixed}")
+
+async def warm_up(context: ContextTypes.DEFAULT_TYPE):
+    """Open the pool and fill settings, the similar jobs index and rankings, then mark ready"""
+    started = time.monotonic()
+    if not await asyncio.to_thread(db.connect):
+        logger.warning("Warm-up: database unavailable, retrying in 5 seconds")
+        context.job_queue.run_once(warm_up, 5)
+        return
+    
+    await asyncio.to_thread(settings.load)
+    await asyncio.to_thread(location_index.load)
+    await asyncio.to_thread(media_cache.load)
+    await refresh_inline_jobs(context)
+    await refresh_similar_jobs(context)
+    await refresh_rankings(context)
+    ready.set()
+    logger.info(f"Warm-up finished in {time.monotonic() - started:.1f}s, bot is ready")
+
+def register_health_probes(application: Application, loop: asyncio.AbstractEventLoop):
+    """Readiness checks, run on the health thread every few seconds"""
+    def check_database():
+        connection = db.get_connection() if db.pool else None
+        if not connection:
+            return {'ok': False, 'error': 'connection pool not open'}
+        try:
+            connection.ping()
+        finally:
+            connection.close()
+        return {'ok': True, 'pool_size': db.pool_size}
+    
+    def check_caches():
+        return {
+            'ok': ready.is_set(),
+            'profiles': len(profile_cache),
+            'results': len(result_cache),
+            'similar_jobs': len(similar_jobs_index),
+            'ranked_users': len(job_ranker),
+            'settings': len(settings),
+            'media': len(media_cache),
+            'inline_jobs': len(inline_index),
+        }
+    
+    def check_bot_api():
+        me = asyncio.run_coroutine_threadsafe(application.bot.get_me(), loop).result(timeout=10)
+        return {'ok': True, 'username': me.username}
+    
+    def check_queues():
+        depths = {
+            'updates': application.update_queue.qsize(),
+            'applications': len(application_pipeline),
+            'pending_views': len(view_counter),
+        }
+        ok = depths['updates'] < UPDATE_BACKLOG_LIMIT and depths['applications'] < APPLICATION_QUEUE_SIZE
+        return {'ok': ok, **depths}
+    
+    health_monitor.add_probe('database', check_database)
+    health_monitor.add_probe('caches', check_caches)
+    health_monitor.add_probe('bot_api', check_bot_api, interval=30)
+    health_monitor.add_probe('queues', check_queues)
+    if db.router.replicas:
+        health_monitor.add_probe('replicas', db.router.check_replicas, critical=False)
+
+async def on_startup(application: Application):
+    """Start background writers once the event loop is running"""
+    application_pipeline.on_failed = partial(report_failed_application, application.bot)
+    application_pipeline.start()
+    # Warm-up runs as a job so updates are served (with fallbacks) meanwhile
+    application.job_queue.run_once(warm_up, 0)
+    
+    register_health_probes(application, asyncio.get_running_loop())
+    health_monitor.start()
+    if HEALTH_PORT:
+        serve_health(health_monitor, HEALTH_PORT)
+
+async def on_shutdown(application: Application):
+    """Flush buffered views and queued applications when the bot stops"""
+    health_monitor.stop()
+    await application_pipeline.stop()
+    views = await asyncio.to_thread(view_counter.flush, db.execute_update)
+    logger.info(f"Shutdown flush: {views} job views, {application_pipeline.inserted} applications inserted since startup")
+
 async def cleanup_old_data(context: ContextTypes.DEFAULT_TYPE):
-    """Clean up old data and logs"""
-    # Delete jobs older than 90 days
-    cleanup_query = """
-    DELETE FROM jobs 
-    WHERE status = 'expired' 
-      AND updated_at < DATE_SUB(NOW(), INTERVAL 90 DAY)
-    """
-    db.execute_update(cleanup_query)
+    """Archive and delete expired jobs, messages and logs in small chunks"""
+    from partitioning import maintain_partitions
+    from retention import run_retention
+    
+    # The retention engine uses its own connection and sleeps between chunks,
+    # so it runs in a worker thread instead of on the event loop
+    try:
+        results = await asyncio.to_thread(run_retention, DB_CONFIG)
+        # Partitioned tables expire whole months at once
+        results += await asyncio.to_thread(maintain_partitions, DB_CONFIG)
+    except Exception as e:
+        logger.error(f"Cleanup failed: {e}")
+        return
     
+    for result in results:
+        logger.info(f"Cleanup {result['table']}: {result}")
     logger.info("Cleanup completed")
 
 # Main function
-def main():
-    """Start the bot"""
-    if not BOT_TOKEN:
-        logger.error("BOT_TOKEN not found in environment variables")
-        return
-    
-    # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
+def build_application(singleton_jobs: bool = True, polling: bool = True) -> Application:
+    """Application with every handler and scheduled job registered.
+
+    With several worker processes (see workers.py) only one of them runs the
+    jobs that must happen once (alerts, cleanup); caches, indexes and buffered
+    writes are per process, so every worker maintains its own.
+    """
+    builder = Application.builder().token(BOT_TOKEN).post_init(on_startup).post_shutdown(on_shutdown)
+    # Replies to concurrent updates share a keep-alive pool instead of queueing for one connection
+    builder = builder.request(HTTPXRequest(
+        connection_pool_size=TELEGRAM_POOL_SIZE, pool_timeout=TELEGRAM_POOL_TIMEOUT
+    ))
+    if UPDATE_CONCURRENCY > 1:
+        builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(UPDATE_CONCURRENCY))
+    if not polling:
+        # Updates are fed to application.update_queue by the front process
+        builder = builder.updater(None)
+    application = builder.build()
+    
+    # Log context, maintenance mode and flood control run ahead of every other handler
+    application.add_handler(TypeHandler(Update, bind_log_context), group=-4)
+    application.add_handler(TypeHandler(Update, maintenance_gate), group=-2)
+    application.add_handler(TypeHandler(Update, throttle_updates), group=-1)
     
     # Add command handlers
     application.add_handler(CommandHandler("start", start))
@@ -742,8 +1378,16 @@ def main():
     application.add_handler(CommandHandler("admin", admin_panel))
     application.add_handler(CommandHandler("help", help_command))
     
+    # Replies to the profile prompt (`Name: ...`, `Email: ...`)
+    application.add_handler(MessageHandler(
+        filters.TEXT & ~filters.COMMAND & filters.Regex(PROFILE_LINE), save_profile
+    ))
+    
     # Add callback query handler
-    application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(CallbackQueryHandler(callback_router.dispatch))
+    
+    # Inline mode: @ZewedJobsBot <keywords> in any chat
+    application.add_handler(InlineQueryHandler(inline_search))
     
     # Add error handler
     application.add_error_handler(error_handler)
@@ -751,11 +1395,50 @@ def main():
     # Add job queue for scheduled tasks
     job_queue = application.job_queue
     
-    # Schedule daily alerts at 9 AM
-    job_queue.run_daily(send_daily_alerts, time=datetime.strptime("09:00", "%H:%M").time())
+    # Settings are polled cheaply and re-read only when they change
+    job_queue.run_repeating(refresh_settings, interval=SETTINGS_POLL_SECONDS, first=SETTINGS_POLL_SECONDS)
+    
+    # Aliases change rarely; reload them hourly
+    job_queue.run_repeating(refresh_locations, interval=LOCATIONS_REFRESH_SECONDS, first=LOCATIONS_REFRESH_SECONDS)
+    
+    # Flush aggregated errors to admins once per window
+    job_queue.run_repeating(send_error_digest, interval=ERROR_DIGEST_SECONDS, first=ERROR_DIGEST_SECONDS)
+    
+    # Inline search snapshot: incremental from updated_at, reloaded in full every few hours
+    job_queue.run_repeating(refresh_inline_jobs, interval=INLINE_REFRESH_SECONDS, first=INLINE_REFRESH_SECONDS)
+    
+    # Similar jobs index: built during warm-up, patched incrementally, rebuilt nightly
+    job_queue.run_repeating(
+        refresh_similar_jobs, interval=SIMILAR_JOBS_REFRESH_SECONDS, first=SIMILAR_JOBS_REFRESH_SECONDS
+    )
+    job_queue.run_daily(rebuild_similar_jobs, time=datetime.strptime("03:00", "%H:%M").time())
+    
+    # Personalized rankings: batch during warm-up and nightly, incremental passes in between
+    job_queue.run_repeating(refresh_rankings, interval=RANKING_REFRESH_SECONDS, first=RANKING_REFRESH_SECONDS)
+    job_queue.run_daily(rank_jobs, time=datetime.strptime("03:30", "%H:%M").time())
+    
+    # Buffered job views are written in batches
+    job_queue.run_repeating(flush_job_views, interval=VIEW_FLUSH_SECONDS, first=VIEW_FLUSH_SECONDS)
+    
+    if singleton_jobs:
+        # Schedule daily alerts at 9 AM
+        job_queue.run_daily(send_daily_alerts, time=datetime.strptime("09:00", "%H:%M").time())
+        
+        # Resolve free-text locations the write-time triggers could not
+        job_queue.run_repeating(assign_locations, interval=LOCATIONS_REFRESH_SECONDS, first=60)
+        
+        # Schedule weekly cleanup on Sunday at 2 AM
+        job_queue.run_daily(cleanup_old_data, time=datetime.strptime("02:00", "%H:%M").time(), days=(6,))
+    
+    return application
+
+def main():
+    """Start the bot"""
+    if not BOT_TOKEN:
+        logger.error("BOT_TOKEN not found in environment variables")
+        return
     
-    # Schedule weekly cleanup on Sunday at 2 AM
-    job_queue.run_daily(cleanup_old_data, time=datetime.strptime("02:00", "%H:%M").time(), days=(6,))
+    application = build_application()
     
     # Start the bot
     logger.info("Starting bot...")
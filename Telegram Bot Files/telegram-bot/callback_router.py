@@ -0,0 +1,140 @@
+"""
+ZewedJobs callback routing
+Maps inline button payloads to handlers with one dictionary lookup
+
+Payloads are `<version><code>[:arg[:arg...]]`, e.g. `1v:123` for "view job
+123", and must fit Telegram's 64-byte callback_data limit. Buttons sent by
+older releases (`view_job_123`, `browse_jobs`, `admin_users`) are still
+understood through their legacy prefixes.
+"""
+
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+VERSION = '1'
+SEPARATOR = ':'
+MAX_CALLBACK_BYTES = 64
+
+Handler = Callable[..., Awaitable]
+
+
+class Route:
+    """One kind of button: its short code, handler and argument types"""
+
+    def __init__(self, name: str, code: str, handler: Handler, args: Tuple[type, ...] = (),
+                 clear_markup: bool = False, throttle: Optional[str] = None, legacy: Optional[str] = None):
+        self.name = name
+        self.code = code
+        self.handler = handler
+        self.args = tuple(args)
+        self.clear_markup = clear_markup
+        self.throttle = throttle
+        self.legacy = legacy
+
+    @property
+    def bucket(self) -> str:
+        """Flood control bucket charged for this button"""
+        return self.throttle or self.name
+
+
+class CallbackRouter:
+    """Registry of button routes keyed by short code, name and legacy prefix"""
+
+    def __init__(self):
+        self._codes: Dict[str, Route] = {}
+        self._names: Dict[str, Route] = {}
+        self._legacy: Dict[str, Route] = {}
+
+    def add(self, name: str, code: str, handler: Handler, args: Tuple[type, ...] = (),
+            clear_markup: bool = False, throttle: Optional[str] = None, legacy: Optional[str] = None) -> Route:
+        """Register a route; `clear_markup` removes the buttons after it runs"""
+        if SEPARATOR in code or code in self._codes:
+            raise ValueError(f"Invalid or duplicate callback code: {code!r}")
+        if name in self._names:
+            raise ValueError(f"Duplicate callback route: {name!r}")
+        route = Route(name, code, handler, args, clear_markup, throttle, legacy)
+        self._codes[code] = route
+        self._names[name] = route
+        if legacy:
+            self._legacy[legacy] = route
+        return route
+
+    # Payloads
+    def encode(self, name: str, *args) -> str:
+        """callback_data for a button of route `name`"""
+        route = self._names[name]
+        parts = [VERSION + route.code] + [str(arg) for arg in args]
+        if any(SEPARATOR in part for part in parts[1:]):
+            raise ValueError(f"Callback arguments must not contain {SEPARATOR!r}: {args}")
+        data = SEPARATOR.join(parts)
+        if len(data.encode('utf-8')) > MAX_CALLBACK_BYTES:
+            raise ValueError(f"Callback data longer than {MAX_CALLBACK_BYTES} bytes: {data!r}")
+        return data
+
+    def _parse_legacy(self, data: str) -> Optional[Tuple[Route, list]]:
+        route = self._legacy.get(data)
+        if route:
+            return route, []
+        # view_job_123 -> view_job + 123, admin_users -> admin + users
+        prefix, _, suffix = data.rpartition('_')
+        route = self._legacy.get(prefix) if suffix.isdigit() else None
+        if route:
+            return route, [suffix]
+        prefix, _, suffix = data.partition('_')
+        route = self._legacy.get(prefix)
+        return (route, [suffix]) if route and suffix else None
+
+    def decode(self, data: Optional[str]) -> Optional[Tuple[Route, tuple]]:
+        """(route, typed args) for a payload, None when nothing matches"""
+        if not data:
+            return None
+
+        parsed = None
+        if data.startswith(VERSION):
+            code, *raw_args = data[len(VERSION):].split(SEPARATOR)
+            route = self._codes.get(code)
+            if route:
+                parsed = route, raw_args
+        if parsed is None:
+            parsed = self._parse_legacy(data)
+        if parsed is None:
+            return None
+
+        route, raw_args = parsed
+        if len(raw_args) != len(route.args):
+            return None
+        try:
+            return route, tuple(convert(value) for convert, value in zip(route.args, raw_args))
+        except ValueError:
+            return None
+
+    def bucket(self, data: Optional[str]) -> Optional[str]:
+        """Flood control bucket for a payload; unrouted `name_<id>` buttons share one per name"""
+        decoded = self.decode(data)
+        if decoded:
+            return decoded[0].bucket
+        if not data:
+            return None
+        prefix, _, suffix = data.rpartition('_')
+        return prefix if suffix.isdigit() else data
+
+    # Dispatch
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """CallbackQueryHandler callback: answer, run the route, optionally clear buttons"""
+        query = update.callback_query
+        decoded = self.decode(query.data)
+        if decoded is None:
+            logger.warning(f"Unknown callback data: {query.data!r}")
+            await query.answer("This option isn't available right now.")
+            return
+
+        route, args = decoded
+        await query.answer()
+        await route.handler(update, context, *args)
+        if route.clear_markup:
+            await query.edit_message_reply_markup(reply_markup=None)
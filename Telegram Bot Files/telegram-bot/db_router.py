@@ -0,0 +1,264 @@
+"""
+ZewedJobs read/write routing
+Sends reads to replicas and writes to the primary, shared by the bot and dashboard
+
+  writes     always the primary (DB_HOST)
+  reads      round-robin over the replicas in DB_REPLICA_HOSTS whose last lag
+             check was recent and within DB_REPLICA_MAX_LAG seconds; the
+             primary when none qualifies or a replica cannot hand out a
+             connection
+  own writes reads in the same update/request as a write, and reads by a user
+             who wrote within DB_STICKY_SECONDS, go to the primary so users
+             always see their own changes
+
+Replica lag comes from SHOW REPLICA STATUS (SHOW SLAVE STATUS on older
+servers) and is checked on a background thread by a health probe, never
+per query. With no replicas configured everything goes to the primary.
+
+Local test: run a second MySQL on port 3307 replicating from the first and
+set DB_REPLICA_HOSTS=127.0.0.1:3307.
+"""
+
+import time
+import logging
+import itertools
+import threading
+import contextvars
+from typing import Dict, List, Optional, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Who the current update/request acts for, and whether it has written yet.
+# The write flag is a mutable holder bound per update: queries run through
+# asyncio.to_thread in a copy of the context, and setting a ContextVar there
+# would never reach the handler, while mutating the shared holder does.
+session_key_var: contextvars.ContextVar = contextvars.ContextVar('db_session_key', default=None)
+wrote_var: contextvars.ContextVar = contextvars.ContextVar('db_wrote', default=None)
+
+
+def parse_replica_hosts(value: Optional[str], default_port: str = '3306') -> List[Tuple[str, str]]:
+    """'db2,db3:3307' -> [('db2', '3306'), ('db3', '3307')]"""
+    hosts = []
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port = entry.partition(':')
+        hosts.append((host, port or default_port))
+    return hosts
+
+
+class Replica:
+    """One read replica, its pool and the result of its last lag check"""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.name = f"{config['host']}:{config['port']}"
+        self.pool = None
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+        self.error: Optional[str] = 'not checked yet'
+
+    def usable(self, max_lag: float, max_age: float) -> bool:
+        return (
+            self.error is None
+            and self.lag is not None
+            and self.lag <= max_lag
+            and time.monotonic() - self.checked_at <= max_age
+        )
+
+    def report(self) -> Dict:
+        return {
+            'lag_seconds': self.lag,
+            'error': self.error,
+            'age_seconds': round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+        }
+
+
+class DatabaseRouter:
+    """Connection pools for the primary and replicas, picked per query"""
+
+    def __init__(self, config: dict, replica_hosts: Optional[str] = None, pool_size: int = 5,
+                 pool_name: str = 'zewedjobs', max_lag: float = 5.0, sticky_seconds: float = 10.0,
+                 max_check_age: float = 30.0, overflow: bool = False, pool_options: Optional[dict] = None):
+        self.config = config
+        self.pool_size = pool_size
+        self.pool_name = pool_name
+        self.max_lag = max_lag
+        self.max_check_age = max_check_age
+        # Hand out one-off connections when a pool is exhausted instead of failing
+        self.overflow = overflow
+        self.pool_options = pool_options or {}
+        self.primary_pool = None
+        self.replicas = [
+            Replica({**config, 'host': host, 'port': port})
+            for host, port in parse_replica_hosts(replica_hosts, str(config.get('port', '3306')))
+        ]
+        self._recent_writers = TTLCache(max_size=100000, ttl=sticky_seconds)
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self.reads = {'primary': 0, 'replica': 0}
+
+    # Pools
+    def _open_pool(self, name: str, config: dict):
+        # mysql.connector is imported here so importing the router stays cheap
+        from mysql.connector import Error, pooling
+
+        try:
+            pool = pooling.MySQLConnectionPool(
+                pool_name=f"{self.pool_name}_{name}", pool_size=self.pool_size,
+                **self.pool_options, **config
+            )
+            logger.info(f"Database pool established for {name} ({self.pool_size} connections)")
+            return pool
+        except Error as e:
+            logger.error(f"Database connection failed ({name}): {e}")
+            return None
+
+    def connect(self):
+        """Open the primary pool; replica pools open on their first lag check"""
+        with self._lock:
+            if self.primary_pool is None:
+                self.primary_pool = self._open_pool('primary', self.config)
+        return self.primary_pool
+
+    def _borrow(self, pool, config: dict):
+        from mysql.connector import Error, pooling
+        import mysql.connector
+
+        try:
+            return pool.get_connection()
+        except pooling.PoolError:
+            if not self.overflow:
+                raise
+            # Pool exhausted under a burst: fall back to a one-off connection
+            try:
+                return mysql.connector.connect(**config)
+            except Error as e:
+                logger.error(f"Database connection failed: {e}")
+                return None
+
+    def primary_connection(self):
+        """A connection to the primary; closing it returns it to the pool"""
+        from mysql.connector import Error
+
+        pool = self.primary_pool or self.connect()
+        if not pool:
+            return None
+        try:
+            return self._borrow(pool, self.config)
+        except Error as e:
+            logger.error(f"Database connection failed: {e}")
+            return None
+
+    def _replica_connection(self):
+        from mysql.connector import Error
+
+        candidates = [replica for replica in self.replicas
+                      if replica.pool and replica.usable(self.max_lag, self.max_check_age)]
+        if not candidates:
+            return None
+        start = next(self._round_robin)
+        for offset in range(len(candidates)):
+            replica = candidates[(start + offset) % len(candidates)]
+            try:
+                connection = self._borrow(replica.pool, replica.config)
+            except Error as e:
+                logger.warning(f"Replica {replica.name} unavailable: {e}")
+                continue
+            if connection:
+                return connection
+        return None
+
+    def connection(self, read: bool = False):
+        """Replica connection for reads when allowed, otherwise the primary"""
+        if read and self.replicas and not self.prefers_primary():
+            connection = self._replica_connection()
+            if connection:
+                self.reads['replica'] += 1
+                return connection
+        if read:
+            self.reads['primary'] += 1
+        return self.primary_connection()
+
+    # Read-your-writes
+    def bind(self, key=None):
+        """Start a new update/request acting for `key` (e.g. a Telegram user id)"""
+        session_key_var.set(key)
+        wrote_var.set({'wrote': False})
+
+    def mark_write(self):
+        """Pin the current update, and its key for a while, to the primary"""
+        holder = wrote_var.get()
+        if holder is not None:
+            holder['wrote'] = True
+        key = session_key_var.get()
+        if key is not None:
+            self._recent_writers.set(key, True)
+
+    def prefers_primary(self) -> bool:
+        holder = wrote_var.get()
+        if holder is not None and holder['wrote']:
+            return True
+        key = session_key_var.get()
+        return key is not None and bool(self._recent_writers.get(key))
+
+    # Lag checks
+    def _check_replica(self, replica: Replica):
+        from mysql.connector import Error
+
+        if replica.pool is None:
+            replica.pool = self._open_pool(replica.name, replica.config)
+            if replica.pool is None:
+                replica.error = 'connection failed'
+                replica.checked_at = time.monotonic()
+                return
+
+        connection = None
+        try:
+            connection = replica.pool.get_connection()
+            cursor = connection.cursor(dictionary=True)
+            try:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except Error:
+                    # MySQL before 8.0.22 and MariaDB
+                    cursor.execute("SHOW SLAVE STATUS")
+                status = cursor.fetchone()
+            finally:
+                cursor.close()
+        except Error as e:
+            replica.lag, replica.error = None, str(e)
+        else:
+            lag = None
+            if status:
+                lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+            replica.lag = float(lag) if lag is not None else None
+            replica.error = None if lag is not None else ('not a replica' if not status else 'replication stopped')
+        finally:
+            if connection:
+                connection.close()
+            replica.checked_at = time.monotonic()
+
+    def check_replicas(self) -> Dict:
+        """Refresh every replica's lag; meant to run as a background health probe"""
+        for replica in self.replicas:
+            was_usable = replica.usable(self.max_lag, self.max_check_age)
+            self._check_replica(replica)
+            is_usable = replica.usable(self.max_lag, self.max_check_age)
+            if was_usable and not is_usable:
+                reason = replica.error or f"{replica.lag:.0f}s behind"
+                logger.warning(f"Replica {replica.name} out of rotation: {reason}")
+            elif is_usable and not was_usable:
+                logger.info(f"Replica {replica.name} in rotation ({replica.lag:.0f}s behind)")
+
+        usable = sum(1 for replica in self.replicas if replica.usable(self.max_lag, self.max_check_age))
+        return {
+            # Reads fall back to the primary, so lagging replicas never fail readiness
+            'ok': True,
+            'usable': usable,
+            'reads': dict(self.reads),
+            'replicas': {replica.name: replica.report() for replica in self.replicas},
+        }
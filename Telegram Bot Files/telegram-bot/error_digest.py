@@ -0,0 +1,132 @@
+"""
+ZewedJobs error aggregation
+Groups handler exceptions by type and location so admins get one digest per window
+"""
+
+import os
+import threading
+import traceback
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+OVERFLOW_KEY = ('Other', 'various locations')
+
+# Errors are grouped by the innermost frame in the bot's own code
+SOURCE_ROOT = os.path.dirname(os.path.abspath(__file__))
+LIBRARY_DIRS = ('site-packages', 'dist-packages')
+
+
+class ErrorGroup:
+    """All occurrences of one exception type raised from one location"""
+
+    __slots__ = ('exc_type', 'location', 'message', 'count', 'first_seen', 'last_seen', 'user_ids', 'chat_ids')
+
+    def __init__(self, exc_type: str, location: str, message: str):
+        self.exc_type = exc_type
+        self.location = location
+        self.message = message
+        self.count = 0
+        self.first_seen = datetime.now()
+        self.last_seen = self.first_seen
+        self.user_ids: List[int] = []
+        self.chat_ids: List[int] = []
+
+    def to_dict(self) -> dict:
+        return {
+            'exception': self.exc_type,
+            'location': self.location,
+            'message': self.message,
+            'count': self.count,
+            'first_seen': self.first_seen.isoformat(),
+            'last_seen': self.last_seen.isoformat(),
+            'sample_user_ids': self.user_ids,
+            'sample_chat_ids': self.chat_ids,
+        }
+
+
+def is_own_frame(filename: str, root: str = SOURCE_ROOT) -> bool:
+    """Whether a traceback frame is in the bot's source tree rather than a library"""
+    path = os.path.abspath(filename)
+    if not path.startswith(root + os.sep):
+        return False
+    return not any(part in LIBRARY_DIRS for part in path[len(root):].split(os.sep))
+
+
+def error_location(error: BaseException, root: str = SOURCE_ROOT) -> str:
+    """file:line in function of the innermost bot frame the error passed through.
+
+    Errors raised inside mysql-connector or python-telegram-bot are placed at
+    the bot code that called into the library, so unrelated handlers do not
+    share one group; the innermost frame is used when no bot frame exists.
+    """
+    frames = traceback.extract_tb(error.__traceback__) if error.__traceback__ else None
+    if not frames:
+        return 'unknown'
+    own = [frame for frame in frames if is_own_frame(frame.filename, root)]
+    frame = own[-1] if own else frames[-1]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}"
+
+
+class ErrorAggregator:
+    """Counts errors per (type, location) until the next digest drains them.
+
+    The number of groups is bounded; once `max_groups` distinct errors are
+    pending, further new kinds are folded into a single overflow group.
+    """
+
+    def __init__(self, max_groups: int = 50, max_samples: int = 5):
+        self.max_groups = max_groups
+        self.max_samples = max_samples
+        self._groups: Dict[Tuple[str, str], ErrorGroup] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def record(self, error: BaseException, user_id: Optional[int] = None, chat_id: Optional[int] = None):
+        exc_type = type(error).__name__
+        location = error_location(error)
+        key = (exc_type, location)
+
+        with self._lock:
+            group = self._groups.get(key)
+            if group is None:
+                if len(self._groups) >= self.max_groups:
+                    key = OVERFLOW_KEY
+                    group = self._groups.get(key)
+                if group is None:
+                    group = self._groups[key] = ErrorGroup(key[0], key[1], str(error)[:300])
+
+            group.count += 1
+            group.last_seen = datetime.now()
+            if user_id is not None and user_id not in group.user_ids and len(group.user_ids) < self.max_samples:
+                group.user_ids.append(user_id)
+            if chat_id is not None and chat_id not in group.chat_ids and len(group.chat_ids) < self.max_samples:
+                group.chat_ids.append(chat_id)
+
+    def drain(self) -> List[ErrorGroup]:
+        """Return pending groups, most frequent first, and start a new window"""
+        with self._lock:
+            groups, self._groups = self._groups, {}
+        return sorted(groups.values(), key=lambda group: group.count, reverse=True)
+
+
+def format_digest(groups: List[ErrorGroup], window_seconds: float) -> str:
+    """Plain-text digest; error messages are not escaped so no parse mode is used"""
+    total = sum(group.count for group in groups)
+    lines = [
+        "⚠️ Bot Error Digest",
+        f"{total} error(s) in {len(groups)} group(s) over the last {int(window_seconds // 60) or 1} min",
+        "",
+    ]
+    for group in groups[:10]:
+        lines.append(f"• {group.exc_type} ×{group.count} at {group.location}")
+        lines.append(f"  {group.message[:200]}")
+        if group.user_ids:
+            lines.append(f"  Users: {', '.join(map(str, group.user_ids))}")
+        if group.chat_ids:
+            lines.append(f"  Chats: {', '.join(map(str, group.chat_ids))}")
+        lines.append(f"  Last: {group.last_seen.strftime('%Y-%m-%d %H:%M:%S')}")
+    if len(groups) > 10:
+        lines.append(f"… and {len(groups) - 10} more group(s), see system_logs")
+    return '\n'.join(lines)
@@ -0,0 +1,145 @@
+"""
+ZewedJobs health checks
+Background probes with cached results behind /health and /ready
+
+Probes run on their own thread at a fixed rate, so however often a load
+balancer or cron job polls the endpoints, they only ever read the last
+results and never touch the database themselves.
+
+  /health  liveness: the process is up and the probe thread is running
+  /ready   readiness: every critical probe passed recently (HTTP 503 otherwise)
+
+/ready is unauthenticated, so it only says which checks pass. Probe
+details and error messages (hosts, SQL errors, pool sizes) go to the log
+when a check starts failing and stay available through `readiness(detail=True)`.
+"""
+
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Probe:
+    """One named check and its last result"""
+
+    def __init__(self, name: str, check: Callable[[], dict], interval: float, critical: bool = True):
+        self.name = name
+        self.check = check
+        self.interval = interval
+        self.critical = critical
+        self.result: Dict = {'ok': False, 'error': 'not run yet'}
+        self.checked_at = 0.0
+        self.duration_ms = 0.0
+
+    def run(self):
+        started = time.monotonic()
+        previous = self.result
+        try:
+            result = self.check()
+            self.result = result if isinstance(result, dict) else {'ok': bool(result)}
+        except Exception as e:
+            self.result = {'ok': False, 'error': str(e)}
+        # Log on change only; probes run every few seconds
+        if not self.result.get('ok') and self.result != previous:
+            logger.warning(f"Health check {self.name} failing: {self.result}")
+        elif self.result.get('ok') and not previous.get('ok') and self.checked_at:
+            logger.info(f"Health check {self.name} recovered")
+        self.checked_at = time.monotonic()
+        self.duration_ms = round((self.checked_at - started) * 1000, 1)
+
+    @property
+    def stale(self) -> bool:
+        return time.monotonic() - self.checked_at > 3 * self.interval
+
+    def report(self) -> Dict:
+        ok = bool(self.result.get('ok')) and not self.stale
+        return {
+            **self.result,
+            'ok': ok,
+            'critical': self.critical,
+            'age_seconds': round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+            'duration_ms': self.duration_ms,
+        }
+
+
+class HealthMonitor:
+    """Runs probes in the background and serves their cached results"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.probes: Dict[str, Probe] = {}
+        self.started_at = time.time()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_probe(self, name: str, check: Callable[[], dict], interval: Optional[float] = None,
+                  critical: bool = True):
+        """Register a check; it returns {'ok': bool, ...details} or raises"""
+        self.probes[name] = Probe(name, check, interval or self.interval, critical)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for probe in self.probes.values():
+                if now - probe.checked_at >= probe.interval:
+                    probe.run()
+            self._stop.wait(min(1.0, self.interval))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='health-probes', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def liveness(self) -> Dict:
+        alive = self._thread is not None and self._thread.is_alive()
+        return {
+            'status': 'ok' if alive else 'degraded',
+            'uptime_seconds': round(time.time() - self.started_at),
+            'probes_running': alive,
+        }
+
+    def readiness(self, detail: bool = False) -> Tuple[bool, Dict]:
+        """Overall readiness; without `detail` each check is reduced to pass/fail"""
+        reports = {name: probe.report() for name, probe in self.probes.items()}
+        ready = all(report['ok'] for report in reports.values() if report['critical'])
+        checks = reports if detail else {name: report['ok'] for name, report in reports.items()}
+        return ready, {'status': 'ready' if ready else 'not_ready', 'checks': checks}
+
+
+def serve_health(monitor: HealthMonitor, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """Serve /health and /ready on a small HTTP server thread"""
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') == '/health':
+                status, body = 200, monitor.liveness()
+            elif self.path.rstrip('/') == '/ready':
+                ready, body = monitor.readiness()
+                status = 200 if ready else 503
+            else:
+                status, body = 404, {'error': 'not found'}
+
+            payload = json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # Probed every few seconds; keep it out of the logs
+            pass
+
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='health-server', daemon=True).start()
+    logger.info(f"Health endpoints listening on {host}:{port}")
+    return server
@@ -0,0 +1,240 @@
+"""
+ZewedJobs inline search
+Answers `@ZewedJobsBot <words>` from an in-memory snapshot of active jobs
+
+Inline queries arrive on every keystroke, so none of them touch the
+database. The snapshot holds a card per active job plus an inverted index
+of title, company, category, location, type and requirement words. Every
+query word must prefix-match a word of the job ("pyth dev" finds "Python
+Developer"), newest jobs first.
+
+Results are cached per normalized query. While a user is typing, each new
+query is a longer version of the last one and can only match fewer jobs,
+so it filters the cached result of its longest cached prefix instead of
+searching the whole index again.
+
+The snapshot is refreshed incrementally from jobs.updated_at and reloaded
+in full every few hours to drop rows deleted outright. A refresh builds the
+next snapshot beside the current one (copying only the postings it changes)
+and swaps it in with one assignment, so searches on the event loop never
+wait for it. Each snapshot carries its own result cache.
+
+Inline mode has to be switched on for the bot with BotFather's /setinline.
+"""
+
+import time
+import bisect
+import logging
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from cache import TTLCache
+from similar_jobs import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Fields kept per job to render results without a query
+CARD_FIELDS = ('id', 'title', 'company_name', 'location', 'salary_min', 'salary_max',
+               'job_type', 'deadline', 'description', 'created_at', 'updated_at')
+
+# Words of these fields are searchable
+SEARCH_FIELDS = ('title', 'company_name', 'category', 'location', 'job_type', 'requirements')
+
+# Telegram shows at most 50 results per answer
+PAGE_SIZE = 20
+MAX_RESULTS = 200
+
+
+def normalize_query(text: Optional[str]) -> str:
+    return ' '.join(tokenize(text))
+
+
+class Snapshot:
+    """Job cards and word index of one moment; never changed once published"""
+
+    def __init__(self, cache_ttl: float, base: Optional['Snapshot'] = None):
+        # Dicts are copied; posting sets are shared until a change copies them
+        self.cards: Dict[int, dict] = dict(base.cards) if base else {}
+        self.words: Dict[int, Set[str]] = dict(base.words) if base else {}
+        self.postings: Dict[str, Set[int]] = dict(base.postings) if base else {}
+        self.vocabulary: List[str] = base.vocabulary if base else []
+        self.newest: List[int] = base.newest if base else []
+        self._copied: Set[str] = set()
+        # normalized query -> (matching ids newest first, whether that is all of them)
+        self.results = TTLCache(max_size=5000, ttl=cache_ttl)
+
+    def _posting(self, word: str) -> Set[int]:
+        """This snapshot's own copy of a posting set, safe to change"""
+        if word not in self._copied:
+            self.postings[word] = set(self.postings.get(word, ()))
+            self._copied.add(word)
+        return self.postings[word]
+
+    def add(self, job: dict):
+        job_id = job['id']
+        self.cards[job_id] = {field: job.get(field) for field in CARD_FIELDS}
+        words = set()
+        for field in SEARCH_FIELDS:
+            words.update(tokenize(job.get(field)))
+        self.words[job_id] = words
+        for word in words:
+            self._posting(word).add(job_id)
+
+    def remove(self, job_id: int) -> bool:
+        if self.cards.pop(job_id, None) is None:
+            return False
+        for word in self.words.pop(job_id, ()):
+            if word in self.postings:
+                postings = self._posting(word)
+                postings.discard(job_id)
+                if not postings:
+                    del self.postings[word]
+        return True
+
+    def reindex(self):
+        self.vocabulary = sorted(self.postings)
+        self.newest = sorted(self.cards, key=lambda job_id: (self.cards[job_id]['created_at'], job_id),
+                             reverse=True)
+        self._copied = set()
+
+
+class InlineJobIndex:
+    """Active jobs in memory with a prefix-searchable word index"""
+
+    def __init__(self, page_size: int = PAGE_SIZE, max_results: int = MAX_RESULTS,
+                 cache_ttl: float = 300.0, full_reload_seconds: float = 6 * 3600):
+        self.page_size = page_size
+        self.max_results = max_results
+        self.cache_ttl = cache_ttl
+        self.full_reload_seconds = full_reload_seconds
+        # Serializes load() and apply(); searches read whichever snapshot is current
+        self._lock = threading.Lock()
+        self._snapshot = Snapshot(cache_ttl)
+        self._watermark = None
+        self._loaded_at: Optional[float] = None
+        self.queries = 0
+        self.narrowed = 0
+
+    def __len__(self) -> int:
+        return len(self._snapshot.cards)
+
+    @property
+    def needs_reload(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.full_reload_seconds
+
+    @property
+    def watermark(self):
+        """Latest updated_at seen; the next refresh asks for rows changed since"""
+        return self._watermark
+
+    # Snapshot maintenance
+    @staticmethod
+    def _latest(jobs: List[dict], watermark=None):
+        for job in jobs:
+            updated_at = job.get('updated_at')
+            if updated_at is not None and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+        return watermark
+
+    def load(self, jobs: List[dict]):
+        """Replace the snapshot with these active jobs"""
+        with self._lock:
+            snapshot = Snapshot(self.cache_ttl)
+            for job in jobs:
+                snapshot.add(job)
+            snapshot.reindex()
+            self._snapshot = snapshot
+            self._watermark = self._latest(jobs)
+            self._loaded_at = time.monotonic()
+        logger.info(f"Inline search snapshot loaded with {len(snapshot.cards)} jobs")
+
+    def apply(self, jobs: List[dict], today: Optional[date] = None) -> Tuple[int, int]:
+        """Fold in rows changed since the watermark and drop expired jobs; (updated, removed)"""
+        today = today or date.today()
+        updated = removed = 0
+        with self._lock:
+            current = self._snapshot
+            snapshot = Snapshot(self.cache_ttl, base=current)
+            for job in jobs:
+                active = job.get('status') == 'active' and (job.get('deadline') is None or job['deadline'] >= today)
+                card = current.cards.get(job['id'])
+                if active and card is not None and card['updated_at'] == job.get('updated_at'):
+                    # Seen at the previous watermark already
+                    continue
+                was_indexed = snapshot.remove(job['id'])
+                if active:
+                    snapshot.add(job)
+                    updated += 1
+                else:
+                    removed += was_indexed
+            for job_id in [job_id for job_id, card in snapshot.cards.items()
+                           if card['deadline'] is not None and card['deadline'] < today]:
+                removed += snapshot.remove(job_id)
+            if updated or removed:
+                snapshot.reindex()
+                self._snapshot = snapshot
+            self._watermark = self._latest(jobs, self._watermark)
+        return updated, removed
+
+    # Queries
+    @staticmethod
+    def _prefix_ids(snapshot: Snapshot, term: str) -> Set[int]:
+        """Jobs with any word starting with the term"""
+        ids: Set[int] = set()
+        vocabulary = snapshot.vocabulary
+        index = bisect.bisect_left(vocabulary, term)
+        while index < len(vocabulary) and vocabulary[index].startswith(term):
+            ids |= snapshot.postings.get(vocabulary[index], set())
+            index += 1
+        return ids
+
+    @staticmethod
+    def _matches(snapshot: Snapshot, job_id: int, terms: List[str]) -> bool:
+        words = snapshot.words.get(job_id, ())
+        return all(any(word.startswith(term) for word in words) for term in terms)
+
+    def _search(self, snapshot: Snapshot, query: str) -> Tuple[int, ...]:
+        cached = snapshot.results.get(query)
+        if cached is not None:
+            return cached[0]
+
+        terms = query.split()
+        ids = None
+        # Narrow the longest cached prefix of the query (the user is still typing)
+        for cut in range(len(query) - 1, 0, -1):
+            entry = snapshot.results.get(query[:cut].rstrip())
+            if entry is None:
+                continue
+            candidates, complete = entry
+            if complete:
+                self.narrowed += 1
+                ids = tuple(job_id for job_id in candidates if self._matches(snapshot, job_id, terms))
+            # A truncated prefix result could miss matches, and shorter prefixes match even more
+            break
+
+        if ids is None:
+            matched = None
+            for term in sorted(terms, key=len, reverse=True):
+                found = self._prefix_ids(snapshot, term)
+                matched = found if matched is None else matched & found
+                if not matched:
+                    break
+            matched = matched or set()
+            ids = tuple(job_id for job_id in snapshot.newest if job_id in matched)
+
+        complete = len(ids) <= self.max_results
+        ids = ids[:self.max_results]
+        snapshot.results.set(query, (ids, complete))
+        return ids
+
+    def search(self, text: Optional[str], offset: int = 0) -> Tuple[List[dict], str]:
+        """One page of matching job cards and the next_offset for Telegram ('' on the last page)"""
+        self.queries += 1
+        query = normalize_query(text)
+        # One read of the current snapshot; a refresh swaps in a new one without locking
+        snapshot = self._snapshot
+        ids = self._search(snapshot, query) if query else tuple(snapshot.newest[:self.max_results])
+        page = [snapshot.cards[job_id] for job_id in ids[offset:offset + self.page_size] if job_id in snapshot.cards]
+        next_offset = str(offset + self.page_size) if offset + self.page_size < len(ids) else ''
+        return page, next_offset
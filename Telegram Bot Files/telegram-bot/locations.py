@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+ZewedJobs location normalization
+Maps free-text locations ("Addis", "A.A", "አዲስ አበባ", "Bole, Addis Ababa")
+to a canonical `locations` row, so filters are equality lookups on an
+indexed location_id instead of LIKE '%...%' scans
+
+Resolution runs in memory against every alias in `location_aliases`:
+exact match on the normalized text, then on each comma-separated part,
+then the closest alias by difflib ratio above FUZZY_CUTOFF. Exact aliases
+are also applied by the database triggers on insert and update, so rows
+written by the admin panel get an id immediately; `assign_missing` fills in
+the spellings only the fuzzy match understands.
+
+Usage: python locations.py resolve "Addis Abeba"
+       python locations.py backfill [--table jobs]
+"""
+
+import os
+import re
+import json
+import difflib
+import logging
+import argparse
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+FUZZY_CUTOFF = 0.82
+
+# Tables carrying a free-text location and its resolved location_id
+LOCATED_TABLES = ('jobs', 'users', 'job_alerts')
+
+# Words that never tell two places apart
+STOP_WORDS = frozenset({'ethiopia', 'city', 'town', 'ኢትዮጵያ', 'ከተማ'})
+
+LOCATIONS_QUERY = "SELECT id, name, name_am, is_remote FROM locations"
+ALIASES_QUERY = "SELECT location_id, alias FROM location_aliases"
+
+
+def _clean(text: str) -> str:
+    text = re.sub(r"[-/_]", ' ', text)
+    text = re.sub(r"[^\w\s]", '', text)
+    words = [word for word in text.split() if word not in STOP_WORDS]
+    return ' '.join(words)
+
+
+def normalized_parts(text: Optional[str]) -> List[str]:
+    """Whole text first, then each comma-separated part, all normalized"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKC', text).lower()
+    # Ethiopic comma and semicolon separate parts like a comma does
+    pieces = re.split(r"[,;፣፤]", text)
+    parts = [_clean(' '.join(pieces))] + [_clean(piece) for piece in pieces]
+    return [part for index, part in enumerate(parts) if part and part not in parts[:index]]
+
+
+def normalize(text: Optional[str]) -> str:
+    parts = normalized_parts(text)
+    return parts[0] if parts else ''
+
+
+def like_prefix(text: str) -> str:
+    """LIKE pattern for values starting with the text, wildcards escaped"""
+    return re.sub(r"([\\%_])", r"\\\1", text.strip()) + '%'
+
+
+class LocationIndex:
+    """Alias table in memory with cached fuzzy resolutions"""
+
+    def __init__(self, fetch: Callable, fuzzy_cutoff: float = FUZZY_CUTOFF, max_cached: int = 10000):
+        # fetch(query, params) -> rows, or None when the database is unavailable
+        self.fetch = fetch
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.max_cached = max_cached
+        self._names: Dict[int, str] = {}
+        self._remote: Set[int] = set()
+        self._aliases: Dict[str, int] = {}
+        self._resolved: Dict[str, Optional[int]] = {}
+        self._unresolved: Set[tuple] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._names)
+
+    def load(self) -> bool:
+        """Read locations and aliases; False when the database is unavailable"""
+        locations = self.fetch(LOCATIONS_QUERY)
+        aliases = self.fetch(ALIASES_QUERY) if locations is not None else None
+        if aliases is None:
+            return False
+
+        names, remote, keys = {}, set(), {}
+        for row in locations:
+            names[row['id']] = row['name']
+            if row['is_remote']:
+                remote.add(row['id'])
+            for name in (row['name'], row['name_am']):
+                if name:
+                    keys[normalize(name)] = row['id']
+        for row in aliases:
+            key = normalize(row['alias'])
+            if key:
+                keys[key] = row['location_id']
+        # Spellings without spaces ("bahirdar") match too
+        for key, location_id in list(keys.items()):
+            keys.setdefault(key.replace(' ', ''), location_id)
+
+        with self._lock:
+            self._names, self._remote, self._aliases = names, remote, keys
+            self._resolved = {}
+            self._unresolved = set()
+        logger.info(f"Loaded {len(names)} locations with {len(keys)} aliases")
+        return True
+
+    # Lookups
+    def name(self, location_id: Optional[int]) -> Optional[str]:
+        return self._names.get(location_id)
+
+    def is_remote(self, location_id: Optional[int]) -> bool:
+        return location_id in self._remote
+
+    def _match(self, parts: List[str]) -> Optional[int]:
+        aliases = self._aliases
+        for part in parts:
+            for key in (part, part.replace(' ', '')):
+                if key in aliases:
+                    return aliases[key]
+        for part in parts:
+            close = difflib.get_close_matches(part, aliases.keys(), n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                return aliases[close[0]]
+        return None
+
+    def resolve(self, text: Optional[str]) -> Optional[int]:
+        """Canonical location id for free text, None when nothing is close enough"""
+        parts = normalized_parts(text)
+        if not parts:
+            return None
+        key = parts[0]
+        if key in self._resolved:
+            return self._resolved[key]
+
+        location_id = self._match(parts)
+        with self._lock:
+            if len(self._resolved) >= self.max_cached:
+                self._resolved.clear()
+            self._resolved[key] = location_id
+        return location_id
+
+    # Backfill
+    def assign_missing(self, execute_update: Callable[[str, tuple], bool],
+                       tables: tuple = LOCATED_TABLES, limit: int = 500) -> Dict[str, int]:
+        """Set location_id on rows the triggers could not resolve; returns spellings fixed per table"""
+        fixed = {}
+        for table in tables:
+            rows = self.fetch(
+                f"SELECT DISTINCT location FROM {table} "
+                f"WHERE location_id IS NULL AND location IS NOT NULL AND location <> '' LIMIT %s",
+                (limit,)
+            )
+            fixed[table] = 0
+            for row in rows or []:
+                spelling = row['location']
+                if (table, spelling) in self._unresolved:
+                    continue
+                location_id = self.resolve(spelling)
+                if location_id is None:
+                    self._unresolved.add((table, spelling))
+                    logger.info(f"No location matches {spelling!r} in {table}; add an alias for it")
+                    continue
+                if execute_update(
+                    f"UPDATE {table} SET location_id = %s WHERE location_id IS NULL AND location = %s",
+                    (location_id, spelling)
+                ):
+                    fixed[table] += 1
+        return fixed
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    import mysql.connector
+
+    parser = argparse.ArgumentParser(description="ZewedJobs location normalization")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    resolve_parser = subparsers.add_parser('resolve', help="Show the canonical location for some text")
+    resolve_parser.add_argument('text', nargs='+')
+
+    backfill_parser = subparsers.add_parser('backfill', help="Assign location_id to unresolved rows")
+    backfill_parser.add_argument('--table', action='append', choices=LOCATED_TABLES)
+    backfill_parser.add_argument('--limit', type=int, default=5000, help="Distinct spellings per table")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'zewedjobs_admin'),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASS', ''),
+        'port': os.getenv('DB_PORT', '3306')
+    }
+    connection = mysql.connector.connect(**db_config)
+
+    def fetch(query, params=()):
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def execute_update(query, params=()):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params)
+            connection.commit()
+            return True
+        finally:
+            cursor.close()
+
+    index = LocationIndex(fetch)
+    try:
+        index.load()
+        if args.command == 'resolve':
+            text = ' '.join(args.text)
+            location_id = index.resolve(text)
+            print(json.dumps({'text': text, 'location_id': location_id, 'name': index.name(location_id)},
+                             ensure_ascii=False))
+        else:
+            print(json.dumps(index.assign_missing(execute_update, tuple(args.table or LOCATED_TABLES), args.limit)))
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
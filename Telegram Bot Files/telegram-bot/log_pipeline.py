@@ -0,0 +1,132 @@
+"""
+ZewedJobs logging pipeline
+Handlers only enqueue records; a background listener thread does the file I/O
+"""
+
+import json
+import queue
+import atexit
+import logging
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Optional
+
+# Per-update context, bound once per update and attached to every record
+update_id_var: contextvars.ContextVar = contextvars.ContextVar('update_id', default=None)
+user_id_var: contextvars.ContextVar = contextvars.ContextVar('user_id', default=None)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def bind_context(update_id: Optional[int] = None, user_id: Optional[int] = None):
+    """Attach update and user ids to log records emitted in the current context"""
+    update_id_var.set(update_id)
+    user_id_var.set(user_id)
+
+
+class ContextFilter(logging.Filter):
+    """Copy the context variables onto the record in the emitting thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.update_id = update_id_var.get()
+        record.user_id = user_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in ('update_id', 'user_id'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the traceback now, the exc_info objects cannot outlive this call
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(
+    level: str = 'INFO',
+    log_file: Optional[str] = 'bot.log',
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    rotate_when: Optional[str] = None,
+    json_lines: bool = False,
+    queue_size: int = 10000,
+) -> QueueListener:
+    """Route all logging through a bounded queue drained by a listener thread.
+
+    Files rotate by size, or by time when `rotate_when` is set (e.g. 'midnight').
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    text_formatter = logging.Formatter(TEXT_FORMAT)
+    file_formatter = JsonFormatter() if json_lines else text_formatter
+
+    handlers = []
+    if log_file:
+        if rotate_when:
+            file_handler = TimedRotatingFileHandler(
+                log_file, when=rotate_when, backupCount=backup_count, encoding='utf-8'
+            )
+        else:
+            file_handler = RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+        file_handler.setFormatter(file_formatter)
+        handlers.append(file_handler)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(text_formatter)
+    handlers.append(stream_handler)
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+    # httpx logs every Bot API request at INFO, which is pure noise under load
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
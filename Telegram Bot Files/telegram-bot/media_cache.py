@@ -0,0 +1,188 @@
+"""
+ZewedJobs media cache
+Telegram file_ids for images the bot has already uploaded (company logos)
+
+The first time a logo is sent it is downloaded (or read from MEDIA_ROOT),
+shrunk to fit LOGO_MAX_SIZE pixels with Pillow, re-encoded as JPEG and
+uploaded once. The file_id Telegram returns is stored in `media_cache`,
+keyed by the logo value and the size variant, and every later card sends
+just that id. Changing `companies.logo` changes the key, and a trigger
+removes the rows for the old value.
+
+Logos that cannot be fetched or decoded are remembered for a while so cards
+fall back to text without retrying on every send.
+"""
+
+import io
+import os
+import asyncio
+import logging
+import threading
+import urllib.request
+from typing import Callable, Dict, Optional, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+LOAD_QUERY = "SELECT source, variant, file_id FROM media_cache"
+SAVE_QUERY = """
+INSERT INTO media_cache (source, variant, file_id, file_unique_id, width, height, file_size)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE file_id = VALUES(file_id), file_unique_id = VALUES(file_unique_id),
+                        width = VALUES(width), height = VALUES(height), file_size = VALUES(file_size)
+"""
+DELETE_QUERY = "DELETE FROM media_cache WHERE source = %s AND variant = %s"
+
+JPEG_QUALITY = 85
+FETCH_TIMEOUT = 10
+
+
+class MediaCache:
+    """file_ids of uploaded logos, in memory and in the media_cache table"""
+
+    def __init__(self, fetch: Callable, execute_update: Callable, max_size: int = 320,
+                 media_root: Optional[str] = None, max_download_bytes: int = 5 * 1024 * 1024,
+                 failure_ttl: float = 3600.0):
+        # fetch(query, params) -> rows, or None when the database is unavailable
+        self.fetch = fetch
+        self.execute_update = execute_update
+        self.max_size = max_size
+        self.variant = f"jpeg{max_size}"
+        self.media_root = media_root
+        self.max_download_bytes = max_download_bytes
+        self._file_ids: Dict[Tuple[str, str], str] = {}
+        self._failed = TTLCache(max_size=10000, ttl=failure_ttl)
+        self._lock = threading.Lock()
+        # One upload per logo even when several chats ask for it at once
+        self._uploading: Dict[str, asyncio.Lock] = {}
+        self.uploads = 0
+        self.reuses = 0
+
+    def __len__(self) -> int:
+        return len(self._file_ids)
+
+    def load(self) -> bool:
+        """Read stored file_ids; False when the database is unavailable"""
+        rows = self.fetch(LOAD_QUERY)
+        if rows is None:
+            return False
+        with self._lock:
+            self._file_ids = {(row['source'], row['variant']): row['file_id'] for row in rows}
+        logger.info(f"Loaded {len(self._file_ids)} cached media file_ids")
+        return True
+
+    # Lookups
+    def file_id(self, source: str) -> Optional[str]:
+        return self._file_ids.get((source, self.variant))
+
+    def failed(self, source: str) -> bool:
+        return bool(self._failed.get(source))
+
+    # Preparing uploads
+    def _read(self, source: str) -> bytes:
+        if source.startswith(('http://', 'https://')):
+            request = urllib.request.Request(source, headers={'User-Agent': 'ZewedJobsBot/1.0'})
+            with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+                data = response.read(self.max_download_bytes + 1)
+        else:
+            path = source if os.path.isabs(source) or not self.media_root else os.path.join(self.media_root, source)
+            with open(path, 'rb') as handle:
+                data = handle.read(self.max_download_bytes + 1)
+        if len(data) > self.max_download_bytes:
+            raise ValueError(f"larger than {self.max_download_bytes} bytes")
+        return data
+
+    def prepare(self, source: str) -> Optional[bytes]:
+        """Logo bytes resized to fit max_size and encoded as JPEG; None when unusable. Blocking."""
+        # Pillow is only needed once per logo, so it is imported here
+        from PIL import Image
+
+        try:
+            image = Image.open(io.BytesIO(self._read(source)))
+            image.thumbnail((self.max_size, self.max_size))
+            if image.mode != 'RGB':
+                # Transparent logos go on white rather than black
+                background = Image.new('RGB', image.size, 'white')
+                image = image.convert('RGBA')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            output = io.BytesIO()
+            image.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+            return output.getvalue()
+        except Exception as e:
+            logger.warning(f"Logo {source!r} unusable, sending text cards: {e}")
+            self._failed.set(source, True)
+            return None
+
+    # Recording uploads
+    def remember(self, source: str, message) -> Optional[str]:
+        """Store the file_id of a message that carried an uploaded photo. Blocking."""
+        if not message or not message.photo:
+            return None
+        photo = message.photo[-1]
+        with self._lock:
+            self._file_ids[(source, self.variant)] = photo.file_id
+        self.uploads += 1
+        self.execute_update(SAVE_QUERY, (
+            source, self.variant, photo.file_id, photo.file_unique_id,
+            photo.width, photo.height, photo.file_size
+        ))
+        return photo.file_id
+
+    def forget(self, source: str):
+        """Drop a file_id Telegram no longer accepts. Blocking."""
+        with self._lock:
+            self._file_ids.pop((source, self.variant), None)
+        self.execute_update(DELETE_QUERY, (source, self.variant))
+
+    # Sending
+    async def reply_photo(self, message, source: str, caption: str, **kwargs):
+        """Reply with the logo and caption; None when the card has to be sent as text"""
+        from telegram.error import BadRequest, TelegramError
+
+        file_id = self.file_id(source)
+        if file_id:
+            try:
+                sent = await message.reply_photo(file_id, caption=caption, **kwargs)
+                self.reuses += 1
+                return sent
+            except BadRequest as e:
+                if 'file' not in str(e).lower():
+                    raise
+                logger.info(f"Cached file_id for {source!r} rejected ({e}), uploading again")
+                await asyncio.to_thread(self.forget, source)
+
+        if self.failed(source):
+            return None
+        lock = self._uploading.setdefault(source, asyncio.Lock())
+        try:
+            async with lock:
+                file_id = self.file_id(source)
+                if file_id:
+                    # Uploaded by another chat while this one waited
+                    sent = await message.reply_photo(file_id, caption=caption, **kwargs)
+                    self.reuses += 1
+                    return sent
+                if self.failed(source):
+                    return None
+                data = await asyncio.to_thread(self.prepare, source)
+                if data is None:
+                    return None
+                try:
+                    sent = await message.reply_photo(data, caption=caption, **kwargs)
+                except BadRequest as e:
+                    if 'parse' in str(e).lower():
+                        # The caption is at fault, not the image
+                        raise
+                    logger.warning(f"Telegram refused logo {source!r}, sending text cards: {e}")
+                    self._failed.set(source, True)
+                    return None
+                except TelegramError as e:
+                    logger.warning(f"Uploading logo {source!r} failed: {e}")
+                    return None
+                await asyncio.to_thread(self.remember, source, sent)
+                return sent
+        finally:
+            if not lock.locked():
+                self._uploading.pop(source, None)
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+ZewedJobs columnar archive
+Exports closed months of history to compressed Parquet files for analytics
+
+Layout: <ARCHIVE_DIR>/<table>/month=YYYY-MM/part-0.parquet plus a
+_manifest.json per table. Rows already moved to `<table>_archive` by the
+retention engine are exported together with the live rows.
+
+Rows keep changing after their month closes (application status, job
+status, user profiles), so a month is only marked final once it cannot
+change any more:
+
+  messages       never change; final as soon as the month is over
+  applications   final when no row is still pending/in review, or
+                 SETTLE_DAYS after the month ended
+  jobs, users    never final; re-exported whenever a row's updated_at is
+                 newer than the last export (view counts do not move
+                 updated_at, so `views` is as of the last export)
+
+Every run re-exports the months that are not final and have changed.
+
+Usage: python parquet_archive.py export [--table jobs] [--force]
+       python parquet_archive.py query messages --start 2025-01-01 --end 2025-04-01
+       python parquet_archive.py funnel --start 2025-01-01
+"""
+
+import os
+import json
+import logging
+import argparse
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import mysql.connector
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+
+SETTLE_DAYS = int(os.getenv('ARCHIVE_SETTLE_DAYS', '180'))
+
+# Application statuses that can still move on
+OPEN_APPLICATION_STATUSES = ('pending', 'reviewed', 'shortlisted', 'interviewed')
+FUNNEL_STATUSES = OPEN_APPLICATION_STATUSES + ('accepted', 'rejected', 'withdrawn')
+
+
+class ArchiveSpec:
+    """Which month a row belongs to and how to tell whether the month can still change"""
+
+    def __init__(self, date_column: str, changed_column: Optional[str] = None,
+                 open_condition: Optional[str] = None):
+        self.date_column = date_column
+        # Bumped on every change of a row; months are re-exported when it moves
+        self.changed_column = changed_column
+        # Rows matching this may still change; the month stays open while any do
+        self.open_condition = open_condition
+
+
+ARCHIVE_TABLES = {
+    'jobs': ArchiveSpec('created_at', changed_column='updated_at'),
+    'applications': ArchiveSpec(
+        'applied_at',
+        open_condition=f"status IN ({', '.join(repr(status) for status in OPEN_APPLICATION_STATUSES)})"
+    ),
+    'messages': ArchiveSpec('timestamp'),
+    'users': ArchiveSpec('created_at', changed_column='updated_at'),
+}
+
+FETCH_SIZE = 50000
+
+
+def _arrow_type(data_type: str, column_type: str) -> pa.DataType:
+    """Map a MySQL column type to the Arrow type stored in Parquet"""
+    if column_type.startswith('tinyint(1)'):
+        return pa.bool_()
+    if data_type in ('tinyint', 'smallint', 'mediumint', 'int', 'bigint'):
+        return pa.int64()
+    if data_type in ('decimal', 'float', 'double'):
+        return pa.float64()
+    if data_type in ('datetime', 'timestamp'):
+        return pa.timestamp('us')
+    if data_type == 'date':
+        return pa.date32()
+    return pa.string()
+
+
+def _convert(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    if isinstance(value, set):
+        return ','.join(sorted(value))
+    return value
+
+
+def month_range(month: date) -> tuple:
+    start = month.replace(day=1)
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, end
+
+
+class ParquetArchiver:
+    """Writes one Parquet file per table and closed month"""
+
+    def __init__(self, db_config: dict, archive_dir: str = ARCHIVE_DIR, compression: str = 'zstd'):
+        self.db_config = db_config
+        self.archive_dir = archive_dir
+        self.compression = compression
+        self.connection = None
+
+    def connect(self):
+        self.connection = mysql.connector.connect(**self.db_config)
+
+    def close(self):
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+        self.connection = None
+
+    def _fetch(self, query: str, params: tuple = ()) -> List[Dict]:
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    # Manifest
+    def _manifest_path(self, table: str) -> str:
+        return os.path.join(self.archive_dir, table, '_manifest.json')
+
+    def load_manifest(self, table: str) -> Dict:
+        try:
+            with open(self._manifest_path(table)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'table': table, 'months': {}}
+
+    def _save_manifest(self, table: str, manifest: Dict):
+        path = self._manifest_path(table)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    # Export
+    def _schema(self, table: str) -> pa.Schema:
+        columns = self._fetch(
+            """
+            SELECT COLUMN_NAME AS name, DATA_TYPE AS data_type, COLUMN_TYPE AS column_type
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+            """,
+            (table,)
+        )
+        return pa.schema([pa.field(c['name'], _arrow_type(c['data_type'], c['column_type'])) for c in columns])
+
+    def _sources(self, table: str) -> List[str]:
+        """The live table plus its retention archive when one exists"""
+        rows = self._fetch(
+            """
+            SELECT TABLE_NAME AS name FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """,
+            (f"{table}_archive",)
+        )
+        return [table] + [row['name'] for row in rows]
+
+    def _closed_months(self, table: str, before: date) -> List[date]:
+        column = ARCHIVE_TABLES[table].date_column
+        oldest = None
+        for source in self._sources(table):
+            row = self._fetch(f"SELECT MIN(`{column}`) AS oldest FROM {source}")[0]
+            if row['oldest'] and (oldest is None or row['oldest'] < oldest):
+                oldest = row['oldest']
+        if oldest is None:
+            return []
+
+        months = []
+        month = oldest.date().replace(day=1)
+        while month < before:
+            months.append(month)
+            month = month_range(month)[1]
+        return months
+
+    def month_state(self, table: str, month: date) -> Dict:
+        """Latest change and number of still-open rows of one month, across the live and archive tables"""
+        spec = ARCHIVE_TABLES[table]
+        start, end = month_range(month)
+        changed = f"MAX(`{spec.changed_column}`)" if spec.changed_column else "NULL"
+        open_rows = f"SUM({spec.open_condition})" if spec.open_condition else "0"
+        state = {'changed': None, 'open_rows': 0}
+        for source in self._sources(table):
+            row = self._fetch(
+                f"SELECT {changed} AS changed, {open_rows} AS open_rows FROM {source} "
+                f"WHERE `{spec.date_column}` >= %s AND `{spec.date_column}` < %s",
+                (start, end)
+            )[0]
+            if row['changed'] and (state['changed'] is None or row['changed'] > state['changed']):
+                state['changed'] = row['changed']
+            state['open_rows'] += int(row['open_rows'] or 0)
+        return state
+
+    @staticmethod
+    def is_final(table: str, month: date, state: Dict, today: date) -> bool:
+        """Whether the rows of a month can no longer change"""
+        spec = ARCHIVE_TABLES[table]
+        if spec.changed_column:
+            return False
+        if spec.open_condition and state['open_rows']:
+            return month_range(month)[1] + timedelta(days=SETTLE_DAYS) <= today
+        return True
+
+    @staticmethod
+    def needs_export(entry: Optional[Dict], state: Dict) -> bool:
+        """Whether a month has to be (re-)exported given its manifest entry"""
+        if entry is None:
+            return True
+        if entry.get('final'):
+            return False
+        if entry.get('open_rows'):
+            return True
+        changed = state['changed'].isoformat() if state['changed'] else None
+        return changed != entry.get('changed')
+
+    def export_month(self, table: str, month: date, schema: pa.Schema) -> int:
+        """Stream one month of rows into month=YYYY-MM/part-0.parquet"""
+        column = ARCHIVE_TABLES[table].date_column
+        start, end = month_range(month)
+        names = ', '.join(f"`{field.name}`" for field in schema)
+        query = " UNION ALL ".join(
+            f"SELECT {names} FROM {source} WHERE `{column}` >= %s AND `{column}` < %s"
+            for source in self._sources(table)
+        )
+        params = (start, end) * (query.count('UNION ALL') + 1)
+
+        directory = os.path.join(self.archive_dir, table, f"month={month:%Y-%m}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'part-0.parquet')
+        # Dot-prefixed so readers skip the file until it is complete
+        tmp_path = os.path.join(directory, '.part-0.parquet.tmp')
+
+        rows_written = 0
+        cursor = self.connection.cursor(dictionary=True)
+        writer = pq.ParquetWriter(tmp_path, schema, compression=self.compression)
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                batch = [{key: _convert(value) for key, value in row.items()} for row in rows]
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                rows_written += len(rows)
+        finally:
+            writer.close()
+            cursor.close()
+        os.replace(tmp_path, path)
+        return rows_written
+
+    def export(self, tables: Optional[List[str]] = None, before: Optional[date] = None,
+               force: bool = False) -> Dict[str, Dict[str, int]]:
+        """Export closed months (before `before`, default this month) that are new or still changing"""
+        today = date.today()
+        before = (before or today).replace(day=1)
+        exported: Dict[str, Dict[str, int]] = {}
+        self.connect()
+        try:
+            for table in tables or ARCHIVE_TABLES:
+                os.makedirs(os.path.join(self.archive_dir, table), exist_ok=True)
+                manifest = self.load_manifest(table)
+                schema = self._schema(table)
+                exported[table] = {}
+
+                for month in self._closed_months(table, before):
+                    key = f"{month:%Y-%m}"
+                    entry = manifest['months'].get(key)
+                    if entry and entry.get('final') and not force:
+                        continue
+                    # Read before the export, so a change made meanwhile is picked up next run
+                    state = self.month_state(table, month)
+                    if not force and not self.needs_export(entry, state):
+                        continue
+                    rows = self.export_month(table, month, schema)
+                    manifest['months'][key] = {
+                        'rows': rows,
+                        'exported_at': datetime.now().isoformat(),
+                        'changed': state['changed'].isoformat() if state['changed'] else None,
+                        'open_rows': state['open_rows'],
+                        'final': self.is_final(table, month, state, today),
+                    }
+                    self._save_manifest(table, manifest)
+                    exported[table][key] = rows
+                    logger.info(f"Archived {table} {key}: {rows} rows")
+        finally:
+            self.close()
+        return exported
+
+
+def read_archive(table: str, start: Optional[date] = None, end: Optional[date] = None,
+                 columns: Optional[List[str]] = None, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """Load archived rows with `start <= date column < end` into a DataFrame.
+
+    Only the month directories overlapping the range are opened, and only the
+    requested columns are read from them.
+    """
+    path = os.path.join(archive_dir, table)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns or [])
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    column = ARCHIVE_TABLES[table].date_column
+
+    expression = None
+    if start:
+        expression = (ds.field('month') >= f"{start:%Y-%m}") & (ds.field(column) >= pd.Timestamp(start))
+    if end:
+        upper = (ds.field('month') <= f"{end:%Y-%m}") & (ds.field(column) < pd.Timestamp(end))
+        expression = upper if expression is None else expression & upper
+
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def application_funnel(start: Optional[date] = None, end: Optional[date] = None,
+                       archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """Archived applications per month and status, with the accepted and rejected shares"""
+    frame = read_archive('applications', start, end, columns=['applied_at', 'status'], archive_dir=archive_dir)
+    columns = list(FUNNEL_STATUSES) + ['total', 'accepted_rate', 'rejected_rate']
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+
+    frame['month'] = pd.to_datetime(frame['applied_at']).dt.strftime('%Y-%m')
+    funnel = frame.pivot_table(index='month', columns='status', aggfunc='size', fill_value=0)
+    funnel = funnel.reindex(columns=list(FUNNEL_STATUSES), fill_value=0)
+    funnel['total'] = funnel.sum(axis=1)
+    funnel['accepted_rate'] = (funnel['accepted'] / funnel['total']).round(3)
+    funnel['rejected_rate'] = (funnel['rejected'] / funnel['total']).round(3)
+    funnel.columns.name = None
+    return funnel[columns]
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="ZewedJobs Parquet archive")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Export closed months to Parquet")
+    export_parser.add_argument('--table', action='append', choices=sorted(ARCHIVE_TABLES))
+    export_parser.add_argument('--before', type=date.fromisoformat, help="Only months before this date")
+    export_parser.add_argument('--force', action='store_true', help="Re-export every month, final ones included")
+
+    query_parser = subparsers.add_parser('query', help="Summarize archived rows")
+    query_parser.add_argument('table', choices=sorted(ARCHIVE_TABLES))
+    query_parser.add_argument('--start', type=date.fromisoformat)
+    query_parser.add_argument('--end', type=date.fromisoformat)
+    query_parser.add_argument('--columns', help="Comma separated column list")
+
+    funnel_parser = subparsers.add_parser('funnel', help="Application statuses per month from the archive")
+    funnel_parser.add_argument('--start', type=date.fromisoformat)
+    funnel_parser.add_argument('--end', type=date.fromisoformat)
+
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    if args.command == 'query':
+        columns = args.columns.split(',') if args.columns else None
+        frame = read_archive(args.table, args.start, args.end, columns, archive_dir=args.archive_dir)
+        print(frame.describe(include='all').transpose().to_string())
+        print(f"\n{len(frame):,} rows")
+        return
+    if args.command == 'funnel':
+        print(application_funnel(args.start, args.end, archive_dir=args.archive_dir).to_string())
+        return
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'zewedjobs_admin'),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASS', ''),
+        'port': os.getenv('DB_PORT', '3306')
+    }
+    archiver = ParquetArchiver(db_config, archive_dir=args.archive_dir)
+    result = archiver.export(args.table, before=args.before, force=args.force)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
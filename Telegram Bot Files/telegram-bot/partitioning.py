@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+ZewedJobs table partitioning
+Monthly RANGE partitions for the fast-growing `messages` and `system_logs` tables
+
+  migrate   convert a table to monthly partitions (rebuilds the table, run it in
+            a maintenance window; --print-sql shows the statements instead)
+  maintain  create partitions for the coming months and drop partitions older
+            than the retention window, exporting them to `<table>_archive` first
+
+Partitions are named pYYYYMM and hold rows with timestamps before the first
+day of the following month; `p_future` catches anything beyond the last one.
+
+Usage: python partitioning.py {migrate,maintain} [--table messages] [--print-sql]
+"""
+
+import os
+import json
+import logging
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from retention import RetentionEngine, default_policies
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> timestamp column used as the partition key
+PARTITIONED_TABLES = {
+    'messages': 'timestamp',
+    'system_logs': 'created_at',
+}
+
+FUTURE_PARTITION = 'p_future'
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month held by a pYYYYMM partition, None for p_future or foreign names"""
+    try:
+        return datetime.strptime(name, 'p%Y%m').date()
+    except ValueError:
+        return None
+
+
+def partition_clause(month: date) -> str:
+    return (
+        f"PARTITION {partition_name(month)} "
+        f"VALUES LESS THAN (UNIX_TIMESTAMP('{next_month(month):%Y-%m-%d} 00:00:00'))"
+    )
+
+
+class PartitionManager(RetentionEngine):
+    """Creates, exports and drops monthly partitions"""
+
+    def __init__(self, db_config: dict, months_ahead: int = 3, export: bool = True, **options):
+        super().__init__(db_config, **options)
+        self.months_ahead = months_ahead
+        self.export = export
+
+    def partitions(self, table: str) -> List[str]:
+        rows = self._fetch(
+            """
+            SELECT PARTITION_NAME AS name
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+            """,
+            (table,)
+        )
+        return [row['name'] for row in rows]
+
+    # Migration
+    def migration_sql(self, table: str) -> List[str]:
+        """Statements converting an unpartitioned table to monthly partitions.
+
+        MySQL requires the partition key in every unique key and does not
+        allow foreign keys on partitioned tables, so the primary key becomes
+        (id, <column>) and foreign keys are dropped.
+        """
+        column = PARTITIONED_TABLES[table]
+        statements = []
+
+        foreign_keys = self._fetch(
+            """
+            SELECT CONSTRAINT_NAME AS name
+            FROM information_schema.REFERENTIAL_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """,
+            (table,)
+        )
+        for foreign_key in foreign_keys:
+            statements.append(f"ALTER TABLE {table} DROP FOREIGN KEY {foreign_key['name']}")
+
+        statements.append(
+            f"ALTER TABLE {table} MODIFY `{column}` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+            f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, `{column}`)"
+        )
+
+        row = self._fetch(f"SELECT MIN(`{column}`) AS oldest FROM {table}", fetch_one=True)
+        oldest = row['oldest'].date() if row and row['oldest'] else date.today()
+        month = month_start(oldest)
+        last = month_start(date.today())
+        for _ in range(self.months_ahead):
+            last = next_month(last)
+
+        clauses = []
+        while month <= last:
+            clauses.append(partition_clause(month))
+            month = next_month(month)
+        clauses.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+
+        statements.append(
+            f"ALTER TABLE {table} PARTITION BY RANGE (UNIX_TIMESTAMP(`{column}`)) (\n    "
+            + ",\n    ".join(clauses) + "\n)"
+        )
+        return statements
+
+    def migrate(self, table: str, print_only: bool = False) -> List[str]:
+        if self.is_partitioned(table):
+            logger.info(f"{table} is already partitioned")
+            return []
+
+        statements = self.migration_sql(table)
+        if print_only:
+            return statements
+
+        for statement in statements:
+            logger.info(f"Executing: {statement.splitlines()[0]}")
+            self._execute(statement)
+        self.connection.commit()
+        logger.info(f"{table} converted to {len(self.partitions(table))} partitions")
+        return statements
+
+    # Maintenance
+    def create_future_partitions(self, table: str) -> List[str]:
+        """Split p_future so the next `months_ahead` months have their own partitions"""
+        months = [partition_month(name) for name in self.partitions(table)]
+        months = [month for month in months if month]
+        if not months:
+            return []
+
+        target = month_start(date.today())
+        for _ in range(self.months_ahead):
+            target = next_month(target)
+
+        month = next_month(max(months))
+        new_months = []
+        while month <= target:
+            new_months.append(month)
+            month = next_month(month)
+        if not new_months:
+            return []
+
+        clauses = [partition_clause(month) for month in new_months]
+        clauses.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+        self._execute(
+            f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(clauses)})"
+        )
+        self.connection.commit()
+        created = [partition_name(month) for month in new_months]
+        logger.info(f"{table}: created partitions {', '.join(created)}")
+        return created
+
+    def drop_expired_partitions(self, table: str, days: int) -> List[str]:
+        """Drop partitions whose whole month is older than the retention window"""
+        cutoff = (datetime.now() - timedelta(days=days)).date()
+        dropped = []
+        for name in self.partitions(table):
+            month = partition_month(name)
+            if not month or next_month(month) > cutoff:
+                continue
+
+            if self.export:
+                exported = self._export_partition(table, name)
+                logger.info(f"{table}: exported {exported} rows from {name} to {table}_archive")
+
+            self._execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+            self.connection.commit()
+            dropped.append(name)
+            logger.info(f"{table}: dropped partition {name}")
+        return dropped
+
+    def _export_partition(self, table: str, name: str) -> int:
+        """Copy one partition into the archive table in id-ordered chunks"""
+        self.ensure_archive(table)
+        exported = 0
+        last_id = 0
+        while True:
+            rows = self._fetch(
+                f"SELECT id FROM {table} PARTITION ({name}) WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, self.chunk_size)
+            )
+            if not rows:
+                break
+            ids = tuple(row['id'] for row in rows)
+            placeholders = ', '.join(['%s'] * len(ids))
+            exported += self._archive(table, f"id IN ({placeholders})", ids, source=f"{table} PARTITION ({name})")
+            self.connection.commit()
+            last_id = ids[-1]
+        return exported
+
+    def maintain(self, tables: Optional[List[str]] = None) -> List[Dict]:
+        """Create upcoming partitions and expire old ones for every partitioned table"""
+        retention_days = {policy.table: policy.days for policy in default_policies()}
+        results = []
+        self.connect()
+        try:
+            for table in tables or PARTITIONED_TABLES:
+                if not self.is_partitioned(table):
+                    logger.info(f"Skipping {table}: not partitioned (run 'partitioning.py migrate')")
+                    continue
+                results.append({
+                    'table': table,
+                    'created': self.create_future_partitions(table),
+                    'dropped': self.drop_expired_partitions(table, retention_days[table]),
+                })
+        finally:
+            self.close()
+        return results
+
+
+def maintain_partitions(db_config: dict, **options) -> List[Dict]:
+    """Entry point used by the bot's scheduled cleanup job (runs in a worker thread)"""
+    return PartitionManager(db_config, **options).maintain()
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Manage monthly partitions of ZewedJobs log tables")
+    parser.add_argument('command', choices=['migrate', 'maintain'])
+    parser.add_argument('--table', action='append', choices=sorted(PARTITIONED_TABLES),
+                        help="Only process this table (repeatable)")
+    parser.add_argument('--months-ahead', type=int, default=3)
+    parser.add_argument('--no-export', action='store_true', help="Drop expired partitions without archiving")
+    parser.add_argument('--print-sql', action='store_true', help="migrate: print the statements only")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'zewedjobs_admin'),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASS', ''),
+        'port': os.getenv('DB_PORT', '3306')
+    }
+    manager = PartitionManager(db_config, months_ahead=args.months_ahead, export=not args.no_export)
+
+    if args.command == 'maintain':
+        for result in manager.maintain(args.table):
+            print(json.dumps(result))
+        return
+
+    manager.connect()
+    try:
+        for table in args.table or PARTITIONED_TABLES:
+            for statement in manager.migrate(table, print_only=args.print_sql):
+                if args.print_sql:
+                    print(statement + ';\n')
+    finally:
+        manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+ZewedJobs user profile cache
+Slim per-user profiles keyed by Telegram ID with write-through updates
+"""
+
+import re
+import logging
+from typing import Dict, Optional
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Columns kept in memory; everything a handler needs about the current user
+PROFILE_FIELDS = (
+    'id', 'telegram_id', 'username', 'full_name', 'email', 'phone',
+    'profession', 'experience', 'education', 'skills', 'location', 'location_id',
+    'expected_salary_min', 'expected_salary_max', 'user_type', 'status',
+    'notifications_enabled', 'created_at'
+)
+
+# Columns a profile write may touch
+WRITABLE_FIELDS = frozenset(PROFILE_FIELDS) - {'id', 'telegram_id', 'created_at'}
+
+COMPLETION_FIELDS = ('full_name', 'email', 'phone', 'profession', 'experience', 'education', 'skills')
+
+# Labels of the `Field: value` profile reply (see create_profile in bot.py) -> columns
+PROFILE_LABELS = {
+    'name': 'full_name', 'full name': 'full_name', 'email': 'email', 'phone': 'phone',
+    'profession': 'profession', 'experience': 'experience', 'education': 'education',
+    'skills': 'skills', 'location': 'location', 'salary': 'salary',
+}
+PROFILE_LINE = re.compile(r"^[ \t]*(" + '|'.join(sorted(PROFILE_LABELS, key=len, reverse=True)) + r")[ \t]*:[ \t]*(.*?)[ \t]*$",
+                          re.IGNORECASE | re.MULTILINE)
+FIELD_LIMITS = {'full_name': 200, 'email': 100, 'phone': 20, 'profession': 100, 'experience': 50,
+                'education': 100, 'location': 100}
+
+# Cached stand-in for a Telegram ID with no users row
+_MISSING = object()
+
+
+def parse_salary(text: str) -> Dict[str, float]:
+    """'15000-25000 ETB' -> min and max, '20k' -> min only"""
+    amounts = []
+    for number, thousands in re.findall(r"(\d+(?:\.\d+)?)\s*(k)?", text.replace(',', ''), re.IGNORECASE):
+        amounts.append(float(number) * (1000 if thousands else 1))
+    if not amounts:
+        return {}
+    if len(amounts) == 1:
+        return {'expected_salary_min': amounts[0]}
+    low, high = sorted(amounts[:2])
+    return {'expected_salary_min': low, 'expected_salary_max': high}
+
+
+def parse_profile_reply(text: Optional[str]) -> Dict[str, object]:
+    """Profile columns from a `Name: ...` / `Email: ...` reply; empty when nothing matched"""
+    fields: Dict[str, object] = {}
+    for label, value in PROFILE_LINE.findall(text or ''):
+        column = PROFILE_LABELS[label.lower()]
+        if not value:
+            continue
+        if column == 'salary':
+            fields.update(parse_salary(value))
+        else:
+            limit = FIELD_LIMITS.get(column)
+            fields[column] = value[:limit] if limit else value
+    return fields
+
+
+def calculate_profile_completion(user: dict) -> int:
+    """Calculate user profile completion percentage"""
+    completed = sum(1 for field in COMPLETION_FIELDS if user.get(field))
+    return int((completed / len(COMPLETION_FIELDS)) * 100)
+
+
+class ProfileCache:
+    """Bounded TTL cache of user profiles.
+
+    Entries expire after `ttl` seconds so edits made from the admin panel
+    become visible without a restart; writes from the bot go through
+    `update()` and refresh the cached copy immediately. Telegram IDs without
+    a users row are remembered for `missing_ttl` seconds so unregistered
+    users do not cost a query per update.
+    """
+
+    def __init__(self, db, max_size: int = 5000, ttl: float = 300.0, missing_ttl: float = 60.0):
+        self.db = db
+        self.missing_ttl = missing_ttl
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._select = f"SELECT {', '.join(PROFILE_FIELDS)} FROM users WHERE telegram_id = %s"
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, telegram_id: int) -> Optional[dict]:
+        """Return the cached profile, loading it from the database on a miss"""
+        profile = self._cache.get(telegram_id)
+        if profile is _MISSING:
+            return None
+        if profile is None:
+            profile = self.load(telegram_id)
+        return profile
+
+    def load(self, telegram_id: int) -> Optional[dict]:
+        # A list, so "no such user" ([]) and "database unavailable" (None) differ
+        rows = self.db.execute_query(self._select, (telegram_id,))
+        if rows is None:
+            return None
+        if not rows:
+            self._cache.set(telegram_id, _MISSING, ttl=self.missing_ttl)
+            return None
+        return self._store(telegram_id, dict(rows[0]))
+
+    def update(self, telegram_id: int, **fields) -> bool:
+        """Write profile fields to the database and the cache together"""
+        unknown = set(fields) - WRITABLE_FIELDS
+        if unknown:
+            raise ValueError(f"Cannot update profile fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return True
+
+        assignments = ', '.join(f"{field} = %s" for field in fields)
+        query = f"UPDATE users SET {assignments} WHERE telegram_id = %s"
+        if not self.db.execute_update(query, (*fields.values(), telegram_id)):
+            # The row may now differ from what we hold; reload on next access
+            self.invalidate(telegram_id)
+            return False
+
+        profile = self._cache.get(telegram_id)
+        if profile is _MISSING:
+            self.invalidate(telegram_id)
+        elif profile is not None:
+            self._store(telegram_id, {**profile, **fields})
+        return True
+
+    def invalidate(self, telegram_id: int):
+        self._cache.pop(telegram_id)
+
+    def _store(self, telegram_id: int, profile: dict) -> dict:
+        profile['profile_completion'] = calculate_profile_completion(profile)
+        self._cache.set(telegram_id, profile)
+        return profile
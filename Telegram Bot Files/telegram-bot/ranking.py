@@ -0,0 +1,294 @@
+"""
+ZewedJobs personalized job ranking
+Scores every active job against every job seeker profile in one vectorized batch
+
+score = skill overlap (share of the seeker's skill terms found in the job)
+      + location match (same city, or a remote job)
+      + salary fit (how much of the expected minimum the job pays)
+
+Only the top N job ids per user are kept. A nightly batch rebuilds
+everything; incremental passes score newly posted jobs and new or edited
+profiles against the existing state and merge them into the top N.
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from similar_jobs import tokenize
+
+logger = logging.getLogger(__name__)
+
+SKILL_WEIGHT = 0.6
+LOCATION_WEIGHT = 0.25
+SALARY_WEIGHT = 0.15
+
+# Fields copied from each job so /jobs and alerts can render cards without a query
+CARD_FIELDS = ('id', 'title', 'company_name', 'company_logo', 'location', 'salary_min',
+               'salary_max', 'deadline', 'description', 'created_at')
+
+BLOCK_SIZE = 1024
+
+
+def _location_key(row: dict) -> str:
+    """Canonical location id when resolved, otherwise the tokenized text"""
+    if row.get('location_id') is not None:
+        return f"#{row['location_id']}"
+    return ' '.join(tokenize(row.get('location')))
+
+
+def _is_remote(job: dict) -> bool:
+    return (job.get('job_type') == 'remote' or bool(job.get('location_remote'))
+            or ' '.join(tokenize(job.get('location'))) == 'remote')
+
+
+def _amount(value) -> float:
+    return float(value) if value is not None else np.nan
+
+
+class JobRanker:
+    """Precomputed top-N job ids per job seeker"""
+
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._vocabulary: Dict[str, int] = {}
+        self._locations: Dict[str, int] = {}
+        # User side (one row per job seeker)
+        self._user_rows: Dict[int, int] = {}
+        self._user_terms = np.zeros((0, 0), dtype=bool)
+        self._user_location = np.zeros(0, dtype=np.int32)
+        self._user_salary = np.zeros(0, dtype=np.float32)
+        # Job side (one row per active job)
+        self._job_ids = np.zeros(0, dtype=np.int64)
+        self._job_terms = np.zeros((0, 0), dtype=bool)
+        self._job_location = np.zeros(0, dtype=np.int32)
+        self._job_remote = np.zeros(0, dtype=bool)
+        self._job_salary = np.zeros(0, dtype=np.float32)
+        # Results: top-N job ids / scores per user row, -1 / -inf padded
+        self._top_ids = np.full((0, top_n), -1, dtype=np.int64)
+        self._top_scores = np.full((0, top_n), -np.inf, dtype=np.float32)
+        self._cards: Dict[int, dict] = {}
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self._user_rows)
+
+    @property
+    def ready(self) -> bool:
+        """True once the first batch has run"""
+        return self._built
+
+    # Lookups
+    def top_jobs(self, telegram_id: int, limit: int = 5, since=None) -> Optional[List[dict]]:
+        """Ranked job cards for a user, None when the user has no rankings yet"""
+        row = self._user_rows.get(telegram_id)
+        top_ids = self._top_ids
+        # A batch may be swapping arrays in a worker thread
+        if row is None or row >= len(top_ids):
+            return None
+        jobs = []
+        for job_id in top_ids[row]:
+            card = self._cards.get(int(job_id))
+            if card is None or (since is not None and card['created_at'] < since):
+                continue
+            jobs.append(card)
+            if len(jobs) >= limit:
+                break
+        return jobs
+
+    def new_job_ids(self, active_ids: Iterable[int]) -> List[int]:
+        """Active jobs that have not been scored yet"""
+        return [job_id for job_id in active_ids if job_id not in self._cards]
+
+    # Features
+    def _location_code(self, row: dict) -> int:
+        key = _location_key(row)
+        if not key:
+            return -1
+        return self._locations.setdefault(key, len(self._locations))
+
+    def _term_matrix(self, texts: List[List[str]]) -> np.ndarray:
+        matrix = np.zeros((len(texts), len(self._vocabulary)), dtype=bool)
+        for row, tokens in enumerate(texts):
+            cols = [self._vocabulary[token] for token in tokens if token in self._vocabulary]
+            matrix[row, cols] = True
+        return matrix
+
+    @staticmethod
+    def _user_tokens(user: dict) -> List[str]:
+        return tokenize(user.get('skills')) + tokenize(user.get('profession'))
+
+    @staticmethod
+    def _job_tokens(job: dict) -> List[str]:
+        return tokenize(job.get('title')) + tokenize(job.get('requirements')) + tokenize(job.get('category'))
+
+    def _user_features(self, users: List[dict]) -> tuple:
+        terms = self._term_matrix([self._user_tokens(user) for user in users])
+        locations = np.array([self._location_code(user) for user in users], dtype=np.int32)
+        salaries = np.array([_amount(user.get('expected_salary_min')) for user in users], dtype=np.float32)
+        return terms, locations, salaries
+
+    def _job_features(self, jobs: List[dict]) -> tuple:
+        terms = self._term_matrix([self._job_tokens(job) for job in jobs])
+        locations = np.array([self._location_code(job) for job in jobs], dtype=np.int32)
+        remote = np.array([_is_remote(job) for job in jobs], dtype=bool)
+        # Best advertised pay: the maximum, or the minimum when no maximum is given
+        salaries = np.array(
+            [_amount(job.get('salary_max') if job.get('salary_max') is not None else job.get('salary_min'))
+             for job in jobs],
+            dtype=np.float32
+        )
+        return terms, locations, remote, salaries
+
+    # Scoring
+    @staticmethod
+    def _score(user_terms, user_location, user_salary, job_terms, job_location, job_remote, job_salary) -> np.ndarray:
+        """(users x jobs) score matrix"""
+        user_counts = user_terms.sum(axis=1, keepdims=True).astype(np.float32)
+        overlap = user_terms.astype(np.float32) @ job_terms.T.astype(np.float32)
+        skill = np.divide(overlap, user_counts, out=np.zeros_like(overlap), where=user_counts > 0)
+
+        same_city = (user_location[:, None] == job_location[None, :]) & (user_location[:, None] >= 0)
+        location = np.where(same_city | job_remote[None, :], 1.0, 0.0)
+        location = np.where(user_location[:, None] < 0, 0.5, location)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            salary = np.clip(job_salary[None, :] / user_salary[:, None], 0.0, 1.0)
+        salary = np.where(np.isnan(salary), 0.5, salary)
+
+        return (SKILL_WEIGHT * skill + LOCATION_WEIGHT * location + SALARY_WEIGHT * salary).astype(np.float32)
+
+    def _merge_top(self, rows: np.ndarray, candidate_ids: np.ndarray, candidate_scores: np.ndarray):
+        """Merge candidate (users x jobs) scores into the stored top-N of `rows`"""
+        ids = np.concatenate([self._top_ids[rows], np.broadcast_to(candidate_ids, candidate_scores.shape)], axis=1)
+        scores = np.concatenate([self._top_scores[rows], candidate_scores], axis=1)
+        n = min(self.top_n, scores.shape[1])
+        best = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+
+        top_ids = np.full((len(rows), self.top_n), -1, dtype=np.int64)
+        top_scores = np.full((len(rows), self.top_n), -np.inf, dtype=np.float32)
+        top_ids[:, :n] = np.take_along_axis(ids, best, axis=1)
+        top_scores[:, :n] = np.take_along_axis(scores, best, axis=1)
+        self._top_ids[rows] = top_ids
+        self._top_scores[rows] = top_scores
+
+    def _rank_rows(self, user_rows: np.ndarray, job_slice: slice):
+        """Score a set of users against a range of jobs, in blocks of users"""
+        job_ids = self._job_ids[job_slice]
+        if not len(job_ids):
+            return
+        job_features = (self._job_terms[job_slice], self._job_location[job_slice],
+                        self._job_remote[job_slice], self._job_salary[job_slice])
+        for start in range(0, len(user_rows), BLOCK_SIZE):
+            rows = user_rows[start:start + BLOCK_SIZE]
+            scores = self._score(self._user_terms[rows], self._user_location[rows], self._user_salary[rows],
+                                 *job_features)
+            self._merge_top(rows, job_ids, scores)
+
+    # Writes
+    def rank_all(self, users: List[dict], jobs: List[dict]):
+        """Nightly batch: rebuild vocabulary, features and every user's top N"""
+        with self._lock:
+            user_terms = {token for user in users for token in self._user_tokens(user)}
+            job_terms = {token for job in jobs for token in self._job_tokens(job)}
+            # Only terms on both sides can ever overlap
+            self._vocabulary = {term: col for col, term in enumerate(sorted(user_terms & job_terms))}
+            self._locations = {}
+
+            self._user_rows = {user['telegram_id']: row for row, user in enumerate(users)}
+            self._user_terms, self._user_location, self._user_salary = self._user_features(users)
+            self._job_ids = np.array([job['id'] for job in jobs], dtype=np.int64)
+            self._job_terms, self._job_location, self._job_remote, self._job_salary = self._job_features(jobs)
+            self._cards = {job['id']: {field: job.get(field) for field in CARD_FIELDS} for job in jobs}
+
+            self._top_ids = np.full((len(users), self.top_n), -1, dtype=np.int64)
+            self._top_scores = np.full((len(users), self.top_n), -np.inf, dtype=np.float32)
+            self._rank_rows(np.arange(len(users)), slice(None))
+            self._built = True
+        logger.info(f"Ranked {len(jobs)} jobs for {len(users)} job seekers ({len(self._vocabulary)} terms)")
+
+    def add_jobs(self, jobs: List[dict]):
+        """Incremental pass: score newly posted jobs against every user.
+
+        Terms outside the batch vocabulary are ignored until the next batch.
+        """
+        jobs = [job for job in jobs if job['id'] not in self._cards]
+        if not jobs or not self.ready:
+            return
+        with self._lock:
+            start = len(self._job_ids)
+            terms, locations, remote, salaries = self._job_features(jobs)
+            self._job_ids = np.concatenate([self._job_ids, [job['id'] for job in jobs]]).astype(np.int64)
+            self._job_terms = np.vstack([self._job_terms, terms])
+            self._job_location = np.concatenate([self._job_location, locations])
+            self._job_remote = np.concatenate([self._job_remote, remote])
+            self._job_salary = np.concatenate([self._job_salary, salaries])
+            for job in jobs:
+                self._cards[job['id']] = {field: job.get(field) for field in CARD_FIELDS}
+            self._rank_rows(np.arange(len(self._user_rows)), slice(start, None))
+
+    def add_users(self, users: List[dict]):
+        """Incremental pass: (re)rank new or edited profiles against all active jobs"""
+        if not users or not self.ready:
+            return
+        with self._lock:
+            terms, locations, salaries = self._user_features(users)
+            rows, new_rows = [], []
+            for offset, user in enumerate(users):
+                row = self._user_rows.get(user['telegram_id'])
+                if row is None:
+                    row = len(self._user_rows)
+                    self._user_rows[user['telegram_id']] = row
+                    new_rows.append(offset)
+                else:
+                    self._user_terms[row] = terms[offset]
+                    self._user_location[row] = locations[offset]
+                    self._user_salary[row] = salaries[offset]
+                    self._top_ids[row] = -1
+                    self._top_scores[row] = -np.inf
+                rows.append(row)
+
+            if new_rows:
+                count = len(new_rows)
+                self._user_terms = np.vstack([self._user_terms, terms[new_rows]])
+                self._user_location = np.concatenate([self._user_location, locations[new_rows]])
+                self._user_salary = np.concatenate([self._user_salary, salaries[new_rows]])
+                self._top_scores = np.vstack(
+                    [self._top_scores, np.full((count, self.top_n), -np.inf, dtype=np.float32)]
+                )
+                self._top_ids = np.vstack([self._top_ids, np.full((count, self.top_n), -1, dtype=np.int64)])
+            self._rank_rows(np.asarray(rows), slice(None))
+
+    def retain_jobs(self, active_ids: Iterable[int]) -> int:
+        """Forget jobs that are no longer active; returns how many were dropped.
+
+        Users whose top N listed a dropped job are re-ranked against the
+        remaining jobs so their lists stay full until the next batch.
+        """
+        active = set(active_ids)
+        with self._lock:
+            expired = [job_id for job_id in self._cards if job_id not in active]
+            if not expired:
+                return 0
+            for job_id in expired:
+                self._cards.pop(job_id, None)
+
+            keep = ~np.isin(self._job_ids, expired)
+            self._job_ids = self._job_ids[keep]
+            self._job_terms = self._job_terms[keep]
+            self._job_location = self._job_location[keep]
+            self._job_remote = self._job_remote[keep]
+            self._job_salary = self._job_salary[keep]
+
+            affected = np.nonzero(np.isin(self._top_ids, expired).any(axis=1))[0]
+            if len(affected):
+                self._top_ids[affected] = -1
+                self._top_scores[affected] = -np.inf
+                self._rank_rows(affected, slice(None))
+        return len(expired)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+ZewedJobs data retention
+Archives and deletes old rows in small primary-key-ordered chunks
+
+Each chunk copies rows into `<table>_archive`, deletes them and advances a
+checkpoint in `retention_checkpoints` inside a single short transaction, so
+a crashed run resumes exactly where it stopped.
+
+Usage: python retention.py [--table messages] [--chunk-size 1000] [--dry-run]
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import mysql.connector
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionPolicy:
+    """Which rows of a table expire, and which child tables go with them"""
+
+    def __init__(self, table: str, date_column: str, days: int,
+                 condition: str = '', children: Optional[Dict[str, str]] = None):
+        self.table = table
+        self.date_column = date_column
+        self.days = days
+        self.condition = condition
+        # child table -> foreign key column referencing table.id
+        self.children = children or {}
+
+    def where(self) -> str:
+        clause = f"{self.date_column} < %s"
+        if self.condition:
+            clause = f"{self.condition} AND {clause}"
+        return clause
+
+
+def default_policies() -> List[RetentionPolicy]:
+    """Retention windows, overridable per table from the environment"""
+    return [
+        RetentionPolicy(
+            'jobs', 'updated_at', int(os.getenv('RETENTION_JOBS_DAYS', '90')),
+            condition="status = 'expired'",
+            children={'applications': 'job_id', 'saved_jobs': 'job_id'}
+        ),
+        RetentionPolicy('messages', 'timestamp', int(os.getenv('RETENTION_MESSAGES_DAYS', '180'))),
+        RetentionPolicy('system_logs', 'created_at', int(os.getenv('RETENTION_SYSTEM_LOGS_DAYS', '90'))),
+        RetentionPolicy('admin_logs', 'created_at', int(os.getenv('RETENTION_ADMIN_LOGS_DAYS', '365'))),
+    ]
+
+
+class RetentionEngine:
+    """Runs retention policies against one dedicated connection"""
+
+    def __init__(self, db_config: dict, chunk_size: int = 1000, pause: float = 0.5,
+                 dry_run: bool = False, progress: Optional[Callable[[str, dict], None]] = None):
+        self.db_config = db_config
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.dry_run = dry_run
+        self.progress = progress
+        self.connection = None
+        self._archive_columns: Dict[str, List[str]] = {}
+
+    # Connection helpers
+    def connect(self):
+        self.connection = mysql.connector.connect(**self.db_config)
+        self.connection.autocommit = False
+
+    def close(self):
+        if self.connection and self.connection.is_connected():
+            self.connection.close()
+        self.connection = None
+
+    def _fetch(self, query: str, params: tuple = (), fetch_one: bool = False):
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchone() if fetch_one else cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _execute(self, query: str, params: tuple = ()) -> int:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    # Archive tables
+    def _columns(self, table: str) -> List[Dict]:
+        return self._fetch(
+            """
+            SELECT COLUMN_NAME AS name, COLUMN_TYPE AS type
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+            """,
+            (table,)
+        )
+
+    def ensure_archive(self, table: str) -> List[str]:
+        """Create `<table>_archive` if needed and add columns added to `table` since.
+
+        DDL commits implicitly, so this runs before a chunk loop starts and
+        never between the statements of a chunk.
+        """
+        if table in self._archive_columns:
+            return self._archive_columns[table]
+
+        archive = f"{table}_archive"
+        self._execute(f"CREATE TABLE IF NOT EXISTS {archive} LIKE {table}")
+        source_columns = self._columns(table)
+        archive_names = {column['name'] for column in self._columns(archive)}
+        for column in source_columns:
+            if column['name'] not in archive_names:
+                logger.info(f"Adding column {column['name']} to {archive}")
+                self._execute(f"ALTER TABLE {archive} ADD COLUMN `{column['name']}` {column['type']} NULL")
+        self.connection.commit()
+
+        names = [column['name'] for column in source_columns]
+        self._archive_columns[table] = names
+        return names
+
+    def _archive(self, table: str, where: str, params: tuple, source: Optional[str] = None) -> int:
+        names = self._archive_columns.get(table)
+        if names is None:
+            raise RuntimeError(f"Archive table for {table} not prepared; call ensure_archive() before the chunk loop")
+        columns = ', '.join(f"`{name}`" for name in names)
+        return self._execute(
+            f"INSERT IGNORE INTO {table}_archive ({columns}) SELECT {columns} FROM {source or table} WHERE {where}",
+            params
+        )
+
+    def _archive_and_delete(self, table: str, where: str, params: tuple) -> tuple:
+        archived = self._archive(table, where, params)
+        deleted = self._execute(f"DELETE FROM {table} WHERE {where}", params)
+        return archived, deleted
+
+    def is_partitioned(self, table: str) -> bool:
+        row = self._fetch(
+            """
+            SELECT COUNT(*) AS partitions
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            """,
+            (table,), fetch_one=True
+        )
+        return bool(row and row['partitions'])
+
+    # Checkpoints
+    def _load_checkpoint(self, policy: RetentionPolicy) -> dict:
+        checkpoint = self._fetch(
+            "SELECT * FROM retention_checkpoints WHERE table_name = %s",
+            (policy.table,), fetch_one=True
+        )
+        if checkpoint and checkpoint['status'] == 'running':
+            logger.info(f"Resuming retention of {policy.table} after id {checkpoint['last_id']}")
+            return checkpoint
+
+        cutoff = datetime.now() - timedelta(days=policy.days)
+        self._execute(
+            """
+            INSERT INTO retention_checkpoints
+                (table_name, last_id, cutoff, rows_archived, rows_deleted, status, started_at, completed_at)
+            VALUES (%s, 0, %s, 0, 0, 'running', NOW(), NULL)
+            ON DUPLICATE KEY UPDATE last_id = 0, cutoff = VALUES(cutoff), rows_archived = 0,
+                rows_deleted = 0, status = 'running', started_at = NOW(), completed_at = NULL
+            """,
+            (policy.table, cutoff)
+        )
+        self.connection.commit()
+        return {'last_id': 0, 'cutoff': cutoff, 'rows_archived': 0, 'rows_deleted': 0}
+
+    def _finish_checkpoint(self, table: str, status: str):
+        self._execute(
+            "UPDATE retention_checkpoints SET status = %s, completed_at = NOW() WHERE table_name = %s",
+            (status, table)
+        )
+        self.connection.commit()
+
+    # Runs
+    def run_policy(self, policy: RetentionPolicy) -> dict:
+        """Process one table chunk by chunk; returns the totals for this run"""
+        if self.dry_run:
+            cutoff = datetime.now() - timedelta(days=policy.days)
+            row = self._fetch(
+                f"SELECT COUNT(*) AS total FROM {policy.table} WHERE {policy.where()}",
+                (cutoff,), fetch_one=True
+            )
+            logger.info(f"[dry run] {policy.table}: {row['total']} rows older than {cutoff:%Y-%m-%d}")
+            return {'table': policy.table, 'would_delete': row['total']}
+
+        # Every archive table exists before the first chunk's transaction opens
+        for table in (*policy.children, policy.table):
+            self.ensure_archive(table)
+
+        checkpoint = self._load_checkpoint(policy)
+        last_id = checkpoint['last_id']
+        totals = {'archived': checkpoint['rows_archived'], 'deleted': checkpoint['rows_deleted'], 'chunks': 0}
+
+        select_ids = f"""
+        SELECT id FROM {policy.table}
+        WHERE id > %s AND {policy.where()}
+        ORDER BY id
+        LIMIT %s
+        """
+
+        try:
+            while True:
+                rows = self._fetch(select_ids, (last_id, checkpoint['cutoff'], self.chunk_size))
+                if not rows:
+                    break
+
+                ids = tuple(row['id'] for row in rows)
+                placeholders = ', '.join(['%s'] * len(ids))
+
+                for child, column in policy.children.items():
+                    archived, deleted = self._archive_and_delete(child, f"{column} IN ({placeholders})", ids)
+                    totals[f"{child}_archived"] = totals.get(f"{child}_archived", 0) + archived
+
+                archived, deleted = self._archive_and_delete(policy.table, f"id IN ({placeholders})", ids)
+                totals['archived'] += archived
+                totals['deleted'] += deleted
+                totals['chunks'] += 1
+                last_id = ids[-1]
+
+                self._execute(
+                    """
+                    UPDATE retention_checkpoints
+                    SET last_id = %s, rows_archived = %s, rows_deleted = %s
+                    WHERE table_name = %s
+                    """,
+                    (last_id, totals['archived'], totals['deleted'], policy.table)
+                )
+                self.connection.commit()
+
+                if self.progress:
+                    self.progress(policy.table, dict(totals, last_id=last_id))
+                if len(ids) < self.chunk_size:
+                    break
+                time.sleep(self.pause)
+        except Error:
+            self.connection.rollback()
+            # Leave the checkpoint as 'running' so the next run resumes from last_id
+            raise
+
+        self._finish_checkpoint(policy.table, 'completed')
+        logger.info(f"Retention of {policy.table} done: {totals['deleted']} rows archived and deleted")
+        return dict(totals, table=policy.table)
+
+    def run(self, policies: Optional[List[RetentionPolicy]] = None) -> List[dict]:
+        """Run every policy; a failing table does not stop the others"""
+        results = []
+        self.connect()
+        try:
+            for policy in policies or default_policies():
+                try:
+                    if self.is_partitioned(policy.table):
+                        # Whole months are dropped by partitioning.py instead
+                        logger.info(f"Skipping {policy.table}: retention is handled by partition maintenance")
+                        continue
+                    results.append(self.run_policy(policy))
+                except Error as e:
+                    logger.error(f"Retention of {policy.table} failed: {e}")
+                    results.append({'table': policy.table, 'error': str(e)})
+
+            if not self.dry_run:
+                self._execute(
+                    """
+                    INSERT INTO system_logs (level, component, message, details)
+                    VALUES ('info', 'maintenance', 'Retention run completed', %s)
+                    """,
+                    (json.dumps(results, default=str),)
+                )
+                self.connection.commit()
+        finally:
+            self.close()
+        return results
+
+
+def log_progress(table: str, totals: dict):
+    """Default progress reporter: one log line every 10 chunks"""
+    if totals['chunks'] % 10 == 1:
+        logger.info(f"Retention {table}: {totals['deleted']} rows deleted so far (last id {totals['last_id']})")
+
+
+def run_retention(db_config: dict, tables: Optional[List[str]] = None, **options) -> List[dict]:
+    """Entry point used by the bot's scheduled cleanup job (runs in a worker thread)"""
+    policies = [policy for policy in default_policies() if not tables or policy.table in tables]
+    options.setdefault('progress', log_progress)
+    return RetentionEngine(db_config, **options).run(policies)
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Archive and delete expired ZewedJobs data")
+    parser.add_argument('--table', action='append', help="Only process this table (repeatable)")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--pause', type=float, default=0.5, help="Seconds to sleep between chunks")
+    parser.add_argument('--dry-run', action='store_true', help="Only count expired rows")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'zewedjobs_admin'),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASS', ''),
+        'port': os.getenv('DB_PORT', '3306')
+    }
+    results = run_retention(
+        db_config, args.table,
+        chunk_size=args.chunk_size, pause=args.pause, dry_run=args.dry_run
+    )
+    for result in results:
+        print(json.dumps(result, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+ZewedJobs search syntax
+Parses /search text into filters and free-text terms and compiles it to SQL
+that the job indexes can serve
+
+  salary:>20000  salary:20k-40k  salary:15000   (salary_min, idx_jobs_salary)
+  type:remote    type:full-time                 (job_type, idx_job_type)
+  cat:IT                                        (category, idx_job_category)
+  level:entry                                   (experience_level)
+  loc:adama                                     (location_id via the location index,
+                                                 else a prefix match on location)
+  anything else, or "quoted phrases"            (FULLTEXT idx_job_search)
+
+Filters compile to plain equality or range predicates the indexes above can
+serve, and free text becomes MATCH ... AGAINST in boolean mode instead of
+LIKE '%...%'. The SQL for each query shape (which filters, which
+operators, whether there is text) is built once and reused from a small
+plan cache.
+"""
+
+import re
+import shlex
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from locations import like_prefix
+
+logger = logging.getLogger(__name__)
+
+KEY_ALIASES = {
+    'salary': 'salary', 'pay': 'salary',
+    'type': 'type', 'job': 'type',
+    'cat': 'category', 'category': 'category',
+    'level': 'level', 'exp': 'level',
+    'loc': 'location', 'location': 'location', 'city': 'location',
+}
+
+JOB_TYPES = ('full-time', 'part-time', 'contract', 'internship', 'remote', 'freelance')
+LEVELS = ('entry', 'mid', 'senior', 'executive')
+LEVEL_ALIASES = {'junior': 'entry', 'intermediate': 'mid', 'middle': 'mid', 'lead': 'senior', 'exec': 'executive'}
+
+SALARY_PATTERN = re.compile(r"^(>=|<=|>|<)?(\d+(?:\.\d+)?k?)(?:-(\d+(?:\.\d+)?k?))?(\+)?$")
+SALARY_OPERATORS = {'>': '>', '>=': '>=', '<': '<', '<=': '<=', None: '>='}
+
+# Shorter words are not in the FULLTEXT index (innodb_ft_min_token_size)
+MIN_TERM_LENGTH = 3
+MAX_TERMS = 8
+
+# Runs of letters, digits and underscores, as the InnoDB FULLTEXT parser splits text
+WORD_PATTERN = re.compile(r"\w+")
+
+FULLTEXT_COLUMNS = "j.title, j.description, j.requirements, j.location"
+
+
+def _amount(text: str) -> int:
+    text = text.lower()
+    return int(float(text[:-1]) * 1000) if text.endswith('k') else int(float(text))
+
+
+def text_terms(token: str) -> List[str]:
+    """Index words of one token; a quoted phrase stays whole when all its words are indexed"""
+    words = WORD_PATTERN.findall(token)
+    if len(words) > 1 and ' ' in token.strip() and all(len(word) >= MIN_TERM_LENGTH for word in words):
+        return [' '.join(words)]
+    return [word for word in words if len(word) >= MIN_TERM_LENGTH]
+
+
+def _job_type(value: str) -> Optional[str]:
+    value = value.lower().replace('_', '-').replace(' ', '-')
+    if value in JOB_TYPES:
+        return value
+    for job_type in JOB_TYPES:
+        if value.replace('-', '') == job_type.replace('-', ''):
+            return job_type
+    return None
+
+
+class SearchQuery:
+    """Parsed /search text: typed filters plus free-text terms"""
+
+    def __init__(self):
+        # name -> (operator, value); operator is '=' or a comparison
+        self.filters: Dict[str, Tuple[str, object]] = {}
+        self.terms: List[str] = []
+        self.ignored: List[str] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.filters or self.terms)
+
+    @property
+    def shape(self) -> tuple:
+        """What the SQL depends on, leaving out the values"""
+        return tuple(sorted((name, operator) for name, (operator, _) in self.filters.items())) + (bool(self.terms),)
+
+    def describe(self) -> str:
+        parts = []
+        for name, (operator, value) in sorted(self.filters.items()):
+            if name == 'salary':
+                parts.append(f"salary {value[0]:,}–{value[1]:,}" if operator == 'between' else f"salary {operator} {value:,}")
+            elif name == 'location_id':
+                continue
+            else:
+                parts.append(f"{name}: {value}")
+        if self.terms:
+            parts.append(' '.join(f'"{term}"' if ' ' in term else term for term in self.terms))
+        return ', '.join(parts)
+
+
+def parse_query(text: str, resolve_location: Optional[Callable[[str], Optional[int]]] = None) -> SearchQuery:
+    """Split /search text into filters and terms; filters with bad values are kept in `ignored`"""
+    query = SearchQuery()
+    try:
+        tokens = shlex.split(text)
+    except ValueError:
+        # Unbalanced quotes
+        tokens = text.replace('"', ' ').split()
+
+    for token in tokens:
+        key, sep, value = token.partition(':')
+        name = KEY_ALIASES.get(key.lower()) if sep and value else None
+
+        if name == 'salary':
+            match = SALARY_PATTERN.match(value.lower().replace(',', ''))
+            if match:
+                operator, low, high, plus = match.groups()
+                if high:
+                    query.filters['salary'] = ('between', tuple(sorted((_amount(low), _amount(high)))))
+                else:
+                    query.filters['salary'] = ('>=' if plus else SALARY_OPERATORS[operator], _amount(low))
+                continue
+        elif name == 'type':
+            job_type = _job_type(value)
+            if job_type:
+                query.filters['type'] = ('=', job_type)
+                continue
+        elif name == 'level':
+            level = LEVEL_ALIASES.get(value.lower(), value.lower())
+            if level in LEVELS:
+                query.filters['level'] = ('=', level)
+                continue
+        elif name == 'category':
+            query.filters['category'] = ('=', value)
+            continue
+        elif name == 'location':
+            location_id = resolve_location(value) if resolve_location else None
+            if location_id is not None:
+                query.filters['location_id'] = ('=', location_id)
+            query.filters['location'] = ('prefix', value)
+            continue
+
+        if name:
+            # A known filter with a value it cannot take
+            query.ignored.append(token)
+            continue
+        for term in text_terms(token):
+            if len(query.terms) < MAX_TERMS and term not in query.terms:
+                query.terms.append(term)
+
+    # A resolved location is filtered by id only
+    if 'location_id' in query.filters:
+        query.filters['location'] = ('name', query.filters['location'][1])
+    return query
+
+
+def boolean_terms(terms: List[str]) -> str:
+    """AGAINST text requiring every word (prefix match) or quoted phrase"""
+    return ' '.join(f'+"{term}"' if ' ' in term else f'+{term}*' for term in terms)
+
+
+@lru_cache(maxsize=256)
+def _plan(shape: tuple) -> str:
+    """SQL for one query shape; values are bound as parameters"""
+    filters = dict(shape[:-1])
+    has_text = shape[-1]
+
+    select = "SELECT j.*, c.name as company_name, c.logo as company_logo"
+    if has_text:
+        select += f", MATCH({FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE) as relevance"
+    where = ["j.status = 'active'", "j.deadline >= CURDATE()"]
+
+    salary = filters.get('salary')
+    if salary == 'between':
+        where.append("j.salary_min BETWEEN %s AND %s")
+    elif salary:
+        where.append(f"j.salary_min {salary} %s")
+    if 'type' in filters:
+        where.append("j.job_type = %s")
+    if 'category' in filters:
+        where.append("j.category = %s")
+    if 'level' in filters:
+        where.append("j.experience_level = %s")
+    if 'location_id' in filters:
+        where.append("j.location_id = %s")
+    elif 'location' in filters:
+        where.append("j.location LIKE %s")
+    if has_text:
+        where.append(f"MATCH({FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)")
+
+    order = "relevance DESC, j.created_at DESC" if has_text else "j.created_at DESC"
+    return (
+        f"{select}\n"
+        f"FROM jobs j\n"
+        f"LEFT JOIN companies c ON j.company_id = c.id\n"
+        f"WHERE {' AND '.join(where)}\n"
+        f"ORDER BY {order}\n"
+        f"LIMIT %s"
+    )
+
+
+def compile_query(query: SearchQuery, limit: int = 10) -> Tuple[str, tuple]:
+    """(sql, params) for a parsed query; params follow the placeholders of its plan"""
+    params: List = []
+    against = boolean_terms(query.terms) if query.terms else None
+    if against:
+        params.append(against)
+
+    salary = query.filters.get('salary')
+    if salary:
+        operator, value = salary
+        params.extend(value if operator == 'between' else [value])
+    for name in ('type', 'category', 'level'):
+        if name in query.filters:
+            params.append(query.filters[name][1])
+    if 'location_id' in query.filters:
+        params.append(query.filters['location_id'][1])
+    elif 'location' in query.filters:
+        params.append(like_prefix(query.filters['location'][1]))
+    if against:
+        params.append(against)
+
+    params.append(limit)
+    return _plan(query.shape), tuple(params)
+
+
+def plan_cache_info():
+    return _plan.cache_info()
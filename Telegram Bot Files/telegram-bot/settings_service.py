@@ -0,0 +1,109 @@
+"""
+ZewedJobs runtime settings
+Typed, in-memory view of the `settings` table shared by the bot and dashboard
+
+The table is read once at startup. After that a poll compares
+MAX(updated_at) and COUNT(*) with the last load and only re-reads the rows
+when one of them changed, so handlers look settings up in a dictionary and
+an admin's edit is picked up within one poll interval without a restart.
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_QUERY = "SELECT setting_key, setting_value, setting_type FROM settings"
+VERSION_QUERY = "SELECT MAX(updated_at) AS updated_at, COUNT(*) AS total FROM settings"
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def convert_value(value: Optional[str], setting_type: Optional[str]) -> Any:
+    """Python value of a settings row according to its setting_type"""
+    if value is None:
+        return None
+    if setting_type == 'integer':
+        return int(value)
+    if setting_type == 'boolean':
+        return value.strip().lower() in TRUE_VALUES
+    if setting_type == 'json':
+        return json.loads(value)
+    if setting_type == 'array':
+        if value.lstrip().startswith('['):
+            return json.loads(value)
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return value
+
+
+class SettingsService:
+    """Settings loaded once and reloaded only when the table changes"""
+
+    def __init__(self, fetch: Callable, poll_interval: float = 30.0):
+        # fetch(query, params, fetch_one) -> rows, or None when the database is unavailable
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self._values: Dict[str, Any] = {}
+        self._version: Optional[Tuple] = None
+        self.reloads = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._values
+
+    @property
+    def loaded(self) -> bool:
+        return self._version is not None
+
+    def _read_version(self) -> Optional[Tuple]:
+        row = self.fetch(VERSION_QUERY, None, True)
+        if row is None:
+            return None
+        return row['updated_at'], row['total']
+
+    def load(self, version: Optional[Tuple] = None) -> bool:
+        """Read every row and swap in the new values; False when the database is unavailable"""
+        version = version or self._read_version()
+        rows = self.fetch(SETTINGS_QUERY, None, False) if version else None
+        if rows is None:
+            return False
+
+        values = {}
+        for row in rows:
+            try:
+                values[row['setting_key']] = convert_value(row['setting_value'], row['setting_type'])
+            except ValueError as e:
+                # Callers fall back to their defaults for a malformed value
+                logger.warning(f"Ignoring setting {row['setting_key']!r}: {e}")
+        # One assignment, so readers on other threads see the old or the new dict
+        self._values = values
+        self._version = version
+        self.reloads += 1
+        logger.info(f"Loaded {len(values)} settings")
+        return True
+
+    def refresh(self) -> bool:
+        """Reload if the table changed since the last load; True when it reloaded"""
+        version = self._read_version()
+        if version is None or version == self._version:
+            return False
+        return self.load(version)
+
+    # Lookups
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._values.get(key)
+        return default if value is None else value
+
+    def get_int(self, key: str, default: int) -> int:
+        value = self.get(key, default)
+        return value if isinstance(value, int) and not isinstance(value, bool) else default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value = self.get(key, default)
+        return value if isinstance(value, bool) else default
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self._values)
@@ -0,0 +1,247 @@
+"""
+ZewedJobs similar jobs index
+TF-IDF vectors over active jobs with precomputed top-K neighbors per job
+
+Lookups are plain dictionary reads. The index is rebuilt from scratch
+periodically (fresh vocabulary and IDF weights) and patched incrementally
+in between as jobs are posted, edited or expire.
+
+Vectors are kept in a sparse CSR matrix: a job uses a few dozen of the
+`max_features` terms, so memory grows with the words actually used rather
+than jobs × vocabulary, and adding jobs appends only their non-zeros.
+"""
+
+import re
+import math
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[\w+#]+(?:\.[\w+#]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from in is of on or the to with years year experience
+plus etc other skills skill knowledge ability good strong degree bsc ba msc
+""".split())
+
+# How much each field contributes to a job's vector
+FIELD_WEIGHTS = (('title', 2), ('category', 2), ('requirements', 1), ('location', 1))
+
+# Rows scored at once; each block densifies to BLOCK_SIZE × jobs scores
+BLOCK_SIZE = 256
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens; keeps terms like c++, c# and node.js intact"""
+    if not text:
+        return []
+    return [
+        token for token in TOKEN_PATTERN.findall(str(text).lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def job_terms(job: dict) -> Counter:
+    terms: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(job.get(field)):
+            terms[token] += weight
+    return terms
+
+
+class SimilarJobsIndex:
+    """Top-K cosine neighbors between active jobs"""
+
+    def __init__(self, top_k: int = 5, max_features: int = 4096):
+        self.top_k = top_k
+        self.max_features = max_features
+        self._lock = threading.Lock()
+        self._vocabulary: Dict[str, int] = {}
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_ids: List[int] = []
+        self._rows: Dict[int, int] = {}
+        self._versions: Dict[int, object] = {}
+        # Read side: job_id -> [(job_id, score), ...] and job_id -> card metadata
+        self._neighbors: Dict[int, List[Tuple[int, float]]] = {}
+        self._meta: Dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        """True before the first build or once removed rows make up a quarter of the matrix"""
+        if not self._vocabulary:
+            return True
+        return int((~self._alive).sum()) > len(self._alive) // 4
+
+    # Lookups
+    def neighbors(self, job_id: int) -> List[dict]:
+        """Similar jobs for a job, best first; a dictionary read, no query"""
+        result = []
+        for neighbor_id, score in self._neighbors.get(job_id, ()):
+            meta = self._meta.get(neighbor_id)
+            if meta:
+                result.append({**meta, 'id': neighbor_id, 'score': round(score, 3)})
+        return result
+
+    def changed_ids(self, versions: Dict[int, object]) -> List[int]:
+        """Active jobs that are new or were edited since they were indexed"""
+        return [job_id for job_id, version in versions.items() if self._versions.get(job_id) != version]
+
+    # Vectors
+    def _vectorize(self, jobs: List[dict]) -> sparse.csr_matrix:
+        """L2-normalised sublinear TF-IDF rows for `jobs` using the current vocabulary"""
+        rows, cols, values = [], [], []
+        for row, job in enumerate(jobs):
+            for term, count in job_terms(job).items():
+                col = self._vocabulary.get(term)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    values.append(1.0 + math.log(count))
+
+        cols_array = np.asarray(cols, dtype=np.int64)
+        weights = np.asarray(values, dtype=np.float32) * self._idf[cols_array] if rows else np.zeros(0, dtype=np.float32)
+        matrix = sparse.csr_matrix(
+            (weights, (np.asarray(rows, dtype=np.int64), cols_array)),
+            shape=(len(jobs), len(self._vocabulary)), dtype=np.float32
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        return sparse.csr_matrix(sparse.diags(scale.astype(np.float32)) @ matrix)
+
+    def _scores(self, rows: np.ndarray) -> np.ndarray:
+        """Dense cosine scores of the given rows against every row"""
+        return (self._matrix[rows] @ self._matrix.T).toarray()
+
+    def _top_k(self, scores: np.ndarray, exclude: np.ndarray) -> List[Tuple[int, float]]:
+        """Best `top_k` (job_id, score) pairs from one row of similarity scores"""
+        scores = np.where(self._alive & ~exclude, scores, -1.0)
+        k = min(self.top_k, scores.size)
+        if k == 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(self._row_ids[i], float(scores[i])) for i in candidates if scores[i] > 0]
+
+    def _neighbors_for_rows(self, rows: np.ndarray) -> Dict[int, List[Tuple[int, float]]]:
+        result = {}
+        for start in range(0, len(rows), BLOCK_SIZE):
+            block = rows[start:start + BLOCK_SIZE]
+            scores = self._scores(block)
+            for offset, row in enumerate(block):
+                exclude = np.zeros(len(self._row_ids), dtype=bool)
+                exclude[row] = True
+                result[self._row_ids[row]] = self._top_k(scores[offset], exclude)
+        return result
+
+    @staticmethod
+    def _meta_for(job: dict) -> dict:
+        return {
+            'title': job.get('title'),
+            'company_name': job.get('company_name'),
+            'location': job.get('location'),
+        }
+
+    # Writes
+    def build(self, jobs: List[dict]):
+        """Full rebuild: new vocabulary, IDF weights, vectors and neighbor lists"""
+        with self._lock:
+            document_frequency: Counter = Counter()
+            for job in jobs:
+                document_frequency.update(job_terms(job).keys())
+
+            terms = [term for term, _ in document_frequency.most_common(self.max_features)]
+            self._vocabulary = {term: col for col, term in enumerate(terms)}
+            total = len(jobs)
+            self._idf = np.array(
+                [math.log((1 + total) / (1 + document_frequency[term])) + 1 for term in terms],
+                dtype=np.float32
+            )
+
+            self._matrix = self._vectorize(jobs)
+            self._alive = np.ones(total, dtype=bool)
+            self._row_ids = [job['id'] for job in jobs]
+            self._rows = {job_id: row for row, job_id in enumerate(self._row_ids)}
+            self._versions = {job['id']: job.get('updated_at') for job in jobs}
+
+            neighbors = self._neighbors_for_rows(np.arange(total))
+            self._meta = {job['id']: self._meta_for(job) for job in jobs}
+            self._neighbors = neighbors
+        logger.info(f"Similar jobs index built: {total} jobs, {len(terms)} terms")
+
+    def remove(self, job_ids: Iterable[int]):
+        with self._lock:
+            self._remove(set(job_ids))
+
+    def _remove(self, job_ids: set):
+        removed = [job_id for job_id in job_ids if job_id in self._rows]
+        if not removed:
+            return
+        for job_id in removed:
+            row = self._rows.pop(job_id)
+            # The row stays in the matrix until the next rebuild; _top_k skips dead rows
+            self._alive[row] = False
+            self._versions.pop(job_id, None)
+            self._neighbors.pop(job_id, None)
+            self._meta.pop(job_id, None)
+
+        # Jobs that listed a removed job as a neighbor get their list recomputed
+        removed_set = set(removed)
+        affected = [
+            self._rows[job_id] for job_id, items in list(self._neighbors.items())
+            if any(neighbor_id in removed_set for neighbor_id, _ in items)
+        ]
+        if affected:
+            self._neighbors.update(self._neighbors_for_rows(np.asarray(affected)))
+
+    def add(self, jobs: List[dict]):
+        """Index new or edited jobs against the current vocabulary"""
+        if not jobs:
+            return
+        with self._lock:
+            self._remove({job['id'] for job in jobs})
+
+            start = len(self._row_ids)
+            # Appends only the new rows' non-zeros
+            self._matrix = sparse.vstack([self._matrix, self._vectorize(jobs)], format='csr')
+            self._alive = np.concatenate([self._alive, np.ones(len(jobs), dtype=bool)])
+            for offset, job in enumerate(jobs):
+                self._row_ids.append(job['id'])
+                self._rows[job['id']] = start + offset
+                self._versions[job['id']] = job.get('updated_at')
+                self._meta[job['id']] = self._meta_for(job)
+
+            new_rows = np.arange(start, start + len(jobs))
+            self._neighbors.update(self._neighbors_for_rows(new_rows))
+
+            # Existing jobs adopt a new job when it beats their current K-th neighbor
+            scores = self._scores(new_rows)
+            for job_id, row in list(self._rows.items()):
+                if row >= start:
+                    continue
+                current = self._neighbors.get(job_id, [])
+                threshold = current[-1][1] if len(current) >= self.top_k else 0.0
+                column = scores[:, row]
+                better = np.nonzero(column > threshold)[0]
+                if better.size:
+                    merged = current + [(self._row_ids[start + i], float(column[i])) for i in better]
+                    merged.sort(key=lambda item: item[1], reverse=True)
+                    self._neighbors[job_id] = merged[:self.top_k]
+
+    def sync(self, versions: Dict[int, object], changed_jobs: List[dict]):
+        """Apply one refresh: drop jobs no longer active, (re)index changed ones"""
+        gone = [job_id for job_id in self._rows if job_id not in versions]
+        if gone:
+            self.remove(gone)
+        self.add(changed_jobs)
+        return len(gone), len(changed_jobs)
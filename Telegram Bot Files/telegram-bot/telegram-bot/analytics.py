@@ -0,0 +1,209 @@
+"""
+ZewedJobs dashboard analytics
+Hiring funnels, time-to-review and salary distributions computed with pandas
+
+All metrics come from one bulk load of a few columns per table; the results
+are cached and recomputed at most once per refresh interval, so dashboard
+requests never run GROUP BY queries against the live database.
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+JOBS_QUERY = """
+SELECT j.id AS job_id, j.company_id, c.name AS company_name, j.category,
+       j.views, j.salary_min, j.salary_max, j.status
+FROM jobs j
+LEFT JOIN companies c ON j.company_id = c.id
+"""
+
+APPLICATIONS_QUERY = """
+SELECT job_id, status, applied_at, reviewed_at
+FROM applications
+"""
+
+# Application statuses that mean the candidate made it past screening
+SHORTLISTED_STATUSES = ('shortlisted', 'interviewed', 'accepted')
+
+SALARY_BINS = np.array([0, 5000, 10000, 15000, 20000, 30000, 40000, 60000, 80000, 120000, np.inf])
+
+
+def _records(frame: pd.DataFrame) -> List[Dict]:
+    """DataFrame rows as JSON-safe dicts (NaN -> None, numpy scalars -> Python)"""
+    frame = frame.astype(object).where(pd.notna(frame), None)
+    return [
+        {key: (value.item() if isinstance(value, np.generic) else value) for key, value in row.items()}
+        for row in frame.to_dict('records')
+    ]
+
+
+def funnel(jobs: pd.DataFrame, applications: pd.DataFrame, by: str) -> List[Dict]:
+    """views -> applications -> shortlisted -> accepted per category or company"""
+    views = jobs.groupby(by, dropna=False)['views'].sum()
+
+    merged = applications.merge(jobs[['job_id', by]], on='job_id', how='inner')
+    merged['shortlisted'] = merged['status'].isin(SHORTLISTED_STATUSES)
+    merged['accepted'] = merged['status'].eq('accepted')
+    stages = merged.groupby(by, dropna=False).agg(
+        applications=('job_id', 'size'),
+        shortlisted=('shortlisted', 'sum'),
+        accepted=('accepted', 'sum'),
+    )
+
+    result = stages.reindex(views.index, fill_value=0)
+    result.insert(0, 'views', views)
+    result = result.fillna(0).astype('int64')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['view_to_apply'] = np.where(result['views'] > 0, result['applications'] / result['views'], np.nan)
+        result['apply_to_shortlist'] = np.where(
+            result['applications'] > 0, result['shortlisted'] / result['applications'], np.nan
+        )
+        result['shortlist_to_accept'] = np.where(
+            result['shortlisted'] > 0, result['accepted'] / result['shortlisted'], np.nan
+        )
+
+    result = result.round(4).sort_values('applications', ascending=False).reset_index()
+    result[by] = result[by].fillna('Unknown')
+    return _records(result)
+
+
+def time_to_review(jobs: pd.DataFrame, applications: pd.DataFrame) -> Dict:
+    """Hours between applying and review, per category and overall"""
+    reviewed = applications.dropna(subset=['reviewed_at']).merge(jobs[['job_id', 'category']], on='job_id')
+    hours = (reviewed['reviewed_at'] - reviewed['applied_at']).dt.total_seconds() / 3600
+    reviewed = reviewed.assign(hours=hours[hours >= 0])
+
+    def summarize(values: pd.Series) -> Dict:
+        values = values.dropna().to_numpy()
+        if values.size == 0:
+            return {'reviewed': 0, 'mean_hours': None, 'median_hours': None, 'p90_hours': None}
+        p50, p90 = np.percentile(values, [50, 90])
+        return {
+            'reviewed': int(values.size),
+            'mean_hours': round(float(values.mean()), 2),
+            'median_hours': round(float(p50), 2),
+            'p90_hours': round(float(p90), 2),
+        }
+
+    per_category = [
+        {'category': category if isinstance(category, str) else 'Unknown', **summarize(group)}
+        for category, group in reviewed.groupby('category', dropna=False)['hours']
+    ]
+    return {
+        'overall': summarize(reviewed['hours']),
+        'pending': int(applications['reviewed_at'].isna().sum()),
+        'by_category': sorted(per_category, key=lambda row: row['reviewed'], reverse=True),
+    }
+
+
+def salary_distribution(jobs: pd.DataFrame) -> Dict:
+    """Quartiles of the advertised salary midpoint per category plus a histogram"""
+    active = jobs[jobs['status'] == 'active']
+    midpoint = active[['salary_min', 'salary_max']].mean(axis=1, skipna=True)
+    salaries = active.assign(salary=midpoint).dropna(subset=['salary'])
+
+    quantiles = salaries.groupby('category', dropna=False)['salary'].quantile([0, 0.25, 0.5, 0.75, 1]).unstack()
+    quantiles.columns = ['min', 'p25', 'median', 'p75', 'max']
+    quantiles['jobs'] = salaries.groupby('category', dropna=False)['salary'].size()
+    quantiles = quantiles.round(0).sort_values('jobs', ascending=False).reset_index()
+    quantiles['category'] = quantiles['category'].fillna('Unknown')
+
+    counts, edges = np.histogram(salaries['salary'].to_numpy(), bins=SALARY_BINS)
+    histogram = [
+        {'from': int(low), 'to': None if np.isinf(high) else int(high), 'jobs': int(count)}
+        for low, high, count in zip(edges[:-1], edges[1:], counts)
+    ]
+    return {'by_category': _records(quantiles), 'histogram': histogram}
+
+
+class AnalyticsEngine:
+    """Caches computed reports and refreshes them at most every `refresh_interval` seconds"""
+
+    def __init__(self, connection_factory: Callable, refresh_interval: float = 300.0):
+        self.connection_factory = connection_factory
+        self.refresh_interval = refresh_interval
+        self._reports: Optional[Dict] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the cached reports were computed, None before the first load"""
+        if self._reports is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    def load(self) -> tuple:
+        """Bulk-load the columns every report needs with two plain SELECTs"""
+        connection = self.connection_factory()
+        if not connection:
+            raise ConnectionError("Database connection failed")
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute(JOBS_QUERY)
+            jobs = pd.DataFrame.from_records(
+                cursor.fetchall(),
+                columns=['job_id', 'company_id', 'company_name', 'category', 'views',
+                         'salary_min', 'salary_max', 'status']
+            )
+            cursor.execute(APPLICATIONS_QUERY)
+            applications = pd.DataFrame.from_records(
+                cursor.fetchall(), columns=['job_id', 'status', 'applied_at', 'reviewed_at']
+            )
+        finally:
+            cursor.close()
+            connection.close()
+
+        jobs['views'] = pd.to_numeric(jobs['views']).fillna(0).astype('int64')
+        for column in ('salary_min', 'salary_max'):
+            jobs[column] = pd.to_numeric(jobs[column], errors='coerce').astype('float64')
+        jobs['company'] = jobs['company_name'].fillna('Unknown')
+        applications['applied_at'] = pd.to_datetime(applications['applied_at'])
+        applications['reviewed_at'] = pd.to_datetime(applications['reviewed_at'])
+        return jobs, applications
+
+    def compute(self) -> Dict:
+        started = time.perf_counter()
+        jobs, applications = self.load()
+        reports = {
+            'funnel_category': funnel(jobs, applications, 'category'),
+            'funnel_company': funnel(jobs, applications, 'company'),
+            'time_to_review': time_to_review(jobs, applications),
+            'salaries': salary_distribution(jobs),
+            'generated_at': datetime.now().isoformat(),
+        }
+        reports['compute_seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Analytics refreshed in {reports['compute_seconds']}s "
+                    f"({len(jobs)} jobs, {len(applications)} applications)")
+        return reports
+
+    def reports(self) -> Dict:
+        """Current reports; a stale cache is refreshed by one caller while others reuse it"""
+        stale = time.monotonic() - self._loaded_at > self.refresh_interval
+        if self._reports is not None and not stale:
+            return self._reports
+
+        # Only the first request to notice staleness recomputes; the rest
+        # serve the previous reports instead of piling onto the database
+        if self._lock.acquire(blocking=self._reports is None):
+            try:
+                if self._reports is None or time.monotonic() - self._loaded_at > self.refresh_interval:
+                    self._reports = self.compute()
+                    self._loaded_at = time.monotonic()
+            except Exception as e:
+                if self._reports is None:
+                    raise
+                logger.error(f"Analytics refresh failed, serving previous reports: {e}")
+                self._loaded_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self._reports
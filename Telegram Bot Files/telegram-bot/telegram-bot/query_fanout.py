@@ -0,0 +1,76 @@
+"""
+ZewedJobs dashboard query fan-out
+Runs independent read queries at the same time, one pooled connection each
+
+Each query gets MAX_EXECUTION_TIME as an optimizer hint, so the server
+abandons it after the timeout and its connection goes back to the pool, and
+the caller stops waiting at the same deadline. A query that fails or times
+out is reported in `errors` and the rest are still returned, so a page can
+render with whatever finished. The whole batch takes about as long as its
+slowest query instead of the sum of all of them.
+"""
+
+import re
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEADING_SELECT = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+
+def with_time_limit(query: str, timeout_ms: int) -> str:
+    """Add a MAX_EXECUTION_TIME hint to a SELECT; other statements are unchanged"""
+    return LEADING_SELECT.sub(f"SELECT /*+ MAX_EXECUTION_TIME({timeout_ms}) */", query, count=1)
+
+
+class QueryFanout:
+    """Thread pool that runs named read queries on separate connections"""
+
+    def __init__(self, get_connection: Callable, max_workers: int = 4, timeout: float = 5.0):
+        # get_connection() -> pooled connection or None; close() hands it back
+        self.get_connection = get_connection
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dashboard-query')
+
+    def _run(self, name: str, query: str, params: tuple, fetch_one: bool):
+        connection = self.get_connection()
+        if not connection:
+            raise RuntimeError('no database connection available')
+        cursor = connection.cursor(dictionary=True)
+        try:
+            started = time.monotonic()
+            cursor.execute(with_time_limit(query, int(self.timeout * 1000)), params)
+            rows = cursor.fetchone() if fetch_one else cursor.fetchall()
+            logger.debug(f"Dashboard query {name} took {time.monotonic() - started:.3f}s")
+            return rows
+        finally:
+            cursor.close()
+            connection.close()
+
+    def run(self, queries: Dict[str, Tuple[str, Optional[tuple], bool]]) -> Tuple[Dict, Dict[str, str]]:
+        """{name: (query, params, fetch_one)} -> ({name: rows}, {name: error}) for those that failed"""
+        futures = {
+            name: self._executor.submit(self._run, name, query, params or (), fetch_one)
+            for name, (query, params, fetch_one) in queries.items()
+        }
+        wait(futures.values(), timeout=self.timeout)
+
+        results, errors = {}, {}
+        for name, future in futures.items():
+            if not future.done():
+                # The hint stops it on the server; nothing waits for it here
+                future.cancel()
+                errors[name] = f"timed out after {self.timeout:g}s"
+            elif future.exception() is not None:
+                errors[name] = str(future.exception())
+            else:
+                results[name] = future.result()
+        for name, error in errors.items():
+            logger.warning(f"Dashboard query {name} failed: {error}")
+        return results, errors
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
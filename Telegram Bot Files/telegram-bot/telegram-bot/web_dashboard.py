@@ -7,11 +7,24 @@ Flask web interface for monitoring bot statistics
 from flask import Flask, render_template, jsonify, request, session, redirect, url_for
 from flask_cors import CORS
 import os
+import sys
+import json
+import urllib.request
 from dotenv import load_dotenv
-import mysql.connector
 from mysql.connector import Error
 from datetime import datetime, timedelta
 import logging
+import threading
+import time
+
+from analytics import AnalyticsEngine
+from query_fanout import QueryFanout
+
+# Modules shared with the bot (health probes, settings, routing) live next to bot.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_router import DatabaseRouter
+from health import HealthMonitor
+from settings_service import SettingsService
 
 # Load environment variables
 load_dotenv()
@@ -34,14 +47,162 @@ DB_CONFIG = {
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'admin123')
 
-def get_db_connection():
-    """Create database connection"""
+# Analytics reports are recomputed at most this often
+ANALYTICS_REFRESH_SECONDS = float(os.getenv('ANALYTICS_REFRESH_SECONDS', '300'))
+DB_POOL_SIZE = int(os.getenv('DASHBOARD_DB_POOL_SIZE', '8'))
+DB_REPLICA_HOSTS = os.getenv('DB_REPLICA_HOSTS', '')
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))
+BOT_TOKEN = os.getenv('BOT_TOKEN')
+SETTINGS_POLL_SECONDS = float(os.getenv('SETTINGS_POLL_SECONDS', '30'))
+DASHBOARD_QUERY_WORKERS = int(os.getenv('DASHBOARD_QUERY_WORKERS', '4'))
+DASHBOARD_QUERY_TIMEOUT = float(os.getenv('DASHBOARD_QUERY_TIMEOUT', '5'))
+
+# Connection pools (primary plus any replicas), opened by the warm-up thread or the first request
+db_router = DatabaseRouter(
+    DB_CONFIG, DB_REPLICA_HOSTS, pool_size=DB_POOL_SIZE, pool_name='zewedjobs_dashboard',
+    max_lag=DB_REPLICA_MAX_LAG, overflow=True
+)
+
+# Set once the pool is open and the analytics cache is filled
+dashboard_ready = threading.Event()
+warm_up_started = threading.Event()
+
+def get_db_pool():
+    """The primary connection pool, created on first use"""
+    return db_router.connect()
+
+def get_db_connection(read=True):
+    """Pooled database connection; close() hands it back to the pool.
+
+    The dashboard only reads, so connections come from a caught-up replica
+    when one is configured and from the primary otherwise.
+    """
+    return db_router.connection(read)
+
+analytics = AnalyticsEngine(get_db_connection, refresh_interval=ANALYTICS_REFRESH_SECONDS)
+
+# Overview page queries, each on its own pooled connection
+dashboard_queries = QueryFanout(get_db_connection, max_workers=DASHBOARD_QUERY_WORKERS, timeout=DASHBOARD_QUERY_TIMEOUT)
+
+def get_analytics_reports():
+    """Cached analytics reports, or None when they cannot be computed"""
+    try:
+        return analytics.reports()
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Analytics failed: {e}")
+        return None
+
+def fetch_rows(query, params=None, fetch_one=False):
+    """Run a read query on a pooled connection; None when the database is unavailable"""
+    connection = get_db_connection()
+    if not connection:
+        return None
+    cursor = connection.cursor(dictionary=True)
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
+        cursor.execute(query, params or ())
+        return cursor.fetchone() if fetch_one else cursor.fetchall()
     except Error as e:
-        print(f"Database connection failed: {e}")
+        logging.getLogger(__name__).error(f"Query failed: {e}")
         return None
+    finally:
+        cursor.close()
+        connection.close()
+
+# Runtime settings, loaded during warm-up and polled by the health thread
+settings = SettingsService(fetch_rows, poll_interval=SETTINGS_POLL_SECONDS)
+
+def dashboard_page_size() -> int:
+    """Default row count of the admin job list (`dashboard_page_size`; the bot has `jobs_per_page`)"""
+    return max(1, settings.get_int('dashboard_page_size', 100))
+
+health_monitor = HealthMonitor()
+
+def check_database():
+    """Borrow a pooled connection and ping the server"""
+    if db_router.primary_pool is None:
+        return {'ok': False, 'error': 'connection pool not open'}
+    connection = get_db_connection(read=False)
+    if not connection:
+        return {'ok': False, 'error': 'no connection available'}
+    try:
+        connection.ping()
+    finally:
+        connection.close()
+    return {'ok': True, 'pool_size': DB_POOL_SIZE}
+
+def check_analytics():
+    """Analytics cache is filled and not older than twice its refresh interval"""
+    age = analytics.age_seconds
+    return {
+        'ok': dashboard_ready.is_set() and age is not None and age < 2 * ANALYTICS_REFRESH_SECONDS,
+        'age_seconds': round(age) if age is not None else None,
+    }
+
+def check_bot_api():
+    """Telegram Bot API answers getMe for the bot's token"""
+    with urllib.request.urlopen(f"https://api.telegram.org/bot{BOT_TOKEN}/getMe", timeout=10) as response:
+        body = json.load(response)
+    return {'ok': bool(body.get('ok')), 'username': body.get('result', {}).get('username')}
+
+def check_tables():
+    """The core tables answer a one-row read; counts stay behind the login (/api/stats)"""
+    connection = get_db_connection()
+    if not connection:
+        return {'ok': False, 'error': 'no connection available'}
+    cursor = connection.cursor()
+    try:
+        for table in ('users', 'jobs', 'applications', 'messages'):
+            cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+            cursor.fetchall()
+        return {'ok': True}
+    finally:
+        cursor.close()
+        connection.close()
+
+def check_settings():
+    """Poll the settings table and reload it when it changed"""
+    if settings.loaded:
+        settings.refresh()
+    else:
+        settings.load()
+    return {'ok': settings.loaded, 'settings': len(settings), 'reloads': settings.reloads}
+
+health_monitor.add_probe('database', check_database)
+health_monitor.add_probe('settings', check_settings, interval=SETTINGS_POLL_SECONDS, critical=False)
+health_monitor.add_probe('analytics', check_analytics)
+health_monitor.add_probe('tables', check_tables, interval=300, critical=False)
+if BOT_TOKEN:
+    health_monitor.add_probe('bot_api', check_bot_api, interval=30, critical=False)
+if db_router.replicas:
+    health_monitor.add_probe('replicas', db_router.check_replicas, critical=False)
+
+def warm_up():
+    """Open the pool and compute the analytics cache, then mark the dashboard ready"""
+    while get_db_pool() is None:
+        time.sleep(5)
+    settings.load()
+    get_analytics_reports()
+    dashboard_ready.set()
+    logging.getLogger(__name__).info("Dashboard warm-up finished")
+
+@app.before_request
+def start_warm_up():
+    """Kick off warm-up in the background on the first request of this process"""
+    if not warm_up_started.is_set():
+        warm_up_started.set()
+        threading.Thread(target=warm_up, name='dashboard-warm-up', daemon=True).start()
+        health_monitor.start()
+
+@app.route('/health')
+def health():
+    """Liveness: the process is up (no database access)"""
+    return jsonify(health_monitor.liveness())
+
+@app.route('/ready')
+def ready():
+    """Readiness from the cached probe results; 503 until everything critical passes"""
+    is_ready, report = health_monitor.readiness()
+    return jsonify(report), 200 if is_ready else 503
 
 # Routes
 @app.route('/')
@@ -77,24 +238,19 @@ def dashboard():
     if not session.get('logged_in'):
         return redirect(url_for('login'))
     
-    connection = get_db_connection()
-    if not connection:
-        return "Database connection failed", 500
-    
-    cursor = connection.cursor(dictionary=True)
-    
     # Get statistics
     stats_query = """
     SELECT 
         (SELECT COUNT(*) FROM users) as total_users,
         (SELECT COUNT(*) FROM users WHERE DATE(created_at) = CURDATE()) as new_users_today,
         (SELECT COUNT(*) FROM jobs WHERE status = 'active') as active_jobs,
-        (SELECT COUNT(*) FROM applications WHERE DATE(created_at) = CURDATE()) as today_applications,
-        (SELECT COUNT(*) FROM messages WHERE DATE(timestamp) = CURDATE()) as messages_today,
-        (SELECT COUNT(DISTINCT user_id) FROM messages WHERE DATE(timestamp) = CURDATE()) as active_users_today
+        (SELECT COUNT(*) FROM applications
+         WHERE applied_at >= CURDATE() AND applied_at < CURDATE() + INTERVAL 1 DAY) as today_applications,
+        (SELECT COUNT(*) FROM messages
+         WHERE timestamp >= CURDATE() AND timestamp < CURDATE() + INTERVAL 1 DAY) as messages_today,
+        (SELECT COUNT(DISTINCT user_id) FROM messages
+         WHERE timestamp >= CURDATE() AND timestamp < CURDATE() + INTERVAL 1 DAY) as active_users_today
     """
-    cursor.execute(stats_query)
-    stats = cursor.fetchone()
     
     # Get recent users
     users_query = """
@@ -103,8 +259,6 @@ def dashboard():
     ORDER BY created_at DESC
     LIMIT 10
     """
-    cursor.execute(users_query)
-    recent_users = cursor.fetchall()
     
     # Get recent jobs
     jobs_query = """
@@ -114,8 +268,6 @@ def dashboard():
     ORDER BY j.created_at DESC
     LIMIT 10
     """
-    cursor.execute(jobs_query)
-    recent_jobs = cursor.fetchall()
     
     # Get user growth data (last 7 days)
     growth_query = """
@@ -125,18 +277,22 @@ def dashboard():
     GROUP BY DATE(created_at)
     ORDER BY date
     """
-    cursor.execute(growth_query)
-    user_growth = cursor.fetchall()
     
-    cursor.close()
-    connection.close()
+    # Independent queries run side by side; a failed one leaves its panel empty
+    results, errors = dashboard_queries.run({
+        'stats': (stats_query, None, True),
+        'recent_users': (users_query, None, False),
+        'recent_jobs': (jobs_query, None, False),
+        'user_growth': (growth_query, None, False),
+    })
     
     return render_template(
         'dashboard.html',
-        stats=stats,
-        recent_users=recent_users,
-        recent_jobs=recent_jobs,
-        user_growth=user_growth,
+        stats=results.get('stats') or {},
+        recent_users=results.get('recent_users') or [],
+        recent_jobs=results.get('recent_jobs') or [],
+        user_growth=results.get('user_growth') or [],
+        unavailable=sorted(errors),
         username=session.get('username')
     )
 
@@ -173,7 +329,7 @@ def api_stats():
         DATE(created_at) as date,
         COUNT(*) as new_users,
         (SELECT COUNT(*) FROM jobs WHERE DATE(created_at) = date) as new_jobs,
-        (SELECT COUNT(*) FROM applications WHERE DATE(created_at) = date) as new_applications
+        (SELECT COUNT(*) FROM applications WHERE DATE(applied_at) = date) as new_applications
     FROM users
     WHERE created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
     GROUP BY DATE(created_at)
@@ -256,7 +412,7 @@ def api_jobs():
     cursor = connection.cursor(dictionary=True)
     
     # Get filter parameters
-    limit = request.args.get('limit', 100, type=int)
+    limit = request.args.get('limit', dashboard_page_size(), type=int)
     offset = request.args.get('offset', 0, type=int)
     status = request.args.get('status')
     category = request.args.get('category')
@@ -350,6 +506,50 @@ def api_broadcast():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/analytics/funnel')
+def api_analytics_funnel():
+    """Hiring funnel (views -> applications -> shortlisted -> accepted)"""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    group_by = request.args.get('by', 'category')
+    if group_by not in ('category', 'company'):
+        return jsonify({'error': "by must be 'category' or 'company'"}), 400
+    
+    reports = get_analytics_reports()
+    if reports is None:
+        return jsonify({'error': 'Analytics unavailable'}), 503
+    
+    return jsonify({
+        'by': group_by,
+        'funnel': reports[f'funnel_{group_by}'],
+        'generated_at': reports['generated_at']
+    })
+
+@app.route('/api/analytics/time-to-review')
+def api_analytics_time_to_review():
+    """Hours from application to review"""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    reports = get_analytics_reports()
+    if reports is None:
+        return jsonify({'error': 'Analytics unavailable'}), 503
+    
+    return jsonify({**reports['time_to_review'], 'generated_at': reports['generated_at']})
+
+@app.route('/api/analytics/salaries')
+def api_analytics_salaries():
+    """Salary distribution of active jobs"""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    reports = get_analytics_reports()
+    if reports is None:
+        return jsonify({'error': 'Analytics unavailable'}), 503
+    
+    return jsonify({**reports['salaries'], 'generated_at': reports['generated_at']})
+
 @app.route('/users')
 def users_page():
     """Users management page"""
@@ -382,12 +582,9 @@ def settings_page():
     
     return render_template('settings.html', username=session.get('username'))
 
-# Templates
-@app.route('/templates/<template_name>')
-def serve_template(template_name):
-    """Serve HTML templates"""
-    templates = {
-        'login.html': '''
+# Templates (built once at import, not on every request)
+TEMPLATES = {
+    'login.html': '''
         <!DOCTYPE html>
         <html lang="en">
         <head>
@@ -467,9 +664,9 @@ def serve_template(template_name):
             <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
         </body>
         </html>
-        ''',
+    ''',
         
-        'dashboard.html': '''
+    'dashboard.html': '''
         <!DOCTYPE html>
         <html lang="en">
         <head>
@@ -573,6 +770,13 @@ def serve_template(template_name):
                         </nav>
                         
                         <div class="p-4">
+                            {% if unavailable %}
+                            <div class="alert alert-warning" role="alert">
+                                <i class="fas fa-exclamation-triangle me-1"></i>
+                                Could not load: {{ unavailable | map('replace', '_', ' ') | join(', ') }}.
+                                Those panels are empty; refresh to try again.
+                            </div>
+                            {% endif %}
                             <!-- Stats Cards -->
                             <div class="row mb-4">
                                 <div class="col-md-3 mb-3">
@@ -822,10 +1026,13 @@ def serve_template(template_name):
             </script>
         </body>
         </html>
-        '''
-    }
-    
-    return templates.get(template_name, 'Template not found')
+    '''
+}
+
+@app.route('/templates/<template_name>')
+def serve_template(template_name):
+    """Serve HTML templates"""
+    return TEMPLATES.get(template_name, 'Template not found')
 
 if __name__ == '__main__':
     # Create logs directory
@@ -0,0 +1,117 @@
+import asyncio
+
+from applications import ACCEPTED, BUSY, CLOSED, COOLDOWN, DUPLICATE, ApplicationPipeline
+
+
+class FakeDatabase:
+    """Answers the pipeline's job and user lookups"""
+
+    def __init__(self, open_jobs=(1, 2, 3), applied=()):
+        self.open_jobs = set(open_jobs)
+        self.applied = list(applied)
+        self.available = True
+        self.queries = 0
+
+    def fetch(self, query, params=None):
+        self.queries += 1
+        if not self.available:
+            return None
+        if 'FROM jobs' in query:
+            return [{'id': params[0]}] if params[0] in self.open_jobs else []
+        return [{'job_id': job_id, 'applied_at': 0} for job_id, user_id in self.applied if user_id == params[0]]
+
+
+def make_pipeline(db, insert, cooldown=0.0, **kwargs):
+    kwargs.setdefault('batch_wait', 0.05)
+    pipeline = ApplicationPipeline({}, fetch=db.fetch, cooldown_hours=lambda: cooldown,
+                                   retry_delay=0, **kwargs)
+    pipeline._insert = insert
+    return pipeline
+
+
+def submit(pipeline, *args, **kwargs):
+    return asyncio.run(pipeline.submit(*args, **kwargs))
+
+
+def drain(pipeline, failed=None):
+    async def run():
+        if failed is not None:
+            async def on_failed(submission):
+                failed.append((submission.job_id, submission.user_id, submission.chat_id))
+            pipeline.on_failed = on_failed
+        pipeline.start()
+        await pipeline.stop()
+    asyncio.run(run())
+
+
+def test_submit_checks():
+    db = FakeDatabase(applied=[(2, 10)])
+    pipeline = make_pipeline(db, insert=len)
+    assert submit(pipeline, 9, 10) == CLOSED
+    assert submit(pipeline, 2, 10) == DUPLICATE
+    assert submit(pipeline, 1, 10) == ACCEPTED
+    assert submit(pipeline, 1, 10) == DUPLICATE
+    db.available = False
+    assert submit(pipeline, 3, 11) == BUSY
+    assert len(pipeline) == 1
+
+
+def test_failed_batch_is_retried():
+    calls = []
+
+    def insert(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError('lost connection')
+        return len(batch)
+
+    pipeline = make_pipeline(FakeDatabase(), insert)
+    submit(pipeline, 1, 10)
+    submit(pipeline, 2, 11)
+    failed = []
+    drain(pipeline, failed)
+    assert calls == [2, 2]
+    assert pipeline.inserted == 2
+    assert failed == []
+
+
+def test_application_that_cannot_be_saved_is_rolled_back_and_reported():
+    def insert(batch):
+        raise RuntimeError('database down')
+
+    pipeline = make_pipeline(FakeDatabase(), insert, cooldown=24.0)
+    assert submit(pipeline, 1, 10, chat_id=500) == ACCEPTED
+    assert submit(pipeline, 2, 10) == COOLDOWN
+    failed = []
+    drain(pipeline, failed)
+    assert failed == [(1, 10, 500)]
+    assert pipeline.failed == 1
+    # Neither a duplicate nor in cooldown any more
+    assert pipeline.retry_after(10) == 0
+    assert submit(pipeline, 1, 10) == ACCEPTED
+
+
+def test_only_the_bad_row_of_a_batch_fails():
+    def insert(batch):
+        if any(submission.job_id == 2 for submission in batch):
+            raise RuntimeError('foreign key constraint fails')
+        return len(batch)
+
+    pipeline = make_pipeline(FakeDatabase(), insert, max_attempts=2)
+    for job_id, user_id in ((1, 10), (2, 11), (3, 12)):
+        submit(pipeline, job_id, user_id)
+    failed = []
+    drain(pipeline, failed)
+    assert failed == [(2, 11, None)]
+    assert pipeline.inserted == 2
+
+
+def test_user_state_is_bounded():
+    db = FakeDatabase()
+    pipeline = make_pipeline(db, insert=len, max_users=1)
+    submit(pipeline, 1, 10)
+    submit(pipeline, 1, 11)
+    queries = db.queries
+    # User 10 was evicted; the queued application still counts as a duplicate
+    assert submit(pipeline, 1, 10) == DUPLICATE
+    assert db.queries == queries + 1
@@ -0,0 +1,51 @@
+import time
+
+from cache import TTLCache
+
+
+def test_entries_expire():
+    cache = TTLCache(ttl=0.05)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.06)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_get_or_set_calls_factory_once():
+    cache = TTLCache()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return [1, 2]
+
+    assert cache.get_or_set('k', factory) == [1, 2]
+    assert cache.get_or_set('k', factory) == [1, 2]
+    assert len(calls) == 1
+
+
+def test_get_or_set_does_not_cache_failures():
+    cache = TTLCache()
+    assert cache.get_or_set('k', lambda: None) is None
+    assert cache.get_or_set('k', lambda: 'ok') == 'ok'
+
+
+def test_pop_and_counters():
+    cache = TTLCache()
+    cache.set('a', 1)
+    assert cache.pop('a') == 1
+    assert cache.pop('a', 'gone') == 'gone'
+    cache.get('a')
+    assert cache.misses == 1
@@ -0,0 +1,66 @@
+import pytest
+
+from callback_router import CallbackRouter
+
+
+async def handler(update, context, *args):
+    pass
+
+
+def make_router():
+    router = CallbackRouter()
+    router.add("browse_jobs", "b", handler, throttle="jobs", legacy="browse_jobs")
+    router.add("view_job", "v", handler, args=(int,), legacy="view_job")
+    router.add("admin", "x", handler, args=(str,), clear_markup=True, legacy="admin")
+    return router
+
+
+def test_encode_decode_round_trip():
+    router = make_router()
+    assert router.encode("view_job", 123) == "1v:123"
+    route, args = router.decode(router.encode("view_job", 123))
+    assert route.name == "view_job" and args == (123,)
+    route, args = router.decode(router.encode("browse_jobs"))
+    assert route.name == "browse_jobs" and args == ()
+
+
+def test_legacy_payloads():
+    router = make_router()
+    route, args = router.decode("view_job_42")
+    assert route.name == "view_job" and args == (42,)
+    route, args = router.decode("admin_users")
+    assert route.name == "admin" and args == ("users",)
+    assert router.decode("browse_jobs")[0].name == "browse_jobs"
+
+
+def test_bad_payloads_do_not_decode():
+    router = make_router()
+    assert router.decode(None) is None
+    assert router.decode("1v:abc") is None
+    assert router.decode("1v") is None
+    assert router.decode("1q:1") is None
+    assert router.decode("something_else") is None
+
+
+def test_encode_rejects_separator_and_long_payloads():
+    router = make_router()
+    with pytest.raises(ValueError):
+        router.encode("admin", "a:b")
+    with pytest.raises(ValueError):
+        router.encode("admin", "x" * 70)
+
+
+def test_duplicate_routes_are_rejected():
+    router = make_router()
+    with pytest.raises(ValueError):
+        router.add("other", "v", handler)
+    with pytest.raises(ValueError):
+        router.add("view_job", "z", handler)
+
+
+def test_buckets():
+    router = make_router()
+    assert router.bucket("1b") == "jobs"
+    assert router.bucket("1v:5") == "view_job"
+    assert router.bucket("my_applications_7") == "my_applications"
+    assert router.bucket(None) is None
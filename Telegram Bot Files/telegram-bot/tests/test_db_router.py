@@ -0,0 +1,48 @@
+import asyncio
+
+from db_router import DatabaseRouter
+
+
+def make_router():
+    return DatabaseRouter({'host': 'db', 'port': '3306'}, replica_hosts='', sticky_seconds=10)
+
+
+def test_write_in_worker_thread_pins_the_update():
+    router = make_router()
+
+    async def handler():
+        router.bind(None)
+        assert not router.prefers_primary()
+        await asyncio.to_thread(router.mark_write)
+        return router.prefers_primary()
+
+    assert asyncio.run(handler())
+
+
+def test_new_update_starts_unpinned():
+    router = make_router()
+
+    async def handler(write):
+        router.bind(None)
+        if write:
+            await asyncio.to_thread(router.mark_write)
+        return router.prefers_primary()
+
+    async def main():
+        return await handler(True), await asyncio.create_task(handler(False))
+
+    assert asyncio.run(main()) == (True, False)
+
+
+def test_sticky_key_after_write():
+    router = make_router()
+
+    async def handler(key, write):
+        router.bind(key)
+        if write:
+            await asyncio.to_thread(router.mark_write)
+        return router.prefers_primary()
+
+    assert asyncio.run(handler(42, True))
+    assert asyncio.run(handler(42, False))
+    assert not asyncio.run(handler(7, False))
@@ -0,0 +1,39 @@
+import json
+
+from error_digest import ErrorAggregator, error_location
+
+
+def parse_settings():
+    return json.loads('{oops')
+
+
+def parse_profile():
+    return json.loads('[oops')
+
+
+def caught(function):
+    try:
+        function()
+    except ValueError as e:
+        return e
+
+
+def test_library_errors_are_placed_in_bot_code():
+    assert error_location(caught(parse_settings)).endswith('in parse_settings')
+    assert error_location(caught(parse_profile)).endswith('in parse_profile')
+
+
+def test_innermost_frame_without_bot_frames():
+    error = caught(parse_settings)
+    assert 'decoder.py' in error_location(error, root='/nonexistent')
+
+
+def test_groups_by_type_and_location():
+    aggregator = ErrorAggregator(max_groups=2)
+    for function in (parse_settings, parse_settings, parse_profile):
+        aggregator.record(caught(function), user_id=1)
+    aggregator.record(KeyError('x'))
+    groups = aggregator.drain()
+    assert [group.count for group in groups] == [2, 1, 1]
+    assert groups[-1].location == 'various locations'
+    assert len(aggregator) == 0
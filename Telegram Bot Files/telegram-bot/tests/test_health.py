@@ -0,0 +1,34 @@
+import logging
+
+from health import HealthMonitor
+
+
+def failing_check():
+    raise ConnectionError("Can't connect to MySQL server on 'db.internal:3306'")
+
+
+def test_public_readiness_hides_probe_details(caplog):
+    monitor = HealthMonitor()
+    monitor.add_probe('database', failing_check)
+    monitor.add_probe('settings', lambda: {'ok': True, 'version': 7}, critical=False)
+    with caplog.at_level(logging.WARNING, logger='health'):
+        for probe in monitor.probes.values():
+            probe.run()
+
+    ready, body = monitor.readiness()
+    assert not ready
+    assert body == {'status': 'not_ready', 'checks': {'database': False, 'settings': True}}
+    assert 'db.internal' in caplog.text
+
+    _, detailed = monitor.readiness(detail=True)
+    assert 'db.internal' in detailed['checks']['database']['error']
+    assert detailed['checks']['settings']['version'] == 7
+
+
+def test_failures_are_logged_once(caplog):
+    monitor = HealthMonitor()
+    monitor.add_probe('database', failing_check)
+    with caplog.at_level(logging.WARNING, logger='health'):
+        for _ in range(3):
+            monitor.probes['database'].run()
+    assert len(caplog.records) == 1
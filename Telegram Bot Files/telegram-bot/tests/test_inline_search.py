@@ -0,0 +1,72 @@
+from datetime import date, datetime
+
+from inline_search import InlineJobIndex
+
+TODAY = date(2026, 10, 1)
+
+
+def job(job_id, title, day=1, **fields):
+    return {
+        'id': job_id, 'title': title, 'company_name': fields.pop('company_name', 'Acme'),
+        'location': 'Addis Ababa', 'job_type': 'full-time', 'status': 'active',
+        'deadline': date(2026, 12, 1), 'created_at': datetime(2026, 9, day),
+        'updated_at': datetime(2026, 9, day), **fields,
+    }
+
+
+def make_index(**kwargs):
+    index = InlineJobIndex(page_size=10, **kwargs)
+    index.load([
+        job(1, 'Python Developer', day=1),
+        job(2, 'Senior Python Engineer', day=2),
+        job(3, 'Java Developer', day=3),
+        job(4, 'Accountant', day=4, company_name='Dashen Bank'),
+    ])
+    return index
+
+
+def ids(index, text):
+    return [card['id'] for card in index.search(text)[0]]
+
+
+def test_every_word_must_prefix_match_newest_first():
+    index = make_index()
+    assert ids(index, 'pyth') == [2, 1]
+    assert ids(index, 'dev') == [3, 1]
+    assert ids(index, 'pyth dev') == [1]
+    assert ids(index, 'dashen') == [4]
+    assert ids(index, 'golang') == []
+    assert ids(index, '') == [4, 3, 2, 1]
+
+
+def test_longer_query_narrows_the_cached_prefix_result():
+    index = make_index()
+    assert ids(index, 'py') == [2, 1]
+    assert ids(index, 'pyth') == [2, 1]
+    assert ids(index, 'python eng') == [2]
+    assert index.narrowed == 2
+
+
+def test_truncated_prefix_result_is_not_narrowed():
+    index = make_index(max_results=1)
+    assert ids(index, 'py') == [2]
+    assert ids(index, 'python dev') == [1]
+    assert index.narrowed == 0
+
+
+def test_apply_swaps_in_a_new_snapshot():
+    index = make_index()
+    assert ids(index, 'python') == [2, 1]
+    before = index._snapshot
+
+    updated, removed = index.apply([
+        job(5, 'Python Data Analyst', day=5, updated_at=datetime(2026, 9, 30)),
+        job(1, 'Python Developer', day=1, status='closed', updated_at=datetime(2026, 9, 30)),
+    ], today=TODAY)
+    assert (updated, removed) == (1, 1)
+    # The cached result of the old snapshot is not reused
+    assert ids(index, 'python') == [5, 2]
+    assert index.watermark == datetime(2026, 9, 30)
+    # Searches already holding the old snapshot still see it whole
+    assert sorted(before.cards) == [1, 2, 3, 4]
+    assert before.postings['python'] == {1, 2}
@@ -0,0 +1,50 @@
+from locations import LocationIndex, like_prefix, normalize
+
+LOCATIONS = [
+    {'id': 1, 'name': 'Addis Ababa', 'name_am': 'አዲስ አበባ', 'is_remote': False},
+    {'id': 2, 'name': 'Adama', 'name_am': 'አዳማ', 'is_remote': False},
+    {'id': 3, 'name': 'Bahir Dar', 'name_am': None, 'is_remote': False},
+    {'id': 9, 'name': 'Remote', 'name_am': None, 'is_remote': True},
+]
+ALIASES = [
+    {'location_id': 1, 'alias': 'Addis'},
+    {'location_id': 1, 'alias': 'A.A'},
+    {'location_id': 2, 'alias': 'Nazret'},
+]
+
+
+def make_index():
+    def fetch(query, params=None):
+        return LOCATIONS if 'FROM locations' in query else ALIASES
+    index = LocationIndex(fetch)
+    assert index.load()
+    return index
+
+
+def test_normalize():
+    assert normalize('Addis Ababa, Ethiopia') == 'addis ababa'
+    assert normalize('A.A') == 'aa'
+    assert normalize(None) == ''
+
+
+def test_resolve_exact_alias_and_parts():
+    index = make_index()
+    assert index.resolve('Addis Ababa') == 1
+    assert index.resolve('A.A') == 1
+    assert index.resolve('አዲስ አበባ') == 1
+    assert index.resolve('Bole, Addis') == 1
+    assert index.resolve('bahirdar') == 3
+    assert index.resolve('Nazret') == 2
+    assert index.is_remote(index.resolve('remote'))
+
+
+def test_resolve_fuzzy_and_unknown():
+    index = make_index()
+    assert index.resolve('Addis Abeba') == 1
+    assert index.resolve('Gondar') is None
+    assert index.resolve('') is None
+
+
+def test_like_prefix_escapes_wildcards():
+    assert like_prefix(' Adama ') == 'Adama%'
+    assert like_prefix('50%_off') == '50\\%\\_off%'
@@ -0,0 +1,64 @@
+import os
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from parquet_archive import ParquetArchiver, application_funnel
+
+MONTH = date(2026, 1, 1)
+
+
+def test_messages_month_is_final_once_closed():
+    state = {'changed': None, 'open_rows': 0}
+    assert ParquetArchiver.is_final('messages', MONTH, state, today=date(2026, 2, 1))
+
+
+def test_applications_month_stays_open_while_rows_can_change():
+    state = {'changed': None, 'open_rows': 3}
+    assert not ParquetArchiver.is_final('applications', MONTH, state, today=date(2026, 3, 1))
+    assert ParquetArchiver.is_final('applications', MONTH, state, today=date(2027, 1, 1))
+    assert ParquetArchiver.is_final('applications', MONTH, {'changed': None, 'open_rows': 0}, today=date(2026, 2, 1))
+    assert ParquetArchiver.needs_export({'final': False, 'open_rows': 3}, state)
+
+
+def test_users_month_is_re_exported_only_when_rows_changed():
+    changed = datetime(2026, 3, 4, 5, 6)
+    state = {'changed': changed, 'open_rows': 0}
+    assert not ParquetArchiver.is_final('users', MONTH, state, today=date(2030, 1, 1))
+    entry = {'final': False, 'open_rows': 0, 'changed': changed.isoformat()}
+    assert not ParquetArchiver.needs_export(entry, state)
+    assert ParquetArchiver.needs_export(entry, {'changed': datetime(2026, 4, 1), 'open_rows': 0})
+    assert ParquetArchiver.needs_export(None, state)
+    assert not ParquetArchiver.needs_export({'final': True}, state)
+
+
+def write_month(archive_dir, month, rows):
+    directory = os.path.join(archive_dir, 'applications', f"month={month}")
+    os.makedirs(directory)
+    table = pa.Table.from_pylist(rows, schema=pa.schema([
+        ('applied_at', pa.timestamp('us')), ('status', pa.string())
+    ]))
+    pq.write_table(table, os.path.join(directory, 'part-0.parquet'))
+
+
+def test_application_funnel(tmp_path):
+    archive_dir = str(tmp_path)
+    write_month(archive_dir, '2026-01', [
+        {'applied_at': datetime(2026, 1, 3), 'status': 'accepted'},
+        {'applied_at': datetime(2026, 1, 9), 'status': 'rejected'},
+        {'applied_at': datetime(2026, 1, 20), 'status': 'pending'},
+        {'applied_at': datetime(2026, 1, 21), 'status': 'rejected'},
+    ])
+    write_month(archive_dir, '2026-02', [
+        {'applied_at': datetime(2026, 2, 1), 'status': 'accepted'},
+    ])
+
+    funnel = application_funnel(archive_dir=archive_dir)
+    assert list(funnel.index) == ['2026-01', '2026-02']
+    january = funnel.loc['2026-01']
+    assert (january['total'], january['accepted'], january['rejected'], january['pending']) == (4, 1, 2, 1)
+    assert january['rejected_rate'] == 0.5
+
+    assert list(application_funnel(start=date(2026, 2, 1), archive_dir=archive_dir).index) == ['2026-02']
+    assert application_funnel(archive_dir=str(tmp_path / 'missing')).empty
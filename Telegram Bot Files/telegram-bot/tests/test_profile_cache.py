@@ -0,0 +1,86 @@
+import pytest
+
+from profile_cache import ProfileCache, parse_profile_reply, parse_salary
+
+
+class FakeDatabase:
+    def __init__(self, rows=None):
+        self.rows = rows
+        self.queries = []
+        self.updates = []
+        self.update_ok = True
+
+    def execute_query(self, query, params=None, fetch_one=False):
+        self.queries.append((query, params))
+        return self.rows
+
+    def execute_update(self, query, params=None):
+        self.updates.append((query, params))
+        return self.update_ok
+
+
+def test_unknown_user_is_cached():
+    db = FakeDatabase(rows=[])
+    cache = ProfileCache(db)
+    assert cache.get(42) is None
+    assert cache.get(42) is None
+    assert len(db.queries) == 1
+
+
+def test_database_error_is_not_cached():
+    db = FakeDatabase(rows=None)
+    cache = ProfileCache(db)
+    assert cache.get(42) is None
+    assert cache.get(42) is None
+    assert len(db.queries) == 2
+
+
+def test_update_writes_through_and_refreshes_completion():
+    db = FakeDatabase(rows=[{'id': 1, 'telegram_id': 42, 'full_name': 'Abebe'}])
+    cache = ProfileCache(db)
+    assert cache.get(42)['profile_completion'] == 14
+
+    assert cache.update(42, email='abebe@example.com', phone='0911')
+    profile = cache.get(42)
+    assert profile['email'] == 'abebe@example.com'
+    assert profile['profile_completion'] == 42
+    assert len(db.queries) == 1
+    assert db.updates[0][1] == ('abebe@example.com', '0911', 42)
+
+
+def test_failed_update_drops_cached_profile():
+    db = FakeDatabase(rows=[{'id': 1, 'telegram_id': 42}])
+    cache = ProfileCache(db)
+    cache.get(42)
+    db.update_ok = False
+    assert not cache.update(42, email='x@example.com')
+    cache.get(42)
+    assert len(db.queries) == 2
+
+
+def test_update_rejects_unknown_fields():
+    cache = ProfileCache(FakeDatabase(rows=[]))
+    with pytest.raises(ValueError):
+        cache.update(42, id=7)
+
+
+def test_parse_profile_reply():
+    text = ("Name: Abebe Kebede\n"
+            "Email: abebe@example.com\n"
+            "Phone:\n"
+            "Skills: Python, SQL\n"
+            "Salary: 15000-25000 ETB")
+    assert parse_profile_reply(text) == {
+        'full_name': 'Abebe Kebede',
+        'email': 'abebe@example.com',
+        'skills': 'Python, SQL',
+        'expected_salary_min': 15000,
+        'expected_salary_max': 25000,
+    }
+    assert parse_profile_reply("hello there") == {}
+
+
+def test_parse_salary():
+    assert parse_salary("20k") == {'expected_salary_min': 20000}
+    assert parse_salary("30,000 - 18,000") == {'expected_salary_min': 18000, 'expected_salary_max': 30000}
+    assert parse_salary("negotiable") == {}
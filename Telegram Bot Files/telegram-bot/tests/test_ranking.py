@@ -0,0 +1,38 @@
+from ranking import JobRanker
+
+
+def seeker(telegram_id, skills, location='Addis Ababa'):
+    return {'telegram_id': telegram_id, 'skills': skills, 'location': location, 'expected_salary': None}
+
+
+def job(job_id, title, requirements, location='Addis Ababa'):
+    return {'id': job_id, 'title': title, 'requirements': requirements, 'location': location,
+            'category': 'IT', 'created_at': job_id}
+
+
+JOBS = [
+    job(1, 'Python developer', 'python django flask'),
+    job(2, 'Backend developer', 'python flask'),
+    job(3, 'Data analyst', 'python sql'),
+]
+
+
+def ids(ranker, telegram_id):
+    return [card['id'] for card in ranker.top_jobs(telegram_id, limit=5)]
+
+
+def test_retain_jobs_refills_top_lists():
+    ranker = JobRanker(top_n=2)
+    ranker.rank_all([seeker(10, 'python django flask')], JOBS)
+    assert ids(ranker, 10) == [1, 2]
+
+    assert ranker.retain_jobs([2, 3]) == 1
+    assert ids(ranker, 10) == [2, 3]
+    assert 1 not in ranker._job_ids
+
+
+def test_retain_jobs_without_changes():
+    ranker = JobRanker(top_n=2)
+    ranker.rank_all([seeker(10, 'python')], JOBS)
+    assert ranker.retain_jobs([1, 2, 3]) == 0
+    assert len(ids(ranker, 10)) == 2
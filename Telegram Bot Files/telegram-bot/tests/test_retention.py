@@ -0,0 +1,71 @@
+import pytest
+
+from retention import RetentionEngine, RetentionPolicy
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        statement = ' '.join(query.split())
+        self.connection.log.append(statement)
+        self.rows = []
+        if 'information_schema.COLUMNS' in statement:
+            self.rows = [{'name': 'id', 'type': 'int'}]
+        elif statement.startswith('SELECT id FROM jobs'):
+            self.rows = self.connection.chunks.pop(0) if self.connection.chunks else []
+        self.rowcount = len(params) if statement.startswith(('INSERT IGNORE', 'DELETE')) else 0
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.log = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+    def rollback(self):
+        self.log.append('ROLLBACK')
+
+
+def test_archive_tables_are_created_before_the_first_chunk():
+    engine = RetentionEngine({}, chunk_size=2, pause=0)
+    engine.connection = FakeConnection([[{'id': 1}, {'id': 2}], [{'id': 3}]])
+    policy = RetentionPolicy('jobs', 'updated_at', 90, children={'applications': 'job_id'})
+
+    totals = engine.run_policy(policy)
+    assert totals['deleted'] == 3 and totals['chunks'] == 2
+
+    log = engine.connection.log
+    creates = [index for index, statement in enumerate(log) if statement.startswith('CREATE TABLE')]
+    first_write = next(index for index, statement in enumerate(log) if statement.startswith('INSERT IGNORE'))
+    assert len(creates) == 2
+    assert max(creates) < first_write
+    # Each chunk is archive + delete of children and parent, then one commit
+    chunk = log[first_write:log.index('COMMIT', first_write) + 1]
+    assert [statement.split()[0] for statement in chunk] == [
+        'INSERT', 'DELETE', 'INSERT', 'DELETE', 'UPDATE', 'COMMIT'
+    ]
+
+
+def test_archiving_an_unprepared_table_fails():
+    engine = RetentionEngine({})
+    engine.connection = FakeConnection([])
+    with pytest.raises(RuntimeError):
+        engine._archive('messages', 'id IN (%s)', (1,))
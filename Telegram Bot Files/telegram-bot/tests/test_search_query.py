@@ -0,0 +1,49 @@
+from search_query import compile_query, parse_query, text_terms
+
+
+def test_filters():
+    query = parse_query("salary:20k-40k type:fulltime cat:IT level:junior salary:abc")
+    assert query.filters['salary'] == ('between', (20000, 40000))
+    assert query.filters['type'] == ('=', 'full-time')
+    assert query.filters['category'] == ('=', 'IT')
+    assert query.filters['level'] == ('=', 'entry')
+    assert query.ignored == ['salary:abc']
+    assert parse_query("salary:>25000").filters['salary'] == ('>', 25000)
+    assert parse_query("pay:15000+").filters['salary'] == ('>=', 15000)
+    assert parse_query("type:nightshift").ignored == ['type:nightshift']
+
+
+def test_terms_are_split_like_the_fulltext_parser():
+    query = parse_query("remote, IT developer/designer (python)")
+    assert query.terms == ['remote', 'developer', 'designer', 'python']
+    assert text_terms("c++") == []
+    assert text_terms("node.js") == ['node']
+
+
+def test_quoted_phrases():
+    assert parse_query('"data analyst" remote').terms == ['data analyst', 'remote']
+    # A phrase with a word the index does not hold falls back to its long words
+    assert parse_query('"head of sales"').terms == ['head', 'sales']
+
+
+def test_compile_text_and_resolved_location():
+    query = parse_query("loc:adama python", resolve_location=lambda text: 2)
+    sql, params = compile_query(query, limit=5)
+    assert "j.location_id = %s" in sql
+    assert "MATCH(" in sql and "relevance DESC" in sql
+    assert params == ('+python*', 2, '+python*', 5)
+
+
+def test_compile_unresolved_location_uses_a_prefix_match():
+    query = parse_query("loc:Gonder_town", resolve_location=lambda text: None)
+    sql, params = compile_query(query, limit=5)
+    assert "j.location LIKE %s" in sql
+    assert "MATCH(" not in sql
+    assert params == ('Gonder\\_town%', 5)
+
+
+def test_same_shape_reuses_the_plan():
+    first, _ = compile_query(parse_query("type:remote python"))
+    second, params = compile_query(parse_query("job:contract java"))
+    assert first is second
+    assert params == ('+java*', 'contract', '+java*', 10)
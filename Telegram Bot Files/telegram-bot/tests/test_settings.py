@@ -0,0 +1,39 @@
+import pytest
+
+from settings_service import SettingsService, convert_value
+
+
+def test_convert_value_by_setting_type():
+    assert convert_value('20', 'integer') == 20
+    assert convert_value(' Yes ', 'boolean') is True
+    assert convert_value('off', 'boolean') is False
+    assert convert_value('{"a": 1}', 'json') == {'a': 1}
+    assert convert_value('IT, finance,,', 'array') == ['IT', 'finance']
+    assert convert_value('["IT", "finance"]', 'array') == ['IT', 'finance']
+    assert convert_value('daily', 'string') == 'daily'
+    assert convert_value(None, 'integer') is None
+
+
+def test_convert_value_rejects_malformed_values():
+    with pytest.raises(ValueError):
+        convert_value('twenty', 'integer')
+    with pytest.raises(ValueError):
+        convert_value('{oops', 'json')
+
+
+def test_malformed_setting_falls_back_to_default():
+    rows = [
+        {'setting_key': 'jobs_per_page', 'setting_value': 'many', 'setting_type': 'integer'},
+        {'setting_key': 'dashboard_page_size', 'setting_value': '50', 'setting_type': 'integer'},
+        {'setting_key': 'maintenance_mode', 'setting_value': 'true', 'setting_type': 'boolean'},
+    ]
+
+    def fetch(query, params, fetch_one):
+        return {'updated_at': 1, 'total': len(rows)} if fetch_one else rows
+
+    settings = SettingsService(fetch)
+    assert settings.load()
+    assert settings.get_int('jobs_per_page', 5) == 5
+    assert settings.get_int('dashboard_page_size', 100) == 50
+    assert settings.get_int('maintenance_mode', 3) == 3
+    assert settings.get_bool('maintenance_mode')
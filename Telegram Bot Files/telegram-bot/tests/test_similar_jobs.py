@@ -0,0 +1,53 @@
+from scipy import sparse
+
+from similar_jobs import SimilarJobsIndex
+
+
+def job(job_id, title, category='IT', requirements='', location='Addis Ababa'):
+    return {
+        'id': job_id, 'title': title, 'category': category,
+        'requirements': requirements, 'location': location, 'updated_at': 1,
+    }
+
+
+JOBS = [
+    job(1, 'Python developer', requirements='django postgres'),
+    job(2, 'Senior Python developer', requirements='django flask'),
+    job(3, 'Accountant', category='Finance', requirements='ifrs audit', location='Hawassa'),
+    job(4, 'Junior accountant', category='Finance', requirements='audit excel', location='Hawassa'),
+]
+
+
+def ids(index, job_id):
+    return [item['id'] for item in index.neighbors(job_id)]
+
+
+def test_build_keeps_vectors_sparse():
+    index = SimilarJobsIndex(top_k=2)
+    index.build(JOBS)
+    assert sparse.isspmatrix_csr(index._matrix)
+    assert index._matrix.nnz < index._matrix.shape[0] * index._matrix.shape[1]
+    assert ids(index, 1)[0] == 2
+    assert ids(index, 3)[0] == 4
+
+
+def test_add_and_remove_update_neighbors():
+    index = SimilarJobsIndex(top_k=2)
+    index.build(JOBS)
+    index.add([job(5, 'Python backend developer', requirements='django')])
+    assert sparse.isspmatrix_csr(index._matrix)
+    assert index._matrix.shape[0] == 5
+    assert 5 in ids(index, 1)
+    assert ids(index, 5)[0] in (1, 2)
+
+    index.remove([2])
+    assert 2 not in ids(index, 1)
+    assert 2 not in ids(index, 5)
+    assert index.neighbors(2) == []
+
+
+def test_add_before_build():
+    index = SimilarJobsIndex()
+    index.add([job(1, 'Python developer')])
+    assert len(index) == 1
+    assert index.neighbors(1) == []
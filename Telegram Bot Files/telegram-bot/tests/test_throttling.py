@@ -0,0 +1,50 @@
+from throttling import FloodControl, TokenBucket
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(capacity=2, rate=1.0, now=0.0)
+    assert bucket.consume(0.0)
+    assert bucket.consume(0.0)
+    assert not bucket.consume(0.0)
+    assert bucket.consume(1.0)
+
+
+def test_command_bucket_is_separate_from_other_commands():
+    control = FloodControl({'search': (2, 0.0)})
+    assert control.allow(1, 'search', now=0.0)
+    assert control.allow(1, 'search', now=0.0)
+    assert not control.allow(1, 'search', now=0.0)
+    assert control.allow(1, 'jobs', now=0.0)
+    assert control.blocked == 1
+
+
+def test_users_do_not_share_buckets():
+    control = FloodControl({'search': (1, 0.0)})
+    assert control.allow(1, 'search', now=0.0)
+    assert not control.allow(1, 'search', now=0.0)
+    assert control.allow(2, 'search', now=0.0)
+
+
+def test_global_bucket_limits_every_command():
+    control = FloodControl({}, default_rule=(100, 0.0), global_rule=(3, 0.0))
+    assert all(control.allow(1, command, now=0.0) for command in ('a', 'b', 'c'))
+    assert not control.allow(1, 'd', now=0.0)
+
+
+def test_idle_and_excess_users_are_evicted():
+    control = FloodControl({}, max_users=2, idle_ttl=10.0)
+    control.allow(1, None, now=0.0)
+    control.allow(2, None, now=5.0)
+    control.allow(3, None, now=6.0)
+    assert len(control) == 2
+    control.allow(4, None, now=100.0)
+    assert len(control) == 1
+
+
+def test_warns_once_per_interval():
+    control = FloodControl({}, warn_interval=30.0)
+    control.allow(1, None, now=0.0)
+    assert control.should_warn(1, now=100.0)
+    assert not control.should_warn(1, now=110.0)
+    assert control.should_warn(1, now=131.0)
+    assert not control.should_warn(99, now=131.0)
@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+from update_processor import ChatOrderedUpdateProcessor
+
+
+def update(chat_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), effective_user=None)
+
+
+def test_queued_chat_updates_do_not_hold_slots():
+    processor = ChatOrderedUpdateProcessor(2)
+    assert processor.max_concurrent_updates == 2
+    order = []
+
+    async def handle(name, delay):
+        order.append(f"start {name}")
+        await asyncio.sleep(delay)
+        order.append(f"end {name}")
+
+    async def main():
+        # Three updates from chat 1 arrive before chat 2's; only one of them may run at a time
+        tasks = [asyncio.create_task(processor.process_update(update(1), handle(f"a{i}", 0.05)))
+                 for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(processor.process_update(update(2), handle("b", 0))))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order.index("end b") < order.index("end a0")
+    assert [item for item in order if item.split()[1] != 'b'] == ['start a0', 'end a0', 'start a1', 'end a1', 'start a2', 'end a2']
+    assert processor.active_chats == 0
+    assert processor.processed == 4
+
+
+def test_slots_limit_updates_across_chats():
+    processor = ChatOrderedUpdateProcessor(2)
+    running, peak = [0], [0]
+
+    async def handle():
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+
+    async def main():
+        await asyncio.gather(*(processor.process_update(update(chat), handle()) for chat in range(6)))
+
+    asyncio.run(main())
+    assert peak[0] == 2
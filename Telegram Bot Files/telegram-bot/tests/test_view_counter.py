@@ -0,0 +1,29 @@
+from view_counter import ViewCounter, build_flush_query
+
+
+def test_flush_query_adds_counts_and_keeps_updated_at():
+    query, params = build_flush_query({7: 2, 3: 5})
+    assert query == (
+        "UPDATE jobs SET views = views + CASE id WHEN %s THEN %s WHEN %s THEN %s END, "
+        "updated_at = updated_at WHERE id IN (%s, %s)"
+    )
+    assert params == (3, 5, 7, 2, 3, 7)
+
+
+def test_repeat_views_by_a_user_are_counted_once():
+    counter = ViewCounter()
+    assert counter.record(1, user_id=10)
+    assert not counter.record(1, user_id=10)
+    assert counter.record(1, user_id=11)
+    assert counter.record(1)
+    assert counter.drain() == {1: 3}
+    assert counter.drain() == {}
+
+
+def test_restore_merges_failed_counts():
+    counter = ViewCounter()
+    counter.record(1)
+    failed = counter.drain()
+    counter.record(1)
+    counter.restore(failed)
+    assert counter.drain() == {1: 2}
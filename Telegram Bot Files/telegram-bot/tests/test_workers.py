@@ -0,0 +1,65 @@
+import queue
+
+from workers import DRAIN, WorkerPool
+
+
+class FakeChat:
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class FakeUpdate:
+    def __init__(self, update_id, chat_id):
+        self.update_id = update_id
+        self.effective_chat = FakeChat(chat_id)
+        self.effective_user = None
+
+    def to_dict(self):
+        return {'update_id': self.update_id}
+
+
+def make_pool(queue_size=10):
+    pool = WorkerPool(2)
+    pool.queues = {index: queue.Queue(maxsize=queue_size) for index in range(2)}
+    pool.processes = {0: None, 1: None}
+    pool.ring.add(0)
+    return pool
+
+
+def queued(pool, index):
+    items = []
+    while not pool.queues[index].empty():
+        items.append(pool.queues[index].get_nowait())
+    return [item[0] if item[0] == DRAIN else item[0]['update_id'] for item in items]
+
+
+def chat_for(pool, index):
+    return next(chat_id for chat_id in range(1000) if pool.ring.node_for(chat_id) == index)
+
+
+def test_full_queue_overflows_in_order_instead_of_blocking():
+    pool = make_pool(queue_size=2)
+    for update_id in range(5):
+        pool.dispatch(FakeUpdate(update_id, chat_id=1))
+    assert len(pool.overflow[0]) == 3
+    assert queued(pool, 0) == [0, 1]
+    pool._flush_overflow(0)
+    assert queued(pool, 0) == [2, 3]
+    pool.dispatch(FakeUpdate(5, chat_id=1))
+    pool._flush_overflow(0)
+    assert queued(pool, 0) == [4, 5]
+
+
+def test_rejoining_worker_gets_its_chats_after_the_others_drain():
+    pool = make_pool()
+    pool._begin_rejoin(1)
+    chat = chat_for(pool, 1)
+    assert queued(pool, 0) == [DRAIN]
+
+    pool.dispatch(FakeUpdate(1, chat_id=chat))
+    assert queued(pool, 1) == []
+
+    pool._drained(0, 1)
+    assert 1 not in pool.joining
+    pool.dispatch(FakeUpdate(2, chat_id=chat))
+    assert queued(pool, 1) == [1, 2]
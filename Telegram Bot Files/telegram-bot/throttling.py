@@ -0,0 +1,121 @@
+"""
+ZewedJobs flood control
+Per-user, per-command token buckets kept in a bounded in-memory table
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` burst, refilled at `rate` tokens per second"""
+
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated_at')
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = now
+
+    def consume(self, now: float, cost: float = 1.0) -> bool:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+class _UserState:
+    __slots__ = ('buckets', 'last_seen', 'warned_at')
+
+    def __init__(self, now: float):
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.last_seen = now
+        self.warned_at = 0.0
+
+
+class FloodControl:
+    """Rate limiter for incoming updates.
+
+    Every user gets a global bucket plus one bucket per command, so hammering
+    `/search` does not eat into the budget for cheap commands and one abusive
+    user cannot starve anybody else. The user table is an LRU bounded by
+    `max_users`; users idle for longer than `idle_ttl` seconds are evicted.
+    """
+
+    GLOBAL = '*'
+
+    def __init__(
+        self,
+        rules: Dict[str, Tuple[float, float]],
+        default_rule: Tuple[float, float] = (10, 1.0),
+        global_rule: Tuple[float, float] = (30, 2.0),
+        max_users: int = 10000,
+        idle_ttl: float = 600.0,
+        warn_interval: float = 30.0,
+    ):
+        self.rules = dict(rules)
+        self.default_rule = default_rule
+        self.global_rule = global_rule
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        self.warn_interval = warn_interval
+        self._users: "OrderedDict[int, _UserState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.blocked = 0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _rule_for(self, command: str) -> Tuple[float, float]:
+        if command == self.GLOBAL:
+            return self.global_rule
+        return self.rules.get(command, self.default_rule)
+
+    def _evict(self, now: float):
+        """Drop idle users from the cold end of the LRU, then enforce the size bound"""
+        users = self._users
+        while users:
+            _, oldest = next(iter(users.items()))
+            if now - oldest.last_seen < self.idle_ttl and len(users) <= self.max_users:
+                break
+            users.popitem(last=False)
+
+    def allow(self, user_id: int, command: Optional[str], now: Optional[float] = None) -> bool:
+        """Charge one token from the user's global and command buckets"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None:
+                state = self._users[user_id] = _UserState(now)
+            else:
+                self._users.move_to_end(user_id)
+            state.last_seen = now
+            self._evict(now)
+
+            keys = (self.GLOBAL, command) if command else (self.GLOBAL,)
+            for key in keys:
+                bucket = state.buckets.get(key)
+                if bucket is None:
+                    capacity, rate = self._rule_for(key)
+                    bucket = state.buckets[key] = TokenBucket(capacity, rate, now)
+                if not bucket.consume(now):
+                    self.blocked += 1
+                    return False
+            return True
+
+    def should_warn(self, user_id: int, now: Optional[float] = None) -> bool:
+        """Only tell a throttled user to slow down once per `warn_interval`"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None or now - state.warned_at < self.warn_interval:
+                return False
+            state.warned_at = now
+            return True
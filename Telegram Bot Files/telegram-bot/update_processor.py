@@ -0,0 +1,85 @@
+"""
+ZewedJobs concurrent update processing
+Handles updates from different chats at the same time, and updates from the
+same chat one after another in the order they arrived
+
+python-telegram-bot starts a task per update. Every chat has a lock, so a
+second message from a chat waits for the first one's handlers to finish
+while other chats carry on. asyncio locks wake waiters first come, first
+served, which keeps each chat's updates in order. Locks exist only while a
+chat has updates in flight.
+
+At most UPDATE_CONCURRENCY updates run at once. The slot is taken after the
+chat lock, so updates queued behind their own chat never hold slots that
+other chats could use; a burst from one chat occupies a single slot.
+
+Handlers still block the event loop while they run synchronous code, so the
+slow database reads in handlers go through asyncio.to_thread.
+"""
+
+import sys
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict
+
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def chat_key(update: object):
+    """Chat id, falling back to the user (inline queries); None when updates need no ordering"""
+    chat = getattr(update, 'effective_chat', None)
+    if chat:
+        return chat.id
+    user = getattr(update, 'effective_user', None)
+    return user.id if user else None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Concurrent across chats, sequential within a chat"""
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # process_update() (final in the base class) takes its semaphore before
+        # calling do_process_update, i.e. before the chat lock. Make that one
+        # never block and take the real slot inside the lock instead.
+        self._semaphore = asyncio.BoundedSemaphore(sys.maxsize)
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._locks: Dict[Any, asyncio.Lock] = {}
+        # Updates holding or waiting for each chat's lock
+        self._pending: Dict[Any, int] = {}
+        self.processed = 0
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._locks)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = chat_key(update)
+        if key is None:
+            async with self._slots:
+                await coroutine
+            self.processed += 1
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._pending[key] = self._pending.get(key, 0) + 1
+        try:
+            async with lock, self._slots:
+                await coroutine
+        finally:
+            self.processed += 1
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        logger.info(f"Processing up to {self.max_concurrent_updates} updates concurrently, ordered per chat")
+
+    async def shutdown(self) -> None:
+        if self._locks:
+            logger.info(f"Update processor stopping with {len(self._locks)} chats in flight")
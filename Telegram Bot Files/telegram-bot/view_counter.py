@@ -0,0 +1,74 @@
+"""
+ZewedJobs job view counter
+Aggregates job detail views in memory and writes them to `jobs.views` in batches
+
+Each flush is one UPDATE for every job viewed since the previous flush, so
+popular postings do not turn into a hot row written on every click.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def build_flush_query(counts: Dict[int, int]) -> Tuple[str, tuple]:
+    """One UPDATE adding each job's pending count; ids sorted for a stable lock order"""
+    job_ids = sorted(counts)
+    cases = ' '.join(['WHEN %s THEN %s'] * len(job_ids))
+    placeholders = ', '.join(['%s'] * len(job_ids))
+    # A view is not an edit: keep updated_at, which the inline search refresh follows
+    # (incremental backups follow it too, so they miss view counts until the next full one)
+    query = (f"UPDATE jobs SET views = views + CASE id {cases} END, updated_at = updated_at "
+             f"WHERE id IN ({placeholders})")
+    params = tuple(value for job_id in job_ids for value in (job_id, counts[job_id])) + tuple(job_ids)
+    return query, params
+
+
+class ViewCounter:
+    """Pending view increments per job, counting each user once per dedup window"""
+
+    def __init__(self, dedup_seconds: float = 1800.0, max_tracked: int = 100000):
+        self._pending: Dict[int, int] = {}
+        self._seen = TTLCache(max_size=max_tracked, ttl=dedup_seconds)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, job_id: int, user_id: Optional[int] = None) -> bool:
+        """Count a view; repeated views by the same user within the window are ignored"""
+        if user_id is not None:
+            key = (user_id, job_id)
+            if self._seen.get(key):
+                return False
+            self._seen.set(key, True)
+        with self._lock:
+            self._pending[job_id] = self._pending.get(job_id, 0) + 1
+        return True
+
+    def drain(self) -> Dict[int, int]:
+        with self._lock:
+            counts, self._pending = self._pending, {}
+        return counts
+
+    def restore(self, counts: Dict[int, int]):
+        """Put back counts whose flush failed so the next flush retries them"""
+        with self._lock:
+            for job_id, count in counts.items():
+                self._pending[job_id] = self._pending.get(job_id, 0) + count
+
+    def flush(self, execute_update: Callable[[str, tuple], bool]) -> int:
+        """Write pending counts with one batched UPDATE; returns the views written"""
+        counts = self.drain()
+        if not counts:
+            return 0
+        query, params = build_flush_query(counts)
+        if not execute_update(query, params):
+            self.restore(counts)
+            logger.warning(f"View flush failed, keeping {len(counts)} jobs for the next flush")
+            return 0
+        return sum(counts.values())
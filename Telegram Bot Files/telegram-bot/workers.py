@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+ZewedJobs scale-out mode
+One front process polls Telegram and hands each update to one of N worker
+processes, each running the full bot with its own event loop
+
+Updates are routed by consistent hashing on the chat id, so every chat is
+always served by the same worker and its updates are handled in order.
+Workers share nothing but the database. When a worker dies its chats move to
+the remaining workers (only its share of the ring changes), the updates still
+queued for it are re-dispatched, and it is restarted with a backoff; once it
+reports ready it takes its chats back. Before it does, every other worker is
+sent a drain marker and answers once it has handled everything queued ahead
+of it; until then updates for the returning chats are held in the front
+process, so no chat has updates on two workers at once.
+
+The front process never blocks on a full worker queue. Updates that do not
+fit wait in a per-worker overflow list (retried every second, in order), and
+beyond WORKER_OVERFLOW_SIZE new updates for that worker are dropped.
+
+Only worker 0 runs the once-per-deployment jobs (daily alerts, cleanup).
+
+Usage: python workers.py [--workers 4]
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import asyncio
+import bisect
+import hashlib
+import logging
+import argparse
+import multiprocessing as mp
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+METRICS_INTERVAL = float(os.getenv('WORKER_METRICS_SECONDS', '60'))
+WORKER_QUEUE_SIZE = int(os.getenv('WORKER_QUEUE_SIZE', '10000'))
+WORKER_OVERFLOW_SIZE = int(os.getenv('WORKER_OVERFLOW_SIZE', '10000'))
+RESTART_BACKOFF_MAX = 60.0
+# A worker acknowledges a drain marker after this long even if it is still busy
+DRAIN_TIMEOUT = 10.0
+
+# Queue item asking a worker to confirm it has handled everything before it
+DRAIN = 'drain'
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, replicas: int = 100):
+        self.replicas = replicas
+        self._keys: List[int] = []
+        self._nodes: Dict[int, int] = {}
+
+    def __contains__(self, node: int) -> bool:
+        return _hash(f"{node}:0") in self._nodes
+
+    def add(self, node: int):
+        for replica in range(self.replicas):
+            key = _hash(f"{node}:{replica}")
+            if key not in self._nodes:
+                bisect.insort(self._keys, key)
+            self._nodes[key] = node
+
+    def remove(self, node: int):
+        for replica in range(self.replicas):
+            key = _hash(f"{node}:{replica}")
+            if self._nodes.pop(key, None) is not None:
+                self._keys.pop(bisect.bisect_left(self._keys, key))
+
+    def node_for(self, key) -> Optional[int]:
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._nodes[self._keys[index]]
+
+
+def routing_key(update) -> int:
+    """Chat id, falling back to the user (inline queries) or the update id"""
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return update.effective_user.id
+    return update.update_id
+
+
+# Worker process
+def _next_items(updates: mp.Queue, limit: int = 100) -> list:
+    """Block up to a second for one item, then take whatever else is queued"""
+    try:
+        items = [updates.get(True, 1.0)]
+    except queue.Empty:
+        return []
+    while items[-1] is not None and len(items) < limit:
+        try:
+            items.append(updates.get_nowait())
+        except queue.Empty:
+            break
+    return items
+
+
+def worker_main(index: int, updates: mp.Queue, events: mp.Queue):
+    """Entry point of a worker process: the full bot fed from `updates`"""
+    # Each worker logs to its own file; set before bot.py configures logging
+    base, ext = os.path.splitext(os.getenv('LOG_FILE', 'bot.log'))
+    os.environ['LOG_FILE'] = f"{base}.worker-{index}{ext}"
+    # Worker i serves its health endpoints on HEALTH_PORT + 1 + i
+    if int(os.getenv('HEALTH_PORT', '0')):
+        os.environ['HEALTH_PORT'] = str(int(os.environ['HEALTH_PORT']) + 1 + index)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    import bot
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    metrics = {'processed': 0, 'lag_total': 0.0, 'lag_max': 0.0}
+    dispatched_at: Dict[int, float] = {}
+
+    async def count_update(update: Update, context):
+        lag = time.time() - dispatched_at.pop(update.update_id, time.time())
+        metrics['processed'] += 1
+        metrics['lag_total'] += lag
+        metrics['lag_max'] = max(metrics['lag_max'], lag)
+
+    async def run():
+        application = bot.build_application(singleton_jobs=index == 0, polling=False)
+        application.add_handler(TypeHandler(Update, count_update), group=-3)
+        loop = asyncio.get_running_loop()
+
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+
+        async def report_ready():
+            # Rejoin the ring only once the pool and caches are warm
+            while not bot.ready.is_set():
+                await asyncio.sleep(0.5)
+            events.put(('ready', index, os.getpid()))
+            logger.info(f"Worker {index} ready (pid {os.getpid()})")
+
+        readiness = asyncio.create_task(report_ready())
+        drains = set()
+
+        async def acknowledge_drain(joining: int):
+            # PTB marks an update done once its handlers have finished
+            try:
+                await asyncio.wait_for(application.update_queue.join(), DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Worker {index} still busy after {DRAIN_TIMEOUT:g}s, releasing worker {joining}'s chats")
+            events.put(('drained', index, joining))
+
+        last_report = time.monotonic()
+        try:
+            running = True
+            while running:
+                for item in await loop.run_in_executor(None, _next_items, updates):
+                    if item is None:
+                        running = False
+                        break
+                    if item[0] == DRAIN:
+                        task = asyncio.create_task(acknowledge_drain(item[1]))
+                        drains.add(task)
+                        task.add_done_callback(drains.discard)
+                        continue
+                    data, sent_at = item
+                    update = Update.de_json(data, application.bot)
+                    dispatched_at[update.update_id] = sent_at
+                    await application.update_queue.put(update)
+
+                if time.monotonic() - last_report >= METRICS_INTERVAL:
+                    processed = metrics['processed']
+                    events.put(('metrics', index, {
+                        'processed': processed,
+                        'mean_lag_ms': round(1000 * metrics['lag_total'] / processed, 1) if processed else 0.0,
+                        'max_lag_ms': round(1000 * metrics['lag_max'], 1),
+                        'backlog': application.update_queue.qsize(),
+                    }))
+                    metrics.update(processed=0, lag_total=0.0, lag_max=0.0)
+                    last_report = time.monotonic()
+
+            # Let the handlers finish what was already handed over before stopping
+            deadline = time.monotonic() + 10
+            while application.update_queue.qsize() and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+        finally:
+            readiness.cancel()
+            await application.stop()
+            await application.shutdown()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+
+    asyncio.run(run())
+
+
+# Front process
+class WorkerPool:
+    """Starts, feeds, watches and restarts the worker processes"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.context = mp.get_context('spawn')
+        self.events = self.context.Queue()
+        self.ring = HashRing()
+        self.processes: Dict[int, mp.Process] = {}
+        self.queues: Dict[int, mp.Queue] = {}
+        self.restarts = {index: 0 for index in range(size)}
+        self.failures = {index: 0 for index in range(size)}
+        self.restart_at: Dict[int, float] = {}
+        # Updates that arrived while no worker was alive
+        self.pending: List = []
+        # Items waiting for room in a worker's queue, oldest first
+        self.overflow: Dict[int, Deque] = {index: deque() for index in range(size)}
+        # Rejoining worker -> workers yet to confirm a drain, and the updates held for it
+        self.joining: Dict[int, dict] = {}
+        self.dispatched = {index: 0 for index in range(size)}
+        self.dropped = 0
+        self.worker_metrics: Dict[int, dict] = {}
+
+    def start_worker(self, index: int):
+        self.queues[index] = self.context.Queue(maxsize=WORKER_QUEUE_SIZE)
+        process = self.context.Process(
+            target=worker_main, args=(index, self.queues[index], self.events),
+            name=f"zewedjobs-worker-{index}", daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(self.size):
+            self.start_worker(index)
+            # Queued updates wait for the worker to finish starting
+            self.ring.add(index)
+
+    def dispatch(self, update):
+        index = self.ring.node_for(routing_key(update))
+        if index is None:
+            self.pending.append(update)
+            return
+        if index in self.joining:
+            # Older updates of this chat may still be on another worker
+            self.joining[index]['held'].append(update)
+            return
+        if self._send(index, (update.to_dict(), time.time())):
+            self.dispatched[index] += 1
+
+    def _send(self, index: int, item) -> bool:
+        """Queue an item for a worker without blocking; False when it had to be dropped"""
+        overflow = self.overflow[index]
+        self._flush_overflow(index)
+        if not overflow:
+            try:
+                self.queues[index].put_nowait(item)
+                return True
+            except queue.Full:
+                pass
+        if item[0] != DRAIN and len(overflow) >= WORKER_OVERFLOW_SIZE:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Worker {index} is not keeping up; {self.dropped} updates dropped so far")
+            return False
+        overflow.append(item)
+        return True
+
+    def _flush_overflow(self, index: int):
+        overflow = self.overflow[index]
+        while overflow:
+            try:
+                self.queues[index].put_nowait(overflow[0])
+            except queue.Full:
+                return
+            overflow.popleft()
+
+    def _redispatch(self, index: int, bot):
+        """Hand updates still queued for a dead worker to the remaining workers"""
+        from telegram import Update
+
+        items = []
+        while True:
+            try:
+                item = self.queues[index].get_nowait()
+            except (queue.Empty, OSError, EOFError):
+                break
+            if item:
+                items.append(item)
+        items.extend(self.overflow[index])
+        self.overflow[index].clear()
+
+        moved = 0
+        for item in items:
+            if item[0] != DRAIN:
+                self.dispatch(Update.de_json(item[0], bot))
+                moved += 1
+        if moved:
+            logger.info(f"Re-dispatched {moved} queued updates from worker {index}")
+
+    def _begin_rejoin(self, index: int):
+        """Put a worker back in the ring, holding its chats until the others have drained"""
+        others = {other for other in self.processes if other != index and other in self.ring}
+        self.ring.add(index)
+        if not others:
+            logger.info(f"Worker {index} rejoined the ring")
+            return
+        self.joining[index] = {'waiting': others, 'held': []}
+        for other in others:
+            self._send(other, (DRAIN, index))
+
+    def _drained(self, index: int, joining: int):
+        state = self.joining.get(joining)
+        if state is None:
+            return
+        state['waiting'].discard(index)
+        if state['waiting']:
+            return
+        del self.joining[joining]
+        for update in state['held']:
+            self.dispatch(update)
+        logger.info(f"Worker {joining} rejoined the ring ({len(state['held'])} held updates released)")
+
+    def check(self, bot):
+        """Handle worker events and restart dead workers"""
+        while True:
+            try:
+                kind, index, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'ready':
+                self.failures[index] = 0
+                if index not in self.ring:
+                    logger.info(f"Worker {index} ready again (pid {payload}), draining the others")
+                    self._begin_rejoin(index)
+            elif kind == 'drained':
+                self._drained(index, payload)
+            elif kind == 'metrics':
+                self.worker_metrics[index] = payload
+
+        for index in self.processes:
+            self._flush_overflow(index)
+
+        now = time.monotonic()
+        for index, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            if index in self.restart_at:
+                if now >= self.restart_at[index]:
+                    del self.restart_at[index]
+                    self.restarts[index] += 1
+                    logger.info(f"Restarting worker {index} (restart #{self.restarts[index]})")
+                    # It rejoins the ring once it reports ready
+                    self.start_worker(index)
+                continue
+
+            logger.error(f"Worker {index} exited with code {process.exitcode}; rebalancing its chats")
+            self.ring.remove(index)
+            held = self.joining.pop(index, {}).get('held', [])
+            self._redispatch(index, bot)
+            for update in held:
+                self.dispatch(update)
+            # Nothing more will be handled there, so nothing to wait for
+            for joining in list(self.joining):
+                self._drained(index, joining)
+            self.failures[index] += 1
+            self.restart_at[index] = now + min(RESTART_BACKOFF_MAX, 2 ** self.failures[index])
+
+        if self.pending and self.ring.node_for(0) is not None:
+            pending, self.pending = self.pending, []
+            for update in pending:
+                self.dispatch(update)
+
+    def report(self):
+        summary = {
+            index: {
+                'alive': self.processes[index].is_alive(),
+                'in_ring': index in self.ring and index not in self.joining,
+                'dispatched': self.dispatched[index],
+                'overflow': len(self.overflow[index]),
+                'restarts': self.restarts[index],
+                **self.worker_metrics.get(index, {}),
+            }
+            for index in range(self.size)
+        }
+        logger.info(f"Worker metrics: {json.dumps(summary)}, dropped {self.dropped}")
+        self.dispatched = {index: 0 for index in range(self.size)}
+
+    def stop(self, timeout: float = 30.0):
+        for index, process in self.processes.items():
+            if process.is_alive():
+                # The event loop is gone; blocking until there is room is fine now
+                for item in self.overflow[index]:
+                    self.queues[index].put(item, timeout=timeout)
+                self.queues[index].put(None)
+        for process in self.processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+async def run_front(pool: WorkerPool, token: str):
+    """Long-poll Telegram and distribute updates until interrupted"""
+    from telegram import Bot, Update
+    from telegram.error import NetworkError, TimedOut
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async def supervise():
+        last_report = time.monotonic()
+        while not stop.is_set():
+            pool.check(bot)
+            if time.monotonic() - last_report >= METRICS_INTERVAL:
+                pool.report()
+                last_report = time.monotonic()
+            await asyncio.sleep(1)
+
+    bot = Bot(token)
+    async with bot:
+        supervisor = asyncio.create_task(supervise())
+        offset = None
+        while not stop.is_set():
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=25, allowed_updates=Update.ALL_TYPES)
+            except (NetworkError, TimedOut) as e:
+                logger.warning(f"Polling failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                pool.dispatch(update)
+                offset = update.update_id + 1
+        supervisor.cancel()
+        # Confirm the last dispatched update so it is not delivered again
+        if offset is not None:
+            await bot.get_updates(offset=offset, timeout=0)
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Run ZewedJobs bot across several worker processes")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BOT_WORKERS', str(os.cpu_count() or 1))))
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    token = os.getenv('BOT_TOKEN')
+    if not token:
+        logger.error("BOT_TOKEN not found in environment variables")
+        sys.exit(1)
+
+    pool = WorkerPool(args.workers)
+    pool.start()
+    logger.info(f"Front process polling for {args.workers} workers")
+    try:
+        asyncio.run(run_front(pool, token))
+    finally:
+        pool.stop()
+        logger.info("All workers stopped")
+
+
+if __name__ == '__main__':
+    main()